@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""Benchmark determinístico: repete cada cena por N quadros, sem janela, e imprime JSON.
+
+Cada cena (menu e os quatro módulos) roda num FBO (utils/offscreen), sem vsync, com um
+roteiro fixo de teclas, movimentos e cliques do mouse que se repete a cada SCRIPT_PERIOD
+quadros e com o tempo avançando FRAME_DT por quadro. O resultado traz FPS, tempo por fase
+(utils/profiler; "swap" é o glFinish, que espera o rasterizador) e chamadas OpenGL por quadro
+(utils/glcount). Com o mesmo --frames e o mesmo backend, execuções de commits diferentes
+são comparáveis.
+
+Com --projecao MODO:QTD (ex.: grade:100000) a cena de Projeção usa uma cena gerada
+(utils/procedural), para medir como desenho e descarte pelo frustum escalam com o número de
+objetos; o roteiro de câmera é o mesmo. No ViewPort o resultado traz também os acertos e
+faltas do cache de vistas (utils/viewcache).
+
+Uso:  python bench.py [--frames 300] [--warmup 30] [--scenes viewport,iluminacao] [--out bench.json]
+                      [--projecao aglomerados:1000000]
+"""
+import argparse
+import importlib
+import json
+import platform
+import sys
+import time
+from utils import offscreen
+
+if __name__ == "__main__":
+    offscreen.configure_platform(sys.argv[1:], headless=True)
+
+import glfw  # noqa: E402
+from OpenGL.GL import GL_RENDERER, GL_VERSION, glFinish, glGetString  # noqa: E402
+from utils import glcount, host, profiler, viewcache  # noqa: E402
+
+SCENES = ("menu", "transformacoes", "projecao", "viewport", "iluminacao")
+FRAME_DT = 1.0 / 60.0
+SCRIPT_PERIOD = 120
+TOP_FUNCTIONS = 15
+
+# Eventos por quadro do período: ("key", tecla, mods), ("hover", id) e ("click", id), em que
+# id é uma aba (ou botão do menu) e o cursor vai para o centro dela
+SCRIPTS = {
+    "menu": {
+        0: [("hover", "1")],
+        30: [("hover", "2")],
+        60: [("hover", "3")],
+        90: [("hover", None)],
+    },
+    "transformacoes": {
+        0: [("key", glfw.KEY_1, 0)],
+        10: [("key", glfw.KEY_RIGHT, 0), ("key", glfw.KEY_UP, 0)],
+        20: [("hover", "opt_2"), ("click", "opt_2")],
+        30: [("key", glfw.KEY_RIGHT, 0)],
+        45: [("key", glfw.KEY_2, 0), ("key", glfw.KEY_UP, 0)],
+        60: [("key", glfw.KEY_4, 0), ("key", glfw.KEY_Y, 0)],
+        75: [("key", glfw.KEY_5, 0), ("key", glfw.KEY_RIGHT, 0)],
+        90: [("key", glfw.KEY_TAB, 0)],
+        105: [("hover", None), ("key", glfw.KEY_TAB, 0), ("key", glfw.KEY_BACKSPACE, 0)],
+    },
+    "projecao": {
+        0: [("key", glfw.KEY_UP, 0)],
+        15: [("key", glfw.KEY_LEFT, 0)],
+        30: [("hover", "proj_ortho"), ("click", "proj_ortho")],
+        45: [("key", glfw.KEY_PAGE_UP, 0)],
+        60: [("hover", "proj_persp"), ("click", "proj_persp")],
+        75: [("hover", None), ("key", glfw.KEY_RIGHT, 0)],
+        90: [("key", glfw.KEY_PAGE_DOWN, 0)],
+        105: [("key", glfw.KEY_DOWN, 0)],
+    },
+    "viewport": {
+        0: [("key", glfw.KEY_Z, 0)],
+        20: [("hover", "obj_0"), ("click", "obj_0")],
+        40: [("key", glfw.KEY_A, 0)],
+        60: [("hover", "obj_1"), ("click", "obj_1")],
+        80: [("key", glfw.KEY_A, 0), ("key", glfw.KEY_Z, glfw.MOD_SHIFT)],
+        100: [("hover", None)],
+    },
+    "iluminacao": {
+        0: [("hover", "shade_flat"), ("click", "shade_flat")],
+        40: [("hover", "shade_smooth"), ("click", "shade_smooth")],
+        80: [("hover", None)],
+    },
+}
+
+
+def _scene(name):
+    return importlib.import_module("main" if name == "menu" else "modulos." + name)
+
+
+def _rects(scene, w, h):
+    if hasattr(scene, "_menu_rects"):
+        return scene._menu_rects(w, h)
+    return scene._RECTS["tabs"]
+
+
+def _center(scene, rect_id, w, h):
+    """Centro do retângulo `rect_id` em coordenadas do glfw (y para baixo)."""
+    for rect in _rects(scene, w, h):
+        if rect[0] == rect_id:
+            return ((rect[1] + rect[3]) / 2, h - (rect[2] + rect[4]) / 2)
+    raise KeyError(f"retângulo {rect_id!r} não encontrado")
+
+
+def _dispatch(scene, event, w, h):
+    kind = event[0]
+    if kind == "key":
+        scene.on_key(None, event[1], 0, glfw.PRESS, event[2])
+    elif kind == "hover":
+        host.set_replay(cursor=(-1.0, -1.0) if event[1] is None else _center(scene, event[1], w, h))
+    elif kind == "click":
+        host.set_replay(cursor=_center(scene, event[1], w, h))
+        scene.on_mouse(None, glfw.MOUSE_BUTTON_LEFT, glfw.PRESS, 0)
+
+
+def _run_scene(ctx, name, frames, warmup, projecao_scene=None):
+    scene = _scene(name)
+    w, h = scene.WINDOW_SIZE
+    script = SCRIPTS[name]
+    offscreen.bind_target(ctx, w, h)
+    host.enter_scene(scene, None)
+    if name == "projecao" and projecao_scene:
+        scene.set_scene(*projecao_scene)
+    host.start_replay((w, h))
+    try:
+        for frame in range(warmup + frames):
+            if frame == warmup:
+                profiler.reset()
+                glcount.reset()
+                viewcache.reset()
+                started = time.perf_counter()
+            host.set_replay(time=frame * FRAME_DT)
+            profiler.begin_frame()
+            scene.draw_frame(None, w, h)
+            glFinish()
+            profiler.lap("swap")
+            # Eventos depois do desenho, como no loop da janela (poll_events no fim do quadro)
+            for event in script.get(frame % SCRIPT_PERIOD, ()):
+                _dispatch(scene, event, w, h)
+            profiler.lap("poll")
+            profiler.end_frame()
+            glcount.end_frame()
+        wall = time.perf_counter() - started
+    finally:
+        host.stop_replay()
+        host.exit_scene(scene, None)
+    summary = profiler.stats()
+    calls = glcount.stats()
+    result = {
+        "size": [w, h],
+        "frames": frames,
+        "wall_s": round(wall, 4),
+        "fps": round(frames / wall, 2),
+        "frame_ms": {key: round(float(value), 4) for key, value in summary["frame_ms"].items()},
+        "phases_ms": {
+            phase: {key: round(float(value), 4) for key, value in values.items()}
+            for phase, values in summary["phases_ms"].items()
+        },
+        "gl_calls_per_frame": round(calls["calls_per_frame"], 2),
+        "gl_functions": {
+            fn: round(count, 2) for fn, count in list(calls["functions"].items())[:TOP_FUNCTIONS]
+        },
+    }
+    if name == "projecao" and projecao_scene:
+        result["scene"] = {
+            "mode": projecao_scene[0],
+            "objects": projecao_scene[1],
+            "generate_ms": round(scene.SCENE["gen_ms"], 2),
+            "bvh_ms": round(scene.SCENE["bvh_ms"], 2),
+            "drawn_last_frame": int(scene.CULL["drawn"]),
+        }
+    if name == "viewport":
+        result["view_cache"] = viewcache.stats()
+        result["view_cache"]["hit_rate"] = round(result["view_cache"]["hit_rate"], 4)
+    if calls["callers"]:
+        result["gl_callers"] = {
+            caller: round(count, 2) for caller, count in list(calls["callers"].items())[:TOP_FUNCTIONS]
+        }
+    return result
+
+
+def run_bench(names, frames=300, warmup=30, backend="auto", callers=False, projecao_scene=None):
+    ctx = offscreen.open_context(backend)
+    try:
+        # Importa as cenas antes de instalar a contagem, que troca as funções já importadas
+        for name in names:
+            _scene(name)
+        glcount.install(callers=callers)
+        try:
+            result = {
+                "backend": ctx["backend"],
+                "renderer": glGetString(GL_RENDERER).decode("ascii", "replace"),
+                "gl_version": glGetString(GL_VERSION).decode("ascii", "replace"),
+                "python": platform.python_version(),
+                "frames": frames,
+                "warmup": warmup,
+                "scenes": {name: _run_scene(ctx, name, frames, warmup, projecao_scene) for name in names},
+            }
+        finally:
+            glcount.uninstall()
+    finally:
+        offscreen.close_context(ctx)
+    return result
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark sem janela das cenas do ANAMARANATOR 2000")
+    parser.add_argument("--frames", type=int, default=300, help="quadros medidos por cena (padrão: 300)")
+    parser.add_argument("--warmup", type=int, default=30, help="quadros descartados antes da medição")
+    parser.add_argument("--scenes", default=",".join(SCENES), help="cenas separadas por vírgula (padrão: todas)")
+    parser.add_argument("--backend", choices=offscreen.BACKENDS, default="auto")
+    parser.add_argument("--callers", action="store_true",
+                        help="atribui as chamadas GL à função que as fez (gl_callers; custa um pouco de tempo)")
+    parser.add_argument("--out", metavar="ARQUIVO", help="grava o JSON em ARQUIVO em vez de imprimir")
+    parser.add_argument("--projecao", metavar="MODO:QTD",
+                        help="cena gerada da Projeção (grade ou aglomerados, ex.: grade:100000)")
+    args = parser.parse_args(argv)
+    args.scenes = [name.strip() for name in args.scenes.split(",") if name.strip()]
+    unknown = [name for name in args.scenes if name not in SCENES]
+    if unknown:
+        parser.error(f"cena desconhecida: {', '.join(unknown)} (use {', '.join(SCENES)})")
+    if args.frames < 1 or args.warmup < 0:
+        parser.error("--frames precisa ser positivo e --warmup não negativo")
+    if args.projecao:
+        mode, _, count = args.projecao.partition(":")
+        try:
+            args.projecao = (mode, int(count) if count else None)
+            _scene("projecao").set_scene(*args.projecao)
+        except ValueError as exc:
+            parser.error(f"--projecao: {exc}")
+    return args
+
+
+def main():
+    args = _parse_args(sys.argv[1:])
+    try:
+        result = run_bench(args.scenes, args.frames, args.warmup, args.backend, args.callers, args.projecao)
+    except RuntimeError as exc:
+        print(exc, file=sys.stderr)
+        sys.exit(1)
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,18 @@
 #!/usr/bin/env python3
 """Projeto prático Computação Gráfica (6 pts). Menu gráfico GLFW; escolha do módulo por clique."""
+import argparse
+import importlib
+import os
 import sys
-import glfw
-from OpenGL.GL import (
-    GL_COLOR_BUFFER_BIT, GL_DEPTH_TEST,
+from utils import offscreen
+
+if __name__ == "__main__":
+    # O modo headless sem display usa EGL, que o PyOpenGL só aceita antes da primeira importação
+    offscreen.configure_platform(sys.argv[1:])
+
+import glfw  # noqa: E402
+from OpenGL.GL import (  # noqa: E402
+    GL_COLOR_BUFFER_BIT, GL_DEPTH_BUFFER_BIT, GL_DEPTH_TEST,
     GL_PROJECTION, GL_MODELVIEW,
     GL_QUADS, GL_LINES,
     glClear, glClearColor, glLoadIdentity, glMatrixMode,
@@ -11,8 +20,9 @@ from OpenGL.GL import (
     glDisable, glEnable,
     glBegin, glEnd, glVertex2f, glColor3f,
 )
-from utils.hud import draw_text_2d, text_width
-from utils.panel import hit_test
+from utils import clock, glcount, host, profiler, softraster, tiledraster  # noqa: E402
+from utils.hud import draw_text_2d, text_width, set_text_backend  # noqa: E402
+from utils.panel import draw_back_button, hit_test  # noqa: E402
 
 MENU_BUTTONS = [
     ("1", "1 - Transformações Geométricas"),
@@ -26,6 +36,17 @@ BTN_HEIGHT = 52
 BTN_MARGIN = 18
 MENU_W = 560
 MENU_H = 400
+WINDOW_SIZE = (MENU_W, MENU_H)
+TITLE = "ANAMARANATOR 2000 - Menu"
+MODULES = {
+    "1": "modulos.transformacoes",
+    "2": "modulos.projecao",
+    "3": "modulos.viewport",
+    "4": "modulos.iluminacao",
+}
+HEADLESS_SCENES = ("menu", "transformacoes", "projecao", "viewport", "iluminacao")
+# Cenas com soft_frame (utils/softraster): desenhadas sem OpenGL com --backend soft
+SOFT_SCENES = ("projecao", "viewport", "iluminacao")
 TOP_PAD = 80
 BOTTOM_PAD = 28
 
@@ -51,8 +72,7 @@ def _menu_rects(w, h):
     return rects
 
 
-def _draw_menu(menu_win, hover_bid=None):
-    w, h = glfw.get_framebuffer_size(menu_win)
+def _draw_menu(w, h, hover_bid=None):
     glViewport(0, 0, w, h)
     glClear(GL_COLOR_BUFFER_BIT)
     glMatrixMode(GL_PROJECTION)
@@ -98,65 +118,188 @@ def _draw_menu(menu_win, hover_bid=None):
     return rects
 
 
-def main():
-    if not glfw.init():
-        print("Falha ao inicializar GLFW", file=sys.stderr)
-        sys.exit(1)
-    glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 2)
-    glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 1)
-    menu_win = glfw.create_window(MENU_W, MENU_H, "ANAMARANATOR 2000 - Menu", None, None)
-    if not menu_win:
-        glfw.terminate()
-        print("Falha ao criar janela do menu", file=sys.stderr)
-        sys.exit(1)
-    glfw.make_context_current(menu_win)
+def enter(win):
     glClearColor(0.12, 0.13, 0.18, 1.0)
 
-    pending_click = [None]
-
-    def on_mouse(window, button, action, mods):
-        if button == glfw.MOUSE_BUTTON_LEFT and action == glfw.PRESS:
-            x, y = glfw.get_cursor_pos(window)
-            fw, fh = glfw.get_framebuffer_size(window)
-            rects = _menu_rects(fw, fh)
-            bid = hit_test(x, y, fw, fh, rects)
-            if bid:
-                pending_click[0] = bid
-
-    glfw.set_mouse_button_callback(menu_win, on_mouse)
-
-    while not glfw.window_should_close(menu_win):
-        mx, my = glfw.get_cursor_pos(menu_win)
-        fw, fh = glfw.get_framebuffer_size(menu_win)
-        hover_bid = hit_test(mx, my, fw, fh, _menu_rects(fw, fh))
-        rects = _draw_menu(menu_win, hover_bid=hover_bid)
-        glfw.swap_buffers(menu_win)
-        glfw.poll_events()
-
-        bid = pending_click[0]
-        if bid is not None:
-            pending_click[0] = None
-            if bid == "5":
-                break
-            if bid == "1":
-                from modulos.transformacoes import run
-                run()
-                glfw.make_context_current(menu_win)
-            elif bid == "2":
-                from modulos.projecao import run
-                run()
-                glfw.make_context_current(menu_win)
-            elif bid == "3":
-                from modulos.viewport import run
-                run()
-                glfw.make_context_current(menu_win)
-            elif bid == "4":
-                from modulos.iluminacao import run
-                run()
-                glfw.make_context_current(menu_win)
-
-    glfw.destroy_window(menu_win)
-    glfw.terminate()
+
+def on_mouse(win, button, action, mods):
+    if button != glfw.MOUSE_BUTTON_LEFT or action != glfw.PRESS:
+        return
+    x, y = host.cursor_pos(win)
+    fw, fh = host.framebuffer_size(win)
+    bid = hit_test(x, y, fw, fh, _menu_rects(fw, fh))
+    if bid == "5":
+        glfw.set_window_should_close(win, True)
+    elif bid:
+        host.switch_to(importlib.import_module(MODULES[bid]))
+
+
+def hover_id(x, y, w, h):
+    return hit_test(x, y, w, h, _menu_rects(w, h))
+
+
+def draw_frame(win, w, h):
+    _draw_menu(w, h, hover_bid=hover_id(*host.cursor_pos(win), w, h))
+    profiler.lap("hud")
+
+
+def _headless_scene(name):
+    return sys.modules[__name__] if name == "menu" else importlib.import_module("modulos." + name)
+
+
+def _draw_headless_frame(name, scene, w, h, t):
+    """Quadro da cena como aparece na janela, sem hover; `t` anima a iluminação."""
+    if name == "menu":
+        _draw_menu(w, h)
+        return
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+    if name == "iluminacao":
+        scene._draw_scene(w, h, t)
+    else:
+        scene._draw_scene(w, h)
+    scene._draw_overlay(w, h)
+    draw_back_button(w, h)
+
+
+def run_soft(names, out_dir, image_format="png", t=0.3, size=None, workers=1):
+    """Como run_headless, sem OpenGL: só a cena 3D de cada módulo, pelo rasterizador em NumPy.
+
+    `size` (w, h) troca o tamanho da janela (quadros 4K/8K); com workers != 1 a rasterização
+    é dividida entre processos (utils/tiledraster; 0 = um por CPU).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    pool = None if workers == 1 else tiledraster.start_pool(workers or None)
+    try:
+        for name in names:
+            scene = _headless_scene(name)
+            w, h = size or scene.WINDOW_SIZE
+            scene._reset_state()
+            items, lights = scene.soft_items(w, h, t) if name == "iluminacao" else scene.soft_items(w, h)
+            if pool is None:
+                pixels = softraster.render((w, h), scene.CLEAR_COLOR, items, lights)
+            else:
+                pixels = tiledraster.render((w, h), scene.CLEAR_COLOR, items, lights, pool)
+            path = os.path.join(out_dir, f"{name}.{image_format}")
+            offscreen.save_image(path, pixels)
+            print(path)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+def run_headless(names, out_dir, image_format="png", backend="auto", t=0.3, size=None, workers=1):
+    """Desenha um quadro de cada cena num contexto sem janela e salva as imagens em `out_dir`."""
+    if backend == "soft":
+        run_soft(names, out_dir, image_format, t, size, workers)
+        return
+    ctx = offscreen.open_context(backend)
+    try:
+        os.makedirs(out_dir, exist_ok=True)
+        for name in names:
+            scene = _headless_scene(name)
+            w, h = scene.WINDOW_SIZE
+            offscreen.bind_target(ctx, w, h)
+            host.enter_scene(scene, None)
+            _draw_headless_frame(name, scene, w, h, t)
+            pixels = offscreen.read_pixels(w, h)
+            host.exit_scene(scene, None)
+            path = os.path.join(out_dir, f"{name}.{image_format}")
+            offscreen.save_image(path, pixels)
+            print(path)
+    finally:
+        offscreen.close_context(ctx)
+
+
+def _size(text):
+    try:
+        w, h = (int(value) for value in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"tamanho inválido: {text!r} (use LARGURAxALTURA)") from None
+    if w < 1 or h < 1:
+        raise argparse.ArgumentTypeError(f"tamanho inválido: {text!r}")
+    return w, h
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(description="ANAMARANATOR 2000 - menu gráfico e módulos")
+    parser.add_argument("--atlas", action="store_true", help="texto da interface pelo atlas de textura")
+    parser.add_argument("--profile-csv", metavar="ARQUIVO", help="grava o tempo de cada quadro em CSV")
+    parser.add_argument("--fps", type=float, metavar="N",
+                        help="limita a janela a N quadros por segundo (ritmo no painel F3 e resumo ao sair)")
+    parser.add_argument("--glcount", action="store_true",
+                        help="conta as chamadas OpenGL por quadro e função (painel F3 e tabela ao sair)")
+    headless = parser.add_argument_group("modo headless (sem janela)")
+    headless.add_argument("--headless", action="store_true", help="salva um quadro de cada cena e sai")
+    headless.add_argument("--backend", choices=offscreen.BACKENDS + ("soft",), default="auto",
+                          help="glfw: janela invisível; egl: Mesa sem display (auto escolhe); "
+                               "soft: sem OpenGL, só a cena 3D (" + ", ".join(SOFT_SCENES) + ")")
+    headless.add_argument("--scenes", help="cenas separadas por vírgula (padrão: todas as do backend)")
+    headless.add_argument("--out", default="frames", help="pasta das imagens (padrão: frames)")
+    headless.add_argument("--format", choices=offscreen.IMAGE_FORMATS, default="png")
+    headless.add_argument("--time", type=float, default=6.0, help="segundos de animação da iluminação")
+    headless.add_argument("--size", type=_size, metavar="LxA",
+                          help="só com --backend soft: tamanho dos quadros (ex.: 7680x4320)")
+    headless.add_argument("--workers", type=int, default=1, metavar="N",
+                          help="só com --backend soft: processos da rasterização (0 = um por CPU)")
+    args = parser.parse_args(argv)
+    if args.backend != "soft" and (args.size or args.workers != 1):
+        parser.error("--size e --workers só valem com --backend soft")
+    if args.workers < 0:
+        parser.error("--workers não pode ser negativo")
+    if args.fps is not None and args.fps <= 0:
+        parser.error("--fps precisa ser positivo")
+    available = SOFT_SCENES if args.backend == "soft" else HEADLESS_SCENES
+    if args.scenes is None:
+        args.scenes = list(available)
+    else:
+        args.scenes = [name.strip() for name in args.scenes.split(",") if name.strip()]
+    unknown = [name for name in args.scenes if name not in available]
+    if unknown:
+        parser.error(f"cena desconhecida: {', '.join(unknown)} (use {', '.join(available)})")
+    return args
+
+
+def main():
+    args = _parse_args(sys.argv[1:])
+    if args.atlas:
+        set_text_backend("atlas")
+    if args.headless:
+        try:
+            run_headless(args.scenes, args.out, args.format, args.backend, args.time * 0.05, args.size, args.workers)
+        except RuntimeError as exc:
+            print(exc, file=sys.stderr)
+            sys.exit(1)
+        return
+    if args.profile_csv:
+        # Um quadro por linha, com o tempo de cada fase (utils/profiler)
+        profiler.start_csv(args.profile_csv)
+    if args.fps:
+        clock.set_target_fps(args.fps)
+    if args.glcount:
+        # Os módulos são importados antes: a contagem troca as funções gl* já importadas
+        for module_name in MODULES.values():
+            importlib.import_module(module_name)
+        glcount.install(glcount.MODULES + (__name__,), callers=True)
+    # Uma janela só: o menu é a cena inicial e cada módulo entra como cena (utils/host)
+    try:
+        opened = host.run(sys.modules[__name__])
+    finally:
+        profiler.stop_csv()
+        if glcount.active():
+            glcount.uninstall()
+            print(glcount.summary_table())
+        pacing = clock.stats() if clock.target_fps() else None
+        if pacing is not None:
+            print(
+                f"ritmo: alvo {pacing['target_fps']:g} fps, medido {pacing['fps']:.1f} fps, "
+                f"{pacing['dropped']} quadros perdidos em {pacing['frames']}, jitter médio "
+                f"{pacing['jitter_ms']['mean']:.2f} ms (p95 {pacing['jitter_ms']['p95']:.2f}, "
+                f"máx {pacing['jitter_ms']['max']:.2f})"
+            )
+    if not opened:
+        print("Falha ao inicializar GLFW ou criar a janela do menu", file=sys.stderr)
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -1,88 +1,97 @@
 """Modulo 4 - Iluminacao com visual padronizado aos demais modulos."""
+import sys
 import glfw
 from OpenGL.GL import (
     GL_COLOR_BUFFER_BIT, GL_DEPTH_BUFFER_BIT, GL_DEPTH_TEST,
     GL_LIGHTING, GL_LIGHT0, GL_NORMALIZE,
-    GL_QUADS, GL_TRIANGLES, GL_LINES,
+    GL_QUADS, GL_LINES,
     GL_AMBIENT, GL_DIFFUSE, GL_SPECULAR, GL_POSITION,
     GL_FLAT, GL_SMOOTH,
     GL_PROJECTION, GL_MODELVIEW,
     GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE,
     glClear, glClearColor, glLoadIdentity, glMatrixMode,
-    glViewport, glOrtho, glEnable, glDisable, glShadeModel,
+    glViewport, glOrtho, glEnable, glDisable, glShadeModel, glLoadMatrixf,
     glLightfv, glMaterialfv, glColor3f,
-    glBegin, glEnd, glVertex2f, glVertex3f, glNormal3f,
+    glBegin, glEnd, glVertex2f,
     glTranslatef, glRotatef, glPushMatrix, glPopMatrix,
 )
-from OpenGL.GLU import gluLookAt, gluPerspective
 from OpenGL import GL
+from utils import clock, host, matrices, profiler, softraster
 from utils.hud import draw_text_2d, text_width
+from utils.loader import list_models, model_name
+from utils.mesh import Mesh
+from utils.overlay import draw_retained
 from utils.panel import draw_back_button, hit_test, BACK_MARGIN, BACK_BUTTON_W
 from utils.shapes import (
+    EDGE_COLOR, EDGE_LINE_WIDTH,
     draw_cube_edges, draw_pyramid_edges,
-    draw_cube_smooth, draw_pyramid_smooth,
+    draw_cube_smooth, draw_pyramid_smooth, draw_model, draw_mesh, get_mesh,
+    cube_smooth_mesh, cube_edges_mesh, pyramid_smooth_mesh, pyramid_edges_mesh, model_mesh,
 )
 
 
-def _draw_cube_flat():
-    glBegin(GL_QUADS)
-    glNormal3f(0.0, 0.0, 1.0)
-    glVertex3f(-1.0, -1.0, 1.0)
-    glVertex3f(1.0, -1.0, 1.0)
-    glVertex3f(1.0, 1.0, 1.0)
-    glVertex3f(-1.0, 1.0, 1.0)
-    glNormal3f(0.0, 0.0, -1.0)
-    glVertex3f(-1.0, -1.0, -1.0)
-    glVertex3f(-1.0, 1.0, -1.0)
-    glVertex3f(1.0, 1.0, -1.0)
-    glVertex3f(1.0, -1.0, -1.0)
-    glNormal3f(0.0, 1.0, 0.0)
-    glVertex3f(-1.0, 1.0, -1.0)
-    glVertex3f(-1.0, 1.0, 1.0)
-    glVertex3f(1.0, 1.0, 1.0)
-    glVertex3f(1.0, 1.0, -1.0)
-    glNormal3f(0.0, -1.0, 0.0)
-    glVertex3f(-1.0, -1.0, -1.0)
-    glVertex3f(1.0, -1.0, -1.0)
-    glVertex3f(1.0, -1.0, 1.0)
-    glVertex3f(-1.0, -1.0, 1.0)
-    glNormal3f(1.0, 0.0, 0.0)
-    glVertex3f(1.0, -1.0, -1.0)
-    glVertex3f(1.0, 1.0, -1.0)
-    glVertex3f(1.0, 1.0, 1.0)
-    glVertex3f(1.0, -1.0, 1.0)
-    glNormal3f(-1.0, 0.0, 0.0)
-    glVertex3f(-1.0, -1.0, -1.0)
-    glVertex3f(-1.0, -1.0, 1.0)
-    glVertex3f(-1.0, 1.0, 1.0)
-    glVertex3f(-1.0, 1.0, -1.0)
-    glEnd()
+# Geometria do modo FLAT: (normal, vértices) por face, com as normais de sempre (as laterais
+# da pirâmide usam normais aproximadas, que GL_NORMALIZE só normaliza)
+_FLAT_CUBE = [
+    ((0.0, 0.0, 1.0), [(-1.0, -1.0, 1.0), (1.0, -1.0, 1.0), (1.0, 1.0, 1.0), (-1.0, 1.0, 1.0)]),
+    ((0.0, 0.0, -1.0), [(-1.0, -1.0, -1.0), (-1.0, 1.0, -1.0), (1.0, 1.0, -1.0), (1.0, -1.0, -1.0)]),
+    ((0.0, 1.0, 0.0), [(-1.0, 1.0, -1.0), (-1.0, 1.0, 1.0), (1.0, 1.0, 1.0), (1.0, 1.0, -1.0)]),
+    ((0.0, -1.0, 0.0), [(-1.0, -1.0, -1.0), (1.0, -1.0, -1.0), (1.0, -1.0, 1.0), (-1.0, -1.0, 1.0)]),
+    ((1.0, 0.0, 0.0), [(1.0, -1.0, -1.0), (1.0, 1.0, -1.0), (1.0, 1.0, 1.0), (1.0, -1.0, 1.0)]),
+    ((-1.0, 0.0, 0.0), [(-1.0, -1.0, -1.0), (-1.0, -1.0, 1.0), (-1.0, 1.0, 1.0), (-1.0, 1.0, -1.0)]),
+]
+_FLAT_PYRAMID = [
+    ((0.0, 0.5, 0.5), [(0.0, 1.0, 0.0), (-1.0, -1.0, 1.0), (1.0, -1.0, 1.0)]),
+    ((0.5, 0.5, 0.0), [(0.0, 1.0, 0.0), (1.0, -1.0, 1.0), (1.0, -1.0, -1.0)]),
+    ((-0.5, 0.5, 0.0), [(0.0, 1.0, 0.0), (-1.0, -1.0, -1.0), (-1.0, -1.0, 1.0)]),
+    ((0.0, 0.5, -0.5), [(0.0, 1.0, 0.0), (1.0, -1.0, -1.0), (-1.0, -1.0, -1.0)]),
+]
 
 
-def _draw_pyramid_flat():
-    glBegin(GL_TRIANGLES)
-    glNormal3f(0.0, 0.5, 0.5)
-    glVertex3f(0.0, 1.0, 0.0)
-    glVertex3f(-1.0, -1.0, 1.0)
-    glVertex3f(1.0, -1.0, 1.0)
-    glNormal3f(0.5, 0.5, 0.0)
-    glVertex3f(0.0, 1.0, 0.0)
-    glVertex3f(1.0, -1.0, 1.0)
-    glVertex3f(1.0, -1.0, -1.0)
-    glNormal3f(-0.5, 0.5, 0.0)
-    glVertex3f(0.0, 1.0, 0.0)
-    glVertex3f(-1.0, -1.0, -1.0)
-    glVertex3f(-1.0, -1.0, 1.0)
-    glNormal3f(0.0, 0.5, -0.5)
-    glVertex3f(0.0, 1.0, 0.0)
-    glVertex3f(1.0, -1.0, -1.0)
-    glVertex3f(-1.0, -1.0, -1.0)
-    glEnd()
+def _face_mesh(faces):
+    """Mesh com vértices próprios em cada face e a normal dada (faces divididas em leque)."""
+    positions, normals, indices = [], [], []
+    for normal, verts in faces:
+        start = len(positions)
+        positions += verts
+        normals += [normal] * len(verts)
+        for k in range(1, len(verts) - 1):
+            indices += [start, start + k, start + k + 1]
+    return Mesh(positions, indices, normals)
+
+
+def _flat_cube_mesh():
+    return get_mesh(("iluminacao", "cube_flat"), lambda: _face_mesh(_FLAT_CUBE))
+
+
+def _flat_pyramid_mesh():
+    return get_mesh(("iluminacao", "pyramid_flat"), lambda: _face_mesh(_FLAT_PYRAMID))
 
 
 SHADING_MODES = [("flat", GL_FLAT, "FLAT"), ("smooth", GL_SMOOTH, "SMOOTH")]
-DEFAULT_STATE = {"shading_idx": 1}
+DEFAULT_STATE = {"shading_idx": 1, "model_idx": -1}
 STATE = dict(DEFAULT_STATE)
+# Modelos OBJ/PLY da pasta modelos/; model_idx -1 mostra o cubo e a pirâmide
+MODELS = []
+WINDOW_SIZE = (1180, 650)
+TITLE = "Iluminacao | Visual padronizado | Voltar ao menu"
+# Retângulos clicáveis do último quadro (abas e botão voltar)
+_RECTS = {"tabs": [], "back": []}
+CLEAR_COLOR = (0.08, 0.10, 0.14)
+LIGHT_COLORS = {
+    "ambient": (0.30, 0.30, 0.34, 1.0),
+    "diffuse": (0.88, 0.88, 0.90, 1.0),
+    "specular": (0.58, 0.58, 0.60, 1.0),
+}
+# Luz direcional definida em enter(), com a modelview identidade: fica presa à câmera
+LIGHT_POSITION = (1.0, 1.0, 1.0, 0.0)
+# O modelo carregado usa o material e o eixo de rotação do cubo
+CUBE_MATERIAL = {"ambient_diffuse": (0.25, 0.5, 0.85, 1.0), "specular": (0.5, 0.5, 0.5, 1.0), "shininess": 70.0}
+PYRAMID_MATERIAL = {"ambient_diffuse": (0.85, 0.45, 0.2, 1.0), "specular": (0.6, 0.6, 0.6, 1.0), "shininess": 80.0}
+CUBE_OFFSET, CUBE_AXIS = (-2.5, 0.0, 0.0), (1.0, 1.0, 0.0)
+PYRAMID_OFFSET, PYRAMID_AXIS = (2.5, 0.0, 0.0), (0.0, 1.0, 1.0)
+MODEL_RADIUS = 2.4
+_MATRICES = {"projection": matrices.new(), "view": matrices.new(), "cube": matrices.new(), "pyramid": matrices.new()}
 
 
 def _draw_quad(x1, y1, x2, y2):
@@ -99,23 +108,36 @@ def _tab_rects(w, h):
     tab_w = 260
     tab_h = 44
     gap = 16
-    total = len(SHADING_MODES) * tab_w + (len(SHADING_MODES) - 1) * gap
+    ids = [f"shade_{mid}" for mid, _gl, _label in SHADING_MODES] + (["model"] if MODELS else [])
+    total = len(ids) * tab_w + (len(ids) - 1) * gap
     x = (w - total) / 2
     y1 = h - 106
     y2 = y1 + tab_h
-    for i, (mid, _gl, _label) in enumerate(SHADING_MODES):
+    for i, tid in enumerate(ids):
         x1 = x + i * (tab_w + gap)
         x2 = x1 + tab_w
-        tabs.append((f"shade_{mid}", x1, y1, x2, y2))
+        tabs.append((tid, x1, y1, x2, y2))
     return tabs
 
 
+def _model_label(max_w):
+    name = model_name(MODELS[STATE["model_idx"]]) if STATE["model_idx"] >= 0 else "NENHUM"
+    label = f"MODELO: {name}"
+    while text_width(label, 2) > max_w and len(label) > 1:
+        label = label[:-1]
+    return label
+
+
 def _draw_tabs(w, h, hover_id=None):
     tabs = _tab_rects(w, h)
     active_id = SHADING_MODES[STATE["shading_idx"]][0]
     for i, (tid, x1, y1, x2, y2) in enumerate(tabs):
-        mode_id, _gl_mode, label = SHADING_MODES[i]
-        is_active = mode_id == active_id
+        if tid == "model":
+            label = _model_label(x2 - x1 - 16)
+            is_active = STATE["model_idx"] >= 0
+        else:
+            mode_id, _gl_mode, label = SHADING_MODES[i]
+            is_active = mode_id == active_id
         is_hover = tid == hover_id
         if is_active:
             glColor3f(0.30, 0.42, 0.64)
@@ -153,132 +175,216 @@ def _draw_hud(w, h):
     hud_y = BACK_MARGIN + 26
     draw_text_2d(18, h - 20, "ILUMINACAO - alterne entre FLAT e SMOOTH", 0.90, 0.92, 0.96)
     draw_text_2d(18, h - 124, f"ATIVA: {mode_name}", mode_color[0], mode_color[1], mode_color[2])
-    draw_text_2d(hud_x, hud_y + 34, "SPACE: alternar modo", 0.82, 0.86, 0.92)
+    draw_text_2d(hud_x, hud_y + 34, "SPACE: alternar modo" + ("  M: trocar modelo" if MODELS else ""), 0.82, 0.86, 0.92)
     draw_text_2d(hud_x, hud_y + 16, "Clique nas abas superiores para trocar", 0.76, 0.81, 0.89)
-    draw_text_2d(hud_x, hud_y - 2, "Objetos: cubo e piramide", 0.72, 0.78, 0.86)
+    if STATE["model_idx"] >= 0:
+        draw_text_2d(hud_x, hud_y - 2, f"Objeto: {model_name(MODELS[STATE['model_idx']])}", 0.72, 0.78, 0.86)
+    else:
+        draw_text_2d(hud_x, hud_y - 2, "Objetos: cubo e piramide", 0.72, 0.78, 0.86)
+
+
+def _next_model():
+    """Avança para o próximo modelo; depois do último volta ao cubo e à pirâmide."""
+    STATE["model_idx"] = STATE["model_idx"] + 1 if STATE["model_idx"] + 1 < len(MODELS) else -1
+
+
+def _set_material(material):
+    glMaterialfv(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE, material["ambient_diffuse"])
+    glMaterialfv(GL_FRONT_AND_BACK, GL.GL_SPECULAR, material["specular"])
+    glMaterialfv(GL_FRONT_AND_BACK, GL.GL_SHININESS, (material["shininess"],))
+
+
+def _draw_model(t):
+    """Modelo escolhido no centro, girando; o sombreamento vem do glShadeModel corrente."""
+    glPushMatrix()
+    glRotatef(t * 360.0, *CUBE_AXIS)
+    _set_material(CUBE_MATERIAL)
+    draw_model(MODELS[STATE["model_idx"]], MODEL_RADIUS)
+    glPopMatrix()
+
+
+def _draw_cube_and_pyramid(t, smooth_mode):
+    glPushMatrix()
+    glTranslatef(*CUBE_OFFSET)
+    glRotatef(t * 360.0, *CUBE_AXIS)
+    _set_material(CUBE_MATERIAL)
+    if smooth_mode:
+        draw_cube_smooth(1.0)
+    else:
+        draw_mesh(("iluminacao", "cube_flat"), lambda: _face_mesh(_FLAT_CUBE))
+    glDisable(GL_LIGHTING)
+    draw_cube_edges(1.0)
+    glEnable(GL_LIGHTING)
+    glPopMatrix()
+
+    glPushMatrix()
+    glTranslatef(*PYRAMID_OFFSET)
+    glRotatef(t * 360.0, *PYRAMID_AXIS)
+    _set_material(PYRAMID_MATERIAL)
+    if smooth_mode:
+        draw_pyramid_smooth(1.0, 2.0)
+    else:
+        draw_mesh(("iluminacao", "pyramid_flat"), lambda: _face_mesh(_FLAT_PYRAMID))
+    glDisable(GL_LIGHTING)
+    draw_pyramid_edges(1.0, 2.0)
+    glEnable(GL_LIGHTING)
+    glPopMatrix()
+
+
+def _draw_overlay(w, h, hover_id=None):
+    """Abas e textos 2D; retorna os retângulos clicáveis das abas."""
+    glDisable(GL_LIGHTING)
+    glDisable(GL_DEPTH_TEST)
+    glMatrixMode(GL_PROJECTION)
+    glPushMatrix()
+    glLoadIdentity()
+    glOrtho(0, w, 0, h, -1, 1)
+    glMatrixMode(GL_MODELVIEW)
+    glPushMatrix()
+    glLoadIdentity()
+    tabs = _draw_tabs(w, h, hover_id=hover_id)
+    _draw_hud(w, h)
+    glPopMatrix()
+    glMatrixMode(GL_PROJECTION)
+    glPopMatrix()
+    glMatrixMode(GL_MODELVIEW)
+    glEnable(GL_DEPTH_TEST)
+    glEnable(GL_LIGHTING)
+    return tabs
 
 
-def run():
+def _reset_state():
     STATE.update(DEFAULT_STATE)
+    MODELS[:] = list_models()
 
-    if not glfw.init():
-        return
-    glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 2)
-    glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 1)
-    win = glfw.create_window(1180, 650, "Iluminacao | Visual padronizado | Voltar ao menu", None, None)
-    if not win:
-        glfw.terminate()
-        return
-    glfw.make_context_current(win)
-    glClearColor(0.08, 0.10, 0.14, 1.0)
+
+def enter(win):
+    _reset_state()
+    clock.reset()
+    glClearColor(*CLEAR_COLOR, 1.0)
     glEnable(GL_DEPTH_TEST)
     glEnable(GL_NORMALIZE)
     glEnable(GL_LIGHTING)
     glEnable(GL_LIGHT0)
-    glLightfv(GL_LIGHT0, GL_AMBIENT, (0.30, 0.30, 0.34, 1.0))
-    glLightfv(GL_LIGHT0, GL_DIFFUSE, (0.88, 0.88, 0.90, 1.0))
-    glLightfv(GL_LIGHT0, GL_SPECULAR, (0.58, 0.58, 0.60, 1.0))
-    glLightfv(GL_LIGHT0, GL_POSITION, (1.0, 1.0, 1.0, 0.0))
-
-    tab_rects = []
-    back_rects = []
-
-    def on_key(window, key, scancode, action, mods):
-        if action != glfw.PRESS:
-            return
-        if key == glfw.KEY_SPACE:
-            STATE["shading_idx"] = (STATE["shading_idx"] + 1) % len(SHADING_MODES)
-
-    def on_mouse(window, button, action, mods):
-        if button != glfw.MOUSE_BUTTON_LEFT or action != glfw.PRESS:
-            return
-        x, y = glfw.get_cursor_pos(window)
-        fw, fh = glfw.get_framebuffer_size(window)
-        clicked = hit_test(x, y, fw, fh, tab_rects + back_rects)
-        if clicked == "back":
-            glfw.set_window_should_close(window, True)
-            return
-        if clicked == "shade_flat":
-            STATE["shading_idx"] = 0
-        elif clicked == "shade_smooth":
-            STATE["shading_idx"] = 1
-
-    glfw.set_key_callback(win, on_key)
-    glfw.set_mouse_button_callback(win, on_mouse)
-
-    while not glfw.window_should_close(win):
-        w, h = glfw.get_framebuffer_size(win)
-        glViewport(0, 0, w, h)
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-
-        glMatrixMode(GL_PROJECTION)
-        glLoadIdentity()
-        aspect = w / h if h else 1
-        gluPerspective(45.0, aspect, 0.1, 50.0)
-
-        glMatrixMode(GL_MODELVIEW)
-        glLoadIdentity()
-        gluLookAt(0.0, 0.0, 10.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0)
-
-        _mode_id, gl_mode, _label = SHADING_MODES[STATE["shading_idx"]]
-        glShadeModel(gl_mode)
-        t = glfw.get_time() * 0.05
-        smooth_mode = STATE["shading_idx"] == 1
-
-        glPushMatrix()
-        glTranslatef(-2.5, 0.0, 0.0)
-        glRotatef(t * 360.0, 1.0, 1.0, 0.0)
-        glMaterialfv(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE, (0.25, 0.5, 0.85, 1.0))
-        glMaterialfv(GL_FRONT_AND_BACK, GL.GL_SPECULAR, (0.5, 0.5, 0.5, 1.0))
-        glMaterialfv(GL_FRONT_AND_BACK, GL.GL_SHININESS, (70.0,))
-        if smooth_mode:
-            draw_cube_smooth(1.0)
-        else:
-            _draw_cube_flat()
-        glDisable(GL_LIGHTING)
-        draw_cube_edges(1.0)
-        glEnable(GL_LIGHTING)
-        glPopMatrix()
-
-        glPushMatrix()
-        glTranslatef(2.5, 0.0, 0.0)
-        glRotatef(t * 360.0, 0.0, 1.0, 1.0)
-        glMaterialfv(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE, (0.85, 0.45, 0.2, 1.0))
-        glMaterialfv(GL_FRONT_AND_BACK, GL.GL_SPECULAR, (0.6, 0.6, 0.6, 1.0))
-        glMaterialfv(GL_FRONT_AND_BACK, GL.GL_SHININESS, (80.0,))
-        if smooth_mode:
-            draw_pyramid_smooth(1.0, 2.0)
-        else:
-            _draw_pyramid_flat()
-        glDisable(GL_LIGHTING)
-        draw_pyramid_edges(1.0, 2.0)
-        glEnable(GL_LIGHTING)
-        glPopMatrix()
-
-        mx, my = glfw.get_cursor_pos(win)
-        hover_id = hit_test(mx, my, w, h, _tab_rects(w, h))
-
-        glDisable(GL_LIGHTING)
-        glDisable(GL_DEPTH_TEST)
-        glMatrixMode(GL_PROJECTION)
-        glPushMatrix()
-        glLoadIdentity()
-        glOrtho(0, w, 0, h, -1, 1)
-        glMatrixMode(GL_MODELVIEW)
-        glPushMatrix()
-        glLoadIdentity()
-        tab_rects = _draw_tabs(w, h, hover_id=hover_id)
-        _draw_hud(w, h)
-        glPopMatrix()
-        glMatrixMode(GL_PROJECTION)
-        glPopMatrix()
-        glMatrixMode(GL_MODELVIEW)
-        glEnable(GL_DEPTH_TEST)
-        glEnable(GL_LIGHTING)
-
-        back_rects = draw_back_button(w, h)
-
-        glfw.swap_buffers(win)
-        glfw.poll_events()
-
-    glfw.destroy_window(win)
+    glLightfv(GL_LIGHT0, GL_AMBIENT, LIGHT_COLORS["ambient"])
+    glLightfv(GL_LIGHT0, GL_DIFFUSE, LIGHT_COLORS["diffuse"])
+    glLightfv(GL_LIGHT0, GL_SPECULAR, LIGHT_COLORS["specular"])
+    glLightfv(GL_LIGHT0, GL_POSITION, LIGHT_POSITION)
+
+
+def on_key(win, key, scancode, action, mods):
+    if action != glfw.PRESS:
+        return
+    if key == glfw.KEY_SPACE:
+        STATE["shading_idx"] = (STATE["shading_idx"] + 1) % len(SHADING_MODES)
+    elif key == glfw.KEY_M and MODELS:
+        _next_model()
+
+
+def on_mouse(win, button, action, mods):
+    if button != glfw.MOUSE_BUTTON_LEFT or action != glfw.PRESS:
+        return
+    x, y = host.cursor_pos(win)
+    fw, fh = host.framebuffer_size(win)
+    clicked = hit_test(x, y, fw, fh, _RECTS["tabs"] + _RECTS["back"])
+    if clicked == "back":
+        glfw.set_window_should_close(win, True)
+        return
+    if clicked == "shade_flat":
+        STATE["shading_idx"] = 0
+    elif clicked == "shade_smooth":
+        STATE["shading_idx"] = 1
+    elif clicked == "model":
+        _next_model()
+
+
+def _camera_matrices(w, h):
+    """Projeção e câmera do quadro, as mesmas no OpenGL e no rasterizador por software."""
+    projection = matrices.make_perspective(_MATRICES["projection"], 45.0, w / h if h else 1, 0.1, 50.0)
+    view = matrices.make_look_at(_MATRICES["view"], (0.0, 0.0, 10.0), (0.0, 0.0, 0.0))
+    return projection, view
+
+
+def _draw_scene(w, h, t):
+    """Cubo e pirâmide (ou o modelo escolhido) girando; `t` é o tempo da animação."""
+    glViewport(0, 0, w, h)
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+    projection, view = _camera_matrices(w, h)
+    glMatrixMode(GL_PROJECTION)
+    glLoadMatrixf(projection)
+    glMatrixMode(GL_MODELVIEW)
+    glLoadMatrixf(view)
+
+    _mode_id, gl_mode, _label = SHADING_MODES[STATE["shading_idx"]]
+    glShadeModel(gl_mode)
+    smooth_mode = STATE["shading_idx"] == 1
+
+    if STATE["model_idx"] >= 0:
+        _draw_model(t)
+    else:
+        _draw_cube_and_pyramid(t, smooth_mode)
+
+
+def _object_matrix(name, view, offset, angle, axis):
+    m = matrices.translate(matrices.copy(_MATRICES[name], view), *offset)
+    return matrices.rotate(m, angle, *axis)
+
+
+def soft_items(w, h, t):
+    """Itens de utils/softraster com o que _draw_scene desenha, e a luz da cena."""
+    projection, view = _camera_matrices(w, h)
+    smooth_mode = STATE["shading_idx"] == 1
+    base = {"projection": projection, "viewport": (0, 0, w, h), "flat": not smooth_mode}
+    edges = {"projection": projection, "viewport": (0, 0, w, h), "color": EDGE_COLOR, "line_width": EDGE_LINE_WIDTH}
+    if STATE["model_idx"] >= 0:
+        model = _object_matrix("cube", view, (0.0, 0.0, 0.0), t * 360.0, CUBE_AXIS)
+        mesh = model_mesh(MODELS[STATE["model_idx"]], MODEL_RADIUS)
+        items = [dict(base, mesh=mesh, model_view=model, material=CUBE_MATERIAL)]
+    else:
+        cube = _object_matrix("cube", view, CUBE_OFFSET, t * 360.0, CUBE_AXIS)
+        pyramid = _object_matrix("pyramid", view, PYRAMID_OFFSET, t * 360.0, PYRAMID_AXIS)
+        items = [
+            dict(base, mesh=cube_smooth_mesh(1.0) if smooth_mode else _flat_cube_mesh(),
+                 model_view=cube, material=CUBE_MATERIAL),
+            dict(edges, mesh=cube_edges_mesh(1.0), model_view=cube),
+            dict(base, mesh=pyramid_smooth_mesh(1.0, 2.0) if smooth_mode else _flat_pyramid_mesh(),
+                 model_view=pyramid, material=PYRAMID_MATERIAL),
+            dict(edges, mesh=pyramid_edges_mesh(1.0, 2.0), model_view=pyramid),
+        ]
+    return items, [softraster.light(None, LIGHT_POSITION, LIGHT_COLORS)]
+
+
+def soft_frame(w, h, t):
+    """Quadro (h, w, 3) uint8 só da cena 3D (sem abas e textos), desenhado sem OpenGL."""
+    items, lights = soft_items(w, h, t)
+    return softraster.render((w, h), CLEAR_COLOR, items, lights)
+
+
+def hover_id(x, y, w, h):
+    return hit_test(x, y, w, h, _tab_rects(w, h))
+
+
+def draw_frame(win, w, h):
+    # Passo fixo (utils/clock): a rotação depende só do tempo, e o bench a reproduz igual
+    clock.tick(host.get_time())
+    _draw_scene(w, h, clock.render_time() * 0.05)
+    # A cena gira sempre: cada quadro pede o próximo
+    host.request_frame()
+    profiler.lap("scene")
+
+    hover = hover_id(*host.cursor_pos(win), w, h)
+
+    _RECTS["tabs"] = draw_retained(
+        "iluminacao",
+        (w, h, hover, tuple(STATE.values())),
+        lambda: _draw_overlay(w, h, hover),
+    )
+    profiler.lap("hud")
+    _RECTS["back"] = draw_back_button(w, h)
+    profiler.lap("back")
+
+
+def run():
+    """Abre o módulo sozinho, sem o menu."""
+    host.run(sys.modules[__name__])
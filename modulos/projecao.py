@@ -1,6 +1,9 @@
 """Modulo 2 - Projecao com visual padronizado ao modulo de transformacoes."""
+import sys
+import time
 from math import sqrt
 import glfw
+import numpy as np
 from OpenGL.GL import (
     GL_COLOR_BUFFER_BIT, GL_DEPTH_BUFFER_BIT, GL_DEPTH_TEST,
     GL_PROJECTION, GL_MODELVIEW, GL_QUADS, GL_LINES,
@@ -9,27 +12,88 @@ from OpenGL.GL import (
     GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE,
     glDisable, glEnable,
     glClear, glClearColor, glLoadIdentity, glMatrixMode,
-    glViewport, glOrtho,
+    glViewport, glOrtho, glLoadMatrixf,
     glLightfv, glMaterialfv, glTranslatef, glPushMatrix, glPopMatrix,
-    glBegin, glEnd, glVertex2f, glColor3f,
+    glBegin, glEnd, glVertex2f, glColor3f, glLineWidth,
 )
-from OpenGL.GLU import gluLookAt, gluPerspective
 from OpenGL import GL
-from utils.shapes import draw_cube, draw_pyramid, draw_cube_edges, draw_pyramid_edges
+from utils import bvh, host, lod, matrices, procedural, profiler, softraster
+from utils.mesh import instance_mesh
+from utils.shapes import (
+    EDGE_COLOR, EDGE_LINE_WIDTH,
+    draw_cube, draw_pyramid, draw_sphere, draw_cube_edges, draw_pyramid_edges, draw_dynamic_mesh, draw_lod,
+    cube_mesh, cube_edges_mesh, pyramid_mesh, pyramid_edges_mesh, sphere_mesh,
+)
 from utils.hud import draw_text_2d, text_width
+from utils.overlay import draw_retained
 from utils.panel import draw_back_button, hit_test, BACK_MARGIN, BACK_BUTTON_W
 
 
 DEFAULT_CAM = {"eye_x": 4, "eye_y": 2.5, "eye_z": 5, "center_x": 0, "center_y": 0, "center_z": 0}
 DEFAULT_PROJ = {"perspective": True}
 DEFAULT_ORTHO = {"dim": 5.0}
+# Cena ativa (índice em SCENE_MODES) e quantidade de objetos das geradas (índice em SCENE_COUNTS)
+DEFAULT_GEN = {"mode": 0, "count_idx": 1}
 CAM = dict(DEFAULT_CAM)
 PROJ = dict(DEFAULT_PROJ)
 ORTHO = dict(DEFAULT_ORTHO)
+GEN = dict(DEFAULT_GEN)
+WINDOW_SIZE = (1180, 650)
+TITLE = "Projecao | Visual padronizado | Voltar ao menu"
+# Retângulos clicáveis do último quadro (abas e botão voltar)
+_RECTS = {"tabs": [], "back": []}
 STEP = 0.5
 MIN_DIST = 2.0
 MAX_DIST = 25.0
 OPTIONS = [("persp", "PERSPECTIVA"), ("ortho", "ORTOGONAL")]
+CLEAR_COLOR = (0.08, 0.10, 0.14)
+LIGHT_COLORS = {
+    "ambient": (0.30, 0.30, 0.34, 1.0),
+    "diffuse": (0.88, 0.88, 0.90, 1.0),
+    "specular": (0.58, 0.58, 0.60, 1.0),
+}
+CUBE_MATERIAL = {"ambient_diffuse": (0.18, 0.20, 0.25, 1.0), "specular": (0.14, 0.14, 0.18, 1.0), "shininess": 22.0}
+PYRAMID_MATERIAL = {"ambient_diffuse": (0.38, 0.63, 0.92, 1.0), "specular": (0.42, 0.42, 0.42, 1.0), "shininess": 62.0}
+SPHERE_MATERIAL = {"ambient_diffuse": (0.62, 0.50, 0.38, 1.0), "specular": (0.30, 0.30, 0.30, 1.0), "shininess": 40.0}
+PYRAMID_OFFSET = (1.8, 0.0, -0.8)
+# Tipos de objeto: desenho no OpenGL, malhas (caixa envolvente, LOD e utils/softraster) e
+# material. A esfera (só nas cenas geradas) não tem arestas
+KINDS = (
+    {
+        "draw": lambda: draw_cube(0.5), "edges": lambda: draw_cube_edges(0.5),
+        "mesh": lambda: cube_mesh(0.5), "edges_mesh": lambda: cube_edges_mesh(0.5),
+        "material": CUBE_MATERIAL,
+    },
+    {
+        "draw": lambda: draw_pyramid(0.55, 1.0), "edges": lambda: draw_pyramid_edges(0.55, 1.0),
+        "mesh": lambda: pyramid_mesh(0.55, 1.0), "edges_mesh": lambda: pyramid_edges_mesh(0.55, 1.0),
+        "material": PYRAMID_MATERIAL,
+    },
+    {
+        "draw": lambda: draw_sphere(0.5), "edges": None,
+        "mesh": lambda: sphere_mesh(0.5), "edges_mesh": None,
+        "material": SPHERE_MATERIAL,
+    },
+)
+# Cenas (tecla G): a básica, com o cubo e a pirâmide, e as geradas por utils/procedural
+SCENE_MODES = (("BASICA", None), ("GRADE", procedural.grid), ("AGLOMERADOS", procedural.clusters))
+SCENE_COUNTS = (1000, 10000, 100000, 1000000)
+BASIC_KINDS = np.array([0, 1], dtype=np.uint8)
+BASIC_POSITIONS = np.array([(0.0, 0.0, 0.0), PYRAMID_OFFSET], dtype=np.float32)
+# Até quantos objetos visíveis cada um é desenhado com a própria matriz; acima disso os
+# visíveis de cada tipo e nível de LOD viram uma malha só (um glDrawElements cada)
+DRAW_EACH_MAX = 64
+# Objetos da cena em arrays planos (tipo em KINDS e posição) e a BVH das caixas. "key" diz
+# de que cena são; gen_ms e bvh_ms são os tempos da última geração
+SCENE = {"key": None, "kind": None, "position": None, "bvh": None, "gen_ms": 0.0, "bvh_ms": 0.0}
+# Objetos desenhados e descartados pelo frustum no último quadro e tempo do descarte (HUD;
+# o tempo mostrado é atualizado a cada CULL_REFRESH_S segundos)
+CULL = {"drawn": 0, "culled": 0, "ms": 0.0, "shown_ms": 0.0, "shown_at": None}
+CULL_REFRESH_S = 0.5
+# Triângulos dos objetos desenhados no último quadro, sem e com LOD (HUD)
+LOD = {"before": 0, "after": 0}
+# Projeção e câmera, recalculadas a cada quadro sem alocar
+_MATRICES = {"projection": matrices.new(), "view": matrices.new()}
 
 
 def _draw_quad(x1, y1, x2, y2):
@@ -182,6 +246,21 @@ def _draw_hud(w, h):
     hud_y = BACK_MARGIN + 26
     draw_text_2d(18, h - 20, "PROJECAO - selecione modo por clique ou tecla P", 0.90, 0.92, 0.96)
     draw_text_2d(18, h - 124, f"ATIVA: {mode_name}", 0.82, 0.86, 0.92)
+    draw_text_2d(
+        18, h - 142,
+        f"OBJETOS: {CULL['drawn']} DESENHADOS / {CULL['culled']} DESCARTADOS | CULLING {CULL['shown_ms']:.2f} MS",
+        0.72, 0.78, 0.86,
+    )
+    mode_label = SCENE_MODES[GEN["mode"]][0]
+    if SCENE_MODES[GEN["mode"]][1] is None:
+        scene_text = f"CENA: {mode_label} | G: cenas geradas (grade, aglomerados)"
+    else:
+        scene_text = (
+            f"CENA: {mode_label} {SCENE_COUNTS[GEN['count_idx']]} | GERADA EM {SCENE['gen_ms']:.0f} MS"
+            f" | BVH {SCENE['bvh_ms']:.0f} MS | G: trocar cena | +/-: quantidade"
+        )
+    draw_text_2d(18, h - 160, scene_text, 0.72, 0.78, 0.86)
+    draw_text_2d(18, h - 178, f"TRIANGULOS: {LOD['before']} SEM LOD / {LOD['after']} COM LOD", 0.72, 0.78, 0.86)
     draw_text_2d(hud_x, hud_y + 34, "SETAS: navegar (cima/baixo/esquerda/direita)", 0.82, 0.86, 0.92)
     draw_text_2d(hud_x, hud_y + 16, "PAGEUP/PAGEDOWN: subir/descer  |  P: alternar perspectiva/ortogonal", 0.76, 0.81, 0.89)
     if not PROJ["perspective"]:
@@ -197,148 +276,312 @@ def _draw_hud(w, h):
     )
 
 
-def _draw_scene(w, h):
-    glViewport(0, 0, w, h)
-    glMatrixMode(GL_PROJECTION)
-    glLoadIdentity()
+def _camera_matrices(w, h):
+    """Projeção e câmera do quadro, as mesmas no OpenGL e no rasterizador por software."""
+    projection = _MATRICES["projection"]
     aspect = w / h if h else 1
     if PROJ["perspective"]:
-        gluPerspective(45.0, aspect, 0.1, 100.0)
+        matrices.make_perspective(projection, 45.0, aspect, 0.1, 100.0)
     else:
         dim = ORTHO["dim"]
         if aspect >= 1:
-            glOrtho(-dim * aspect, dim * aspect, -dim, dim, 0.1, 100.0)
+            matrices.make_ortho(projection, -dim * aspect, dim * aspect, -dim, dim, 0.1, 100.0)
+        else:
+            matrices.make_ortho(projection, -dim, dim, -dim / aspect, dim / aspect, 0.1, 100.0)
+    view = matrices.make_look_at(
+        _MATRICES["view"],
+        (CAM["eye_x"], CAM["eye_y"], CAM["eye_z"]),
+        (CAM["center_x"], CAM["center_y"], CAM["center_z"]),
+    )
+    return projection, view
+
+
+def _light_position():
+    """Luz pontual acima e atrás do olho (coordenadas do mundo)."""
+    return (CAM["eye_x"] + 2, CAM["eye_y"] + 2, CAM["eye_z"] + 2, 1.0)
+
+
+def _set_material(material):
+    glMaterialfv(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE, material["ambient_diffuse"])
+    glMaterialfv(GL_FRONT_AND_BACK, GL_SPECULAR, material["specular"])
+    glMaterialfv(GL_FRONT_AND_BACK, GL.GL_SHININESS, (material["shininess"],))
+
+
+def _scene_bvh():
+    """BVH das caixas envolventes dos objetos (a da malha do tipo, deslocada pela posição),
+    refeita com os objetos quando a cena ou a quantidade muda."""
+    name, generate = SCENE_MODES[GEN["mode"]]
+    key = (name, None) if generate is None else (name, SCENE_COUNTS[GEN["count_idx"]])
+    if SCENE["key"] != key:
+        started = time.perf_counter()
+        if generate is None:
+            kinds, positions = BASIC_KINDS, BASIC_POSITIONS
         else:
-            glOrtho(-dim, dim, -dim / aspect, dim / aspect, 0.1, 100.0)
+            kinds, positions = generate(key[1], len(KINDS))
+        generated = time.perf_counter()
+        bounds = np.array([
+            (kind["mesh"]().positions.min(axis=0), kind["mesh"]().positions.max(axis=0)) for kind in KINDS
+        ])
+        SCENE.update(
+            key=key, kind=kinds, position=positions,
+            bvh=bvh.build(bounds[kinds, 0] + positions, bounds[kinds, 1] + positions),
+            gen_ms=(generated - started) * 1000.0, bvh_ms=(time.perf_counter() - generated) * 1000.0,
+        )
+    return SCENE["bvh"]
+
+
+def _visible(projection, view):
+    """Índices dos objetos que tocam o tronco de visão; atualiza a contagem do HUD."""
+    tree = _scene_bvh()
+    started = time.perf_counter()
+    visible = bvh.cull(tree, bvh.frustum_planes(projection, view))
+    CULL["ms"] = (time.perf_counter() - started) * 1000.0
+    now = time.perf_counter()
+    if CULL["shown_at"] is None or now - CULL["shown_at"] >= CULL_REFRESH_S:
+        CULL["shown_ms"], CULL["shown_at"] = CULL["ms"], now
+    CULL["drawn"] = len(visible)
+    CULL["culled"] = len(SCENE["kind"]) - len(visible)
+    return visible
+
+
+def _levels(visible, projection, view, h):
+    """Nível de LOD (utils/lod) de cada objeto visível, pelo tamanho projetado na câmera e
+    na projeção do quadro (em ortogonal, pelo ORTHO["dim"]); atualiza os triângulos do HUD."""
+    kinds = SCENE["kind"][visible]
+    scale = lod.pixels_per_unit(projection, view, SCENE["position"][visible], h)
+    levels = np.zeros(len(visible), dtype=np.intp)
+    before = after = 0
+    for index in np.unique(kinds):
+        lods = lod.chain(KINDS[index]["mesh"]())
+        mine = kinds == index
+        levels[mine] = lod.select(lods, scale[mine])
+        before += int(lods["triangles"][0]) * int(mine.sum())
+        after += int(lods["triangles"][levels[mine]].sum())
+    LOD.update(before=before, after=after)
+    return levels
+
+
+def _groups(visible, levels):
+    """(tipo em KINDS, nível de LOD, objetos) de cada combinação que aparece no quadro."""
+    # Nível 0 (original) mais um por tamanho de célula
+    stride = len(lod.LOD_CELLS) + 1
+    keys = SCENE["kind"][visible].astype(np.intp) * stride + levels
+    return [(int(key) // stride, int(key) % stride, visible[keys == key]) for key in np.unique(keys)]
+
+
+def _batch(kind_index, level, objects, edges=False):
+    """Uma cópia da malha do tipo no nível `level` (ou das arestas) em cada objeto, num Mesh só."""
+    mats = np.broadcast_to(matrices.new(), (len(objects), 4, 4)).copy()
+    mats[:, 3, :3] = SCENE["position"][objects]
+    kind = KINDS[kind_index]
+    mesh = kind["edges_mesh"]() if edges else lod.chain(kind["mesh"]())["meshes"][level]
+    return instance_mesh(mesh, mats)
+
+
+def _draw_batches(groups, w, h):
+    """Objetos de cada tipo e nível num glDrawElements (mais um das arestas, só no nível
+    completo); as malhas só são remontadas quando a câmera, a projeção ou a cena mudam."""
+    version = (SCENE["key"], tuple(CAM.values()), PROJ["perspective"], ORTHO["dim"], w, h)
+    for index, level, objects in groups:
+        _set_material(KINDS[index]["material"])
+        draw_dynamic_mesh(("projecao", index, level), version, lambda: _batch(index, level, objects))
+        if KINDS[index]["edges"] is None or level:
+            continue
+        glDisable(GL_LIGHTING)
+        glLineWidth(EDGE_LINE_WIDTH)
+        glColor3f(*EDGE_COLOR)
+        draw_dynamic_mesh(("projecao", index, "edges"), version, lambda: _batch(index, level, objects, edges=True))
+        glLineWidth(1.0)
+        glEnable(GL_LIGHTING)
+
 
+def _draw_scene(w, h):
+    glViewport(0, 0, w, h)
+    projection, view = _camera_matrices(w, h)
+    glMatrixMode(GL_PROJECTION)
+    glLoadMatrixf(projection)
     glMatrixMode(GL_MODELVIEW)
-    glLoadIdentity()
-    gluLookAt(
-        CAM["eye_x"], CAM["eye_y"], CAM["eye_z"],
-        CAM["center_x"], CAM["center_y"], CAM["center_z"],
-        0, 1, 0,
-    )
-    glLightfv(GL_LIGHT0, GL_POSITION, (CAM["eye_x"] + 2, CAM["eye_y"] + 2, CAM["eye_z"] + 2, 1.0))
+    glLoadMatrixf(view)
+    glLightfv(GL_LIGHT0, GL_POSITION, _light_position())
 
-    glPushMatrix()
-    glMaterialfv(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE, (0.18, 0.20, 0.25, 1.0))
-    glMaterialfv(GL_FRONT_AND_BACK, GL_SPECULAR, (0.14, 0.14, 0.18, 1.0))
-    glMaterialfv(GL_FRONT_AND_BACK, GL.GL_SHININESS, (22.0,))
-    draw_cube(0.5)
-    glDisable(GL_LIGHTING)
-    glColor3f(0.36, 0.40, 0.48)
-    draw_cube_edges(0.5)
-    glEnable(GL_LIGHTING)
-    glPopMatrix()
+    visible = _visible(projection, view)
+    levels = _levels(visible, projection, view, h)
+    if len(visible) > DRAW_EACH_MAX:
+        _draw_batches(_groups(visible, levels), w, h)
+        return
+    for i, level in zip(visible, levels):
+        kind = KINDS[SCENE["kind"][i]]
+        x, y, z = SCENE["position"][i]
+        _set_material(kind["material"])
+        glPushMatrix()
+        glTranslatef(x, y, z)
+        if level:
+            draw_lod(lod.chain(kind["mesh"]()), level)
+        else:
+            kind["draw"]()
+        if kind["edges"] is not None and not level:
+            glDisable(GL_LIGHTING)
+            kind["edges"]()
+            glEnable(GL_LIGHTING)
+        glPopMatrix()
 
-    glMaterialfv(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE, (0.38, 0.63, 0.92, 1.0))
-    glMaterialfv(GL_FRONT_AND_BACK, GL_SPECULAR, (0.42, 0.42, 0.42, 1.0))
-    glMaterialfv(GL_FRONT_AND_BACK, GL.GL_SHININESS, (62.0,))
-    glPushMatrix()
-    glTranslatef(1.8, 0.0, -0.8)
-    draw_pyramid(0.55, 1.0)
+
+def soft_items(w, h):
+    """Itens de utils/softraster com o que _draw_scene desenha, e a luz da cena."""
+    projection, view = _camera_matrices(w, h)
+    base = {"projection": projection, "viewport": (0, 0, w, h)}
+    edges = dict(base, color=EDGE_COLOR, line_width=EDGE_LINE_WIDTH)
+    items = []
+    visible = _visible(projection, view)
+    levels = _levels(visible, projection, view, h)
+    if len(visible) > DRAW_EACH_MAX:
+        for index, level, objects in _groups(visible, levels):
+            material = KINDS[index]["material"]
+            items.append(dict(base, mesh=_batch(index, level, objects), model_view=view, material=material))
+            if KINDS[index]["edges_mesh"] is not None and not level:
+                items.append(dict(edges, mesh=_batch(index, level, objects, edges=True), model_view=view))
+        return items, [softraster.light(view, _light_position(), LIGHT_COLORS)]
+    for i, level in zip(visible, levels):
+        kind = KINDS[SCENE["kind"][i]]
+        model_view = matrices.translate(view.copy(), *SCENE["position"][i])
+        mesh = lod.chain(kind["mesh"]())["meshes"][level]
+        items.append(dict(base, mesh=mesh, model_view=model_view, material=kind["material"]))
+        if kind["edges_mesh"] is not None and not level:
+            items.append(dict(edges, mesh=kind["edges_mesh"](), model_view=model_view))
+    return items, [softraster.light(view, _light_position(), LIGHT_COLORS)]
+
+
+def soft_frame(w, h):
+    """Quadro (h, w, 3) uint8 só da cena 3D (sem abas e textos), desenhado sem OpenGL."""
+    items, lights = soft_items(w, h)
+    return softraster.render((w, h), CLEAR_COLOR, items, lights)
+
+
+def _draw_overlay(w, h, hover_mode=None):
+    """Abas e textos 2D; retorna os retângulos clicáveis das abas."""
     glDisable(GL_LIGHTING)
-    draw_pyramid_edges(0.55, 1.0)
-    glEnable(GL_LIGHTING)
+    glDisable(GL_DEPTH_TEST)
+    glMatrixMode(GL_PROJECTION)
+    glPushMatrix()
+    glLoadIdentity()
+    glOrtho(0, w, 0, h, -1, 1)
+    glMatrixMode(GL_MODELVIEW)
+    glPushMatrix()
+    glLoadIdentity()
+    tabs = _draw_mode_tabs(w, h, hover_mode=hover_mode)
+    _draw_hud(w, h)
     glPopMatrix()
+    glMatrixMode(GL_PROJECTION)
+    glPopMatrix()
+    glMatrixMode(GL_MODELVIEW)
+    glEnable(GL_DEPTH_TEST)
+    glEnable(GL_LIGHTING)
+    return tabs
 
 
-def run():
+def _reset_state():
     CAM.update(DEFAULT_CAM)
     PROJ.update(DEFAULT_PROJ)
     ORTHO.update(DEFAULT_ORTHO)
-
-    if not glfw.init():
-        return
-    glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 2)
-    glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 1)
-    win = glfw.create_window(1180, 650, "Projecao | Visual padronizado | Voltar ao menu", None, None)
-    if not win:
-        glfw.terminate()
-        return
-    glfw.make_context_current(win)
-    glClearColor(0.08, 0.10, 0.14, 1.0)
+    GEN.update(DEFAULT_GEN)
+    CULL["shown_at"] = None
+
+
+def set_scene(mode, count=None):
+    """Escolhe a cena pelo nome em SCENE_MODES (ex.: "grade") e a quantidade, que precisa
+    estar em SCENE_COUNTS; usada pelo bench.py. ValueError se não existir."""
+    names = [name.lower() for name, _generate in SCENE_MODES]
+    if mode.lower() not in names:
+        raise ValueError(f"cena desconhecida: {mode!r} (use {', '.join(names)})")
+    GEN["mode"] = names.index(mode.lower())
+    if count is not None:
+        if count not in SCENE_COUNTS:
+            raise ValueError(f"quantidade {count} fora de {', '.join(map(str, SCENE_COUNTS))}")
+        GEN["count_idx"] = SCENE_COUNTS.index(count)
+
+
+def enter(win):
+    _reset_state()
+    glClearColor(*CLEAR_COLOR, 1.0)
     glEnable(GL_DEPTH_TEST)
     glEnable(GL_NORMALIZE)
     glEnable(GL_LIGHTING)
     glEnable(GL_LIGHT0)
-    glLightfv(GL_LIGHT0, GL_AMBIENT, (0.30, 0.30, 0.34, 1.0))
-    glLightfv(GL_LIGHT0, GL_DIFFUSE, (0.88, 0.88, 0.90, 1.0))
-    glLightfv(GL_LIGHT0, GL_SPECULAR, (0.58, 0.58, 0.60, 1.0))
+    glLightfv(GL_LIGHT0, GL_AMBIENT, LIGHT_COLORS["ambient"])
+    glLightfv(GL_LIGHT0, GL_DIFFUSE, LIGHT_COLORS["diffuse"])
+    glLightfv(GL_LIGHT0, GL_SPECULAR, LIGHT_COLORS["specular"])
 
-    tab_rects = []
-    back_rects = []
 
-    def on_key(window, key, scancode, action, mods):
-        if action not in (glfw.PRESS, glfw.REPEAT):
-            return
-        if key == glfw.KEY_P:
-            _move_camera("proj")
-        elif key == glfw.KEY_UP:
-            _move_camera("frente")
-        elif key == glfw.KEY_DOWN:
-            _move_camera("tras")
-        elif key == glfw.KEY_LEFT:
-            _move_camera("esq")
-        elif key == glfw.KEY_RIGHT:
-            _move_camera("dir")
-        elif key == glfw.KEY_PAGE_UP:
-            _move_camera("cima")
-        elif key == glfw.KEY_PAGE_DOWN:
-            _move_camera("baixo")
-
-    def on_mouse(window, button, action, mods):
-        if button != glfw.MOUSE_BUTTON_LEFT or action != glfw.PRESS:
-            return
-        x, y = glfw.get_cursor_pos(window)
-        fw, fh = glfw.get_framebuffer_size(window)
-        clicked = hit_test(x, y, fw, fh, tab_rects + back_rects)
-        if clicked == "back":
-            glfw.set_window_should_close(window, True)
-            return
-        if clicked == "proj_persp":
-            _move_camera("persp")
-        elif clicked == "proj_ortho":
-            _move_camera("ortho")
+def on_key(win, key, scancode, action, mods):
+    if action not in (glfw.PRESS, glfw.REPEAT):
+        return
+    if key == glfw.KEY_P:
+        _move_camera("proj")
+    elif key == glfw.KEY_G and action == glfw.PRESS:
+        GEN["mode"] = (GEN["mode"] + 1) % len(SCENE_MODES)
+    elif key in (glfw.KEY_EQUAL, glfw.KEY_KP_ADD, glfw.KEY_MINUS, glfw.KEY_KP_SUBTRACT) and action == glfw.PRESS:
+        step = 1 if key in (glfw.KEY_EQUAL, glfw.KEY_KP_ADD) else -1
+        GEN["count_idx"] = min(max(GEN["count_idx"] + step, 0), len(SCENE_COUNTS) - 1)
+    elif key == glfw.KEY_UP:
+        _move_camera("frente")
+    elif key == glfw.KEY_DOWN:
+        _move_camera("tras")
+    elif key == glfw.KEY_LEFT:
+        _move_camera("esq")
+    elif key == glfw.KEY_RIGHT:
+        _move_camera("dir")
+    elif key == glfw.KEY_PAGE_UP:
+        _move_camera("cima")
+    elif key == glfw.KEY_PAGE_DOWN:
+        _move_camera("baixo")
+
+
+def on_mouse(win, button, action, mods):
+    if button != glfw.MOUSE_BUTTON_LEFT or action != glfw.PRESS:
+        return
+    x, y = host.cursor_pos(win)
+    fw, fh = host.framebuffer_size(win)
+    clicked = hit_test(x, y, fw, fh, _RECTS["tabs"] + _RECTS["back"])
+    if clicked == "back":
+        glfw.set_window_should_close(win, True)
+        return
+    if clicked == "proj_persp":
+        _move_camera("persp")
+    elif clicked == "proj_ortho":
+        _move_camera("ortho")
 
-    glfw.set_key_callback(win, on_key)
-    glfw.set_mouse_button_callback(win, on_mouse)
 
-    while not glfw.window_should_close(win):
-        w, h = glfw.get_framebuffer_size(win)
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+def hover_id(x, y, w, h):
+    return hit_test(x, y, w, h, _mode_tab_rects(w, h))
 
-        _draw_scene(w, h)
 
-        mx, my = glfw.get_cursor_pos(win)
-        hover_bid = hit_test(mx, my, w, h, _mode_tab_rects(w, h))
-        hover_mode = None
-        if hover_bid == "proj_persp":
-            hover_mode = "persp"
-        elif hover_bid == "proj_ortho":
-            hover_mode = "ortho"
+def draw_frame(win, w, h):
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
 
-        glDisable(GL_LIGHTING)
-        glDisable(GL_DEPTH_TEST)
-        glMatrixMode(GL_PROJECTION)
-        glPushMatrix()
-        glLoadIdentity()
-        glOrtho(0, w, 0, h, -1, 1)
-        glMatrixMode(GL_MODELVIEW)
-        glPushMatrix()
-        glLoadIdentity()
-        tab_rects = _draw_mode_tabs(w, h, hover_mode=hover_mode)
-        _draw_hud(w, h)
-        glPopMatrix()
-        glMatrixMode(GL_PROJECTION)
-        glPopMatrix()
-        glMatrixMode(GL_MODELVIEW)
-        glEnable(GL_DEPTH_TEST)
-        glEnable(GL_LIGHTING)
+    _draw_scene(w, h)
+    profiler.lap("scene")
+
+    hover_bid = hover_id(*host.cursor_pos(win), w, h)
+    hover_mode = None
+    if hover_bid == "proj_persp":
+        hover_mode = "persp"
+    elif hover_bid == "proj_ortho":
+        hover_mode = "ortho"
 
-        back_rects = draw_back_button(w, h)
+    _RECTS["tabs"] = draw_retained(
+        "projecao",
+        (
+            w, h, hover_mode, tuple(CAM.values()), PROJ["perspective"], ORTHO["dim"], tuple(GEN.values()),
+            CULL["drawn"], CULL["culled"], CULL["shown_ms"], SCENE["gen_ms"], SCENE["bvh_ms"],
+            LOD["before"], LOD["after"],
+        ),
+        lambda: _draw_overlay(w, h, hover_mode),
+    )
+    profiler.lap("hud")
+    _RECTS["back"] = draw_back_button(w, h)
+    profiler.lap("back")
 
-        glfw.swap_buffers(win)
-        glfw.poll_events()
 
-    glfw.destroy_window(win)
+def run():
+    """Abre o módulo sozinho, sem o menu."""
+    host.run(sys.modules[__name__])
@@ -1,5 +1,7 @@
 """Modulo 1 - Transformacoes com selecao por opcoes (1-5)."""
-import ctypes
+import os
+import sys
+import time
 import numpy as np
 import glfw
 from OpenGL.GL import (
@@ -8,32 +10,19 @@ from OpenGL.GL import (
     GL_AMBIENT, GL_DIFFUSE, GL_SPECULAR, GL_POSITION,
     GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE,
     glClear, glClearColor, glLoadIdentity, glMatrixMode,
-    glViewport, glOrtho, glTranslatef, glScalef, glRotatef, glMultMatrixf,
+    glViewport, glOrtho, glLoadMatrixf,
     glPushMatrix, glPopMatrix, glColor3f, glEnable, glDisable,
     glBegin, glEnd, glVertex2f, glLightfv, glMaterialfv,
 )
 from OpenGL import GL
-from utils.shapes import draw_cube, draw_cube_edges
+from utils import host, matrices, profiler, timeline
+from utils.mesh import instance_mesh
+from utils.shapes import cube_mesh, draw_cube, draw_cube_edges, draw_dynamic_mesh
 from utils.hud import draw_text_2d, text_width
+from utils.overlay import draw_retained
 from utils.panel import draw_back_button, hit_test, BACK_MARGIN, BACK_BUTTON_W
 
 
-def matrix_to_gl(m):
-    return (ctypes.c_float * 16)(*m.T.astype(np.float32).flatten())
-
-
-def shear_matrix(shx=0.3, shy=0.0, shz=0.0):
-    return np.array(
-        [
-            [1, shx, 0, 0],
-            [shy, 1, 0, 0],
-            [shz, 0, 1, 0],
-            [0, 0, 0, 1],
-        ],
-        dtype=np.float32,
-    )
-
-
 def _clamp(v, lo, hi):
     return max(lo, min(hi, v))
 
@@ -56,12 +45,34 @@ DEFAULT_STATE = {
     "reflection_axis": 0,
     "shx": 0.35,
     "shy": 0.12,
+    "instanced": False,
+    "instance_idx": 1,
 }
 STATE = dict(DEFAULT_STATE)
+# Campos de STATE de que as matrizes da grade dependem (_apply_option): só eles remontam o lote
+GRID_FIELDS = ("option", "tx", "ty", "scale", "rot_angle", "reflection_axis", "shx", "shy")
+WINDOW_SIZE = (1180, 650)
+TITLE = "Transformacoes | Opcoes 1-5 | Voltar ao menu"
+# Retângulos clicáveis do último quadro (abas e botão voltar)
+_RECTS = {"tabs": [], "back": []}
+# Matrizes do quadro (utils/matrices), alocadas uma vez e reescritas a cada quadro
+_MATRICES = {"view": matrices.new(), "model": matrices.new(), "part": matrices.new(), "base": matrices.new()}
+# Modo grade (tecla I): a transformação ativa aplicada a cada cubo de uma grade
+INSTANCE_COUNTS = (1000, 10000, 50000, 100000)
+GRID_EXTENT = 1.6
+GRID_CUBE_FILL = 0.45
+# Última montagem da grade: tempos (ms) das matrizes e dos vértices; deslocamentos por quantidade
+_INSTANCES = {"matrix_ms": 0.0, "vertex_ms": 0.0, "offsets": {}}
+# Trilha de quadros-chave (K grava, P toca): uma chave a cada KEY_INTERVAL_S segundos
+KEY_INTERVAL_S = 1.0
+TRACK_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "trilhas", "transformacoes.trk")
+# "start": instante (host.get_time) em que a reprodução começou, ou None parado
+_TIMELINE = {"track": timeline.new_track(), "start": None, "status": ""}
 
 
 def _reset_state():
     STATE.update(DEFAULT_STATE)
+    _TIMELINE["start"] = None
 
 
 def _draw_quad(x1, y1, x2, y2):
@@ -135,11 +146,190 @@ def _draw_hud_text(w, h):
     ref_text = "ON" if STATE["show_ref"] else "OFF"
     hud_x = BACK_MARGIN + BACK_BUTTON_W + 16
     hud_y = BACK_MARGIN + 26
+    if STATE["instanced"]:
+        count = INSTANCE_COUNTS[STATE["instance_idx"]]
+        layout = (
+            f"GRADE: {count} CUBOS | MATRIZES {_INSTANCES['matrix_ms']:.2f} MS"
+            f" | VERTICES {_INSTANCES['vertex_ms']:.2f} MS"
+        )
+        toggles = "I: sair da grade | PGUP/PGDN: quantidade | BACKSPACE: resetar tudo"
+    else:
+        layout = "ESQUERDA: REFERENCIA | DIREITA: TRANSFORMADO"
+        toggles = f"TAB: referencia ({ref_text}) | I: grade de cubos | BACKSPACE: resetar tudo"
     draw_text_2d(18, h - 20, "TRANSFORMACOES GEOMETRICAS - selecione opcao por clique ou teclas 1..5", 0.90, 0.92, 0.96)
-    draw_text_2d(18, h - 124, f"ATIVA: {active_name} | ESQUERDA: REFERENCIA | DIREITA: TRANSFORMADO", 0.82, 0.86, 0.92)
+    draw_text_2d(18, h - 124, f"ATIVA: {active_name} | {layout}", 0.82, 0.86, 0.92)
+    if not STATE["instanced"]:
+        draw_text_2d(18, h - 144, _timeline_text(), 0.72, 0.78, 0.86)
     draw_text_2d(hud_x, hud_y + 34, info, 0.82, 0.86, 0.92)
     draw_text_2d(hud_x, hud_y + 16, keys, 0.76, 0.81, 0.89)
-    draw_text_2d(hud_x, hud_y - 2, f"TAB: mostrar referencia ({ref_text}) | BACKSPACE: resetar tudo", 0.72, 0.78, 0.86)
+    draw_text_2d(hud_x, hud_y - 2, toggles, 0.72, 0.78, 0.86)
+
+
+def _timeline_text():
+    track = _TIMELINE["track"]
+    count = len(track["keys"])
+    if _TIMELINE["status"]:
+        state = _TIMELINE["status"]
+    elif _TIMELINE["start"] is not None:
+        state = f"TOCANDO {timeline.duration(track):.0f} S"
+    else:
+        state = "PARADA"
+    return f"TRILHA: {count} CHAVES ({state}) | K: GRAVAR  P: TOCAR  DEL: LIMPAR  F5/F9: SALVAR/CARREGAR"
+
+
+def _draw_overlay(w, h):
+    """Abas e textos 2D; retorna os retângulos clicáveis das abas."""
+    glDisable(GL_LIGHTING)
+    glDisable(GL_DEPTH_TEST)
+    glMatrixMode(GL_PROJECTION)
+    glPushMatrix()
+    glLoadIdentity()
+    glOrtho(0, w, 0, h, -1, 1)
+    glMatrixMode(GL_MODELVIEW)
+    glPushMatrix()
+    glLoadIdentity()
+    tabs = _draw_mode_tabs(w, h)
+    _draw_hud_text(w, h)
+    glPopMatrix()
+    glMatrixMode(GL_PROJECTION)
+    glPopMatrix()
+    glMatrixMode(GL_MODELVIEW)
+    glEnable(GL_DEPTH_TEST)
+    glEnable(GL_LIGHTING)
+    return tabs
+
+
+def _apply_option(m):
+    """Multiplica `m` pela transformação da opção escolhida (m = m · T)."""
+    option = STATE["option"]
+    if option == 0:
+        matrices.translate(m, STATE["tx"], STATE["ty"], 0.0)
+    elif option == 1:
+        matrices.scale(m, STATE["scale"], STATE["scale"], STATE["scale"])
+    elif option == 2:
+        matrices.rotate(m, STATE["rot_angle"], 0, 1, 0)
+    elif option == 3:
+        matrices.reflect(m, STATE["reflection_axis"])
+    elif option == 4:
+        matrices.shear(m, STATE["shx"], STATE["shy"], 0.0)
+
+
+def _current_key(time_s):
+    """Quadro-chave com a transformação da opção ativa (as outras ficam na identidade)."""
+    option = STATE["option"]
+    if option == 0:
+        return timeline.make_key(time_s, translate=(STATE["tx"], STATE["ty"], 0.0))
+    if option == 1:
+        return timeline.make_key(time_s, scale=(STATE["scale"],) * 3)
+    if option == 2:
+        return timeline.make_key(time_s, angle=STATE["rot_angle"])
+    if option == 3:
+        scale = [1.0, 1.0, 1.0]
+        scale[STATE["reflection_axis"]] = -1.0
+        return timeline.make_key(time_s, scale=scale)
+    return timeline.make_key(time_s, shx=STATE["shx"], shy=STATE["shy"])
+
+
+def _record_key():
+    track = _TIMELINE["track"]
+    keys = track["keys"]
+    time_s = float(keys["time"][-1]) + KEY_INTERVAL_S if len(keys) else 0.0
+    timeline.add_key(track, _current_key(time_s))
+    _TIMELINE["status"] = ""
+
+
+def _toggle_playback():
+    track = _TIMELINE["track"]
+    if _TIMELINE["start"] is not None or not len(track["keys"]):
+        _TIMELINE["start"] = None
+        return
+    # Todas as matrizes são amostradas aqui; a reprodução só indexa o array
+    timeline.sample(track)
+    _TIMELINE["start"] = host.get_time()
+    _TIMELINE["status"] = ""
+
+
+def _save_track():
+    try:
+        os.makedirs(os.path.dirname(TRACK_PATH), exist_ok=True)
+        timeline.save(_TIMELINE["track"], TRACK_PATH)
+        _TIMELINE["status"] = "SALVA"
+    except OSError as exc:
+        _TIMELINE["status"] = f"ERRO AO SALVAR: {exc.strerror}"
+
+
+def _load_track():
+    try:
+        _TIMELINE["track"] = timeline.load(TRACK_PATH)
+        _TIMELINE["status"] = "CARREGADA"
+    except (OSError, ValueError) as exc:
+        _TIMELINE["status"] = "ERRO AO CARREGAR: " + (exc.strerror if isinstance(exc, OSError) else str(exc))
+    _TIMELINE["start"] = None
+
+
+def _draw_asymmetric_object(model):
+    glLoadMatrixf(model)
+    draw_cube(0.46)
+    glDisable(GL_LIGHTING)
+    draw_cube_edges(0.46)
+    glEnable(GL_LIGHTING)
+
+    # Bloco deslocado para quebrar a simetria e evidenciar espelhamento
+    part = matrices.copy(_MATRICES["part"], model)
+    matrices.translate(part, 0.62, 0.34, 0.22)
+    matrices.scale(part, 0.48, 0.48, 0.48)
+    glLoadMatrixf(part)
+    draw_cube(0.46)
+    glDisable(GL_LIGHTING)
+    draw_cube_edges(0.46)
+    glEnable(GL_LIGHTING)
+
+
+def _grid_offsets(count):
+    """Centros dos `count` cubos numa grade k x k x k (k = raiz cúbica arredondada para cima)."""
+    offsets = _INSTANCES["offsets"].get(count)
+    if offsets is None:
+        k = int(np.ceil(count ** (1.0 / 3.0) - 1e-9))
+        i = np.arange(count)
+        cells = np.stack([i % k, (i // k) % k, i // (k * k)], axis=1)
+        spacing = GRID_EXTENT / k
+        offsets = ((cells - (k - 1) / 2.0) * spacing).astype(np.float32), spacing
+        _INSTANCES["offsets"][count] = offsets
+    return offsets
+
+
+def _instance_matrices(count):
+    """Matrizes (count, 4, 4) por colunas: deslocamento na grade · transformação ativa · escala da célula."""
+    offsets, spacing = _grid_offsets(count)
+    base = matrices.load_identity(_MATRICES["base"])
+    _apply_option(base)
+    cell = spacing * GRID_CUBE_FILL
+    matrices.scale(base, cell, cell, cell)
+    # Translação à esquerda só soma à coluna de translação: uma passada para todas as instâncias
+    mats = np.broadcast_to(base, (count, 4, 4)).copy()
+    mats[:, 3, :3] += offsets
+    return mats
+
+
+def _build_grid(count):
+    started = time.perf_counter()
+    mats = _instance_matrices(count)
+    built = time.perf_counter()
+    mesh = instance_mesh(cube_mesh(0.5), mats)
+    _INSTANCES["matrix_ms"] = (built - started) * 1000.0
+    _INSTANCES["vertex_ms"] = (time.perf_counter() - built) * 1000.0
+    return mesh
+
+
+def _draw_grid(view):
+    """Todos os cubos da grade num único glDrawElements; remonta só quando a transformação muda."""
+    count = INSTANCE_COUNTS[STATE["instance_idx"]]
+    glLoadMatrixf(view)
+    glMaterialfv(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE, (0.38, 0.63, 0.92, 1.0))
+    glMaterialfv(GL_FRONT_AND_BACK, GL_SPECULAR, (0.42, 0.42, 0.42, 1.0))
+    glMaterialfv(GL_FRONT_AND_BACK, GL.GL_SHININESS, (70.0,))
+    version = (count,) + tuple(STATE[field] for field in GRID_FIELDS)
+    draw_dynamic_mesh("transformacoes_grid", version, lambda: _build_grid(count))
 
 
 def _draw_scene(w, h):
@@ -148,11 +338,14 @@ def _draw_scene(w, h):
     glLoadIdentity()
     glOrtho(-3.4, 3.4, -1.8, 1.8, -12, 12)
 
+    # Câmera: cada objeto recebe view · modelo num único glLoadMatrixf
+    view = matrices.make_translation(_MATRICES["view"], 0.0, -0.05, -5.2)
+    matrices.rotate(view, 20.0, 1, 0, 0)
+    matrices.rotate(view, -28.0, 0, 1, 0)
+    model = _MATRICES["model"]
+
     glMatrixMode(GL_MODELVIEW)
-    glLoadIdentity()
-    glTranslatef(0.0, -0.05, -5.2)
-    glRotatef(20.0, 1, 0, 0)
-    glRotatef(-28.0, 0, 1, 0)
+    glLoadMatrixf(view)
     glLightfv(GL_LIGHT0, GL_POSITION, (3.2, 3.3, 3.0, 1.0))
 
     # Eixos de referencia
@@ -167,88 +360,54 @@ def _draw_scene(w, h):
     glEnd()
     glEnable(GL_LIGHTING)
 
-    def draw_asymmetric_object():
-        glPushMatrix()
-        draw_cube(0.46)
-        glDisable(GL_LIGHTING)
-        draw_cube_edges(0.46)
-        glEnable(GL_LIGHTING)
-        glPopMatrix()
-
-        glPushMatrix()
-        # Bloco deslocado para quebrar a simetria e evidenciar espelhamento
-        glTranslatef(0.62, 0.34, 0.22)
-        glScalef(0.48, 0.48, 0.48)
-        draw_cube(0.46)
-        glDisable(GL_LIGHTING)
-        draw_cube_edges(0.46)
-        glEnable(GL_LIGHTING)
-        glPopMatrix()
+    if STATE["instanced"]:
+        _draw_grid(view)
+        return
 
     # Objeto de referencia (esquerda)
     if STATE["show_ref"]:
-        glPushMatrix()
-        glTranslatef(-1.8, 0.0, 0.0)
+        matrices.copy(model, view)
+        matrices.translate(model, -1.8, 0.0, 0.0)
         glMaterialfv(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE, (0.18, 0.2, 0.25, 1.0))
         glMaterialfv(GL_FRONT_AND_BACK, GL_SPECULAR, (0.15, 0.15, 0.2, 1.0))
         glMaterialfv(GL_FRONT_AND_BACK, GL.GL_SHININESS, (20.0,))
         if STATE["option"] == 3:
-            draw_asymmetric_object()
+            _draw_asymmetric_object(model)
         else:
+            glLoadMatrixf(model)
             draw_cube(0.5)
             glDisable(GL_LIGHTING)
             glColor3f(0.36, 0.4, 0.48)
             draw_cube_edges(0.5)
             glEnable(GL_LIGHTING)
-        glPopMatrix()
-
-    # Objeto transformado (direita)
-    glPushMatrix()
-    glTranslatef(1.2, 0.0, 0.0)
 
-    if STATE["option"] == 0:
-        glTranslatef(STATE["tx"], STATE["ty"], 0.0)
-    elif STATE["option"] == 1:
-        glScalef(STATE["scale"], STATE["scale"], STATE["scale"])
-    elif STATE["option"] == 2:
-        glRotatef(STATE["rot_angle"], 0, 1, 0)
-    elif STATE["option"] == 3:
-        axis = STATE["reflection_axis"]
-        if axis == 0:
-            glScalef(-1, 1, 1)
-        elif axis == 1:
-            glScalef(1, -1, 1)
-        else:
-            glScalef(1, 1, -1)
-    elif STATE["option"] == 4:
-        glMultMatrixf(matrix_to_gl(shear_matrix(STATE["shx"], STATE["shy"], 0.0)))
+    # Objeto transformado (direita); tocando a trilha, a matriz vem das amostras
+    matrices.copy(model, view)
+    matrices.translate(model, 1.2, 0.0, 0.0)
+    playing = _TIMELINE["start"] is not None
+    if playing:
+        track = _TIMELINE["track"]
+        frame = timeline.frame_index(track, host.get_time() - _TIMELINE["start"])
+        matrices.multiply(model, track["samples"][frame])
+    else:
+        _apply_option(model)
 
     glMaterialfv(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE, (0.38, 0.63, 0.92, 1.0))
     glMaterialfv(GL_FRONT_AND_BACK, GL_SPECULAR, (0.42, 0.42, 0.42, 1.0))
     glMaterialfv(GL_FRONT_AND_BACK, GL.GL_SHININESS, (70.0,))
-    if STATE["option"] == 3:
-        draw_asymmetric_object()
+    # O objeto assimétrico deixa rotações e reflexões da trilha visíveis
+    if STATE["option"] == 3 or playing:
+        _draw_asymmetric_object(model)
     else:
+        glLoadMatrixf(model)
         draw_cube(0.5)
         glDisable(GL_LIGHTING)
         draw_cube_edges(0.5)
         glEnable(GL_LIGHTING)
-    glPopMatrix()
 
 
-def run():
+def enter(win):
     _reset_state()
-
-    if not glfw.init():
-        return
-    glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 2)
-    glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 1)
-    win = glfw.create_window(1180, 650, "Transformacoes | Opcoes 1-5 | Voltar ao menu", None, None)
-    if not win:
-        glfw.terminate()
-        return
-    glfw.make_context_current(win)
-
     glClearColor(0.08, 0.10, 0.14, 1.0)
     glEnable(GL_DEPTH_TEST)
     glEnable(GL_NORMALIZE)
@@ -258,120 +417,134 @@ def run():
     glLightfv(GL_LIGHT0, GL_DIFFUSE, (0.88, 0.88, 0.90, 1.0))
     glLightfv(GL_LIGHT0, GL_SPECULAR, (0.58, 0.58, 0.60, 1.0))
 
-    clickable_rects = []
-    back_rects = []
-
-    def on_key(window, key, scancode, action, mods):
-        if action not in (glfw.PRESS, glfw.REPEAT):
-            return
-
-        if key == glfw.KEY_1:
-            STATE["option"] = 0
-            return
-        if key == glfw.KEY_2:
-            STATE["option"] = 1
-            return
-        if key == glfw.KEY_3:
-            STATE["option"] = 2
-            return
-        if key == glfw.KEY_4:
-            STATE["option"] = 3
-            return
-        if key == glfw.KEY_5:
-            STATE["option"] = 4
-            return
-        if key == glfw.KEY_TAB and action == glfw.PRESS:
-            STATE["show_ref"] = not STATE["show_ref"]
-            return
-        if key == glfw.KEY_BACKSPACE and action == glfw.PRESS:
-            _reset_state()
-            return
-
-        step_move = 0.08
-        step_scale = 0.06
-        step_rot = 3.0
-        step_shear_x = 0.06
-        step_shear_y = 0.04
-
-        if STATE["option"] == 0:
-            if key == glfw.KEY_UP:
-                STATE["ty"] = _clamp(STATE["ty"] + step_move, -1.2, 1.2)
-            elif key == glfw.KEY_DOWN:
-                STATE["ty"] = _clamp(STATE["ty"] - step_move, -1.2, 1.2)
-            elif key == glfw.KEY_LEFT:
-                STATE["tx"] = _clamp(STATE["tx"] - step_move, -1.5, 1.5)
-            elif key == glfw.KEY_RIGHT:
-                STATE["tx"] = _clamp(STATE["tx"] + step_move, -1.5, 1.5)
-        elif STATE["option"] == 1:
-            if key == glfw.KEY_UP:
-                STATE["scale"] = _clamp(STATE["scale"] + step_scale, 0.35, 2.8)
-            elif key == glfw.KEY_DOWN:
-                STATE["scale"] = _clamp(STATE["scale"] - step_scale, 0.35, 2.8)
-        elif STATE["option"] == 2:
-            if key == glfw.KEY_RIGHT:
-                STATE["rot_angle"] = _clamp(STATE["rot_angle"] + step_rot, -180.0, 180.0)
-            elif key == glfw.KEY_LEFT:
-                STATE["rot_angle"] = _clamp(STATE["rot_angle"] - step_rot, -180.0, 180.0)
-        elif STATE["option"] == 3:
-            if key == glfw.KEY_X and action == glfw.PRESS:
-                STATE["reflection_axis"] = 0
-            elif key == glfw.KEY_Y and action == glfw.PRESS:
-                STATE["reflection_axis"] = 1
-            elif key == glfw.KEY_Z and action == glfw.PRESS:
-                STATE["reflection_axis"] = 2
-        elif STATE["option"] == 4:
-            if key == glfw.KEY_LEFT:
-                STATE["shx"] = _clamp(STATE["shx"] - step_shear_x, -1.2, 1.2)
-            elif key == glfw.KEY_RIGHT:
-                STATE["shx"] = _clamp(STATE["shx"] + step_shear_x, -1.2, 1.2)
-            elif key == glfw.KEY_UP:
-                STATE["shy"] = _clamp(STATE["shy"] + step_shear_y, -0.9, 0.9)
-            elif key == glfw.KEY_DOWN:
-                STATE["shy"] = _clamp(STATE["shy"] - step_shear_y, -0.9, 0.9)
-
-    def on_mouse(window, button, action, mods):
-        if button != glfw.MOUSE_BUTTON_LEFT or action != glfw.PRESS:
-            return
-        x, y = glfw.get_cursor_pos(window)
-        fw, fh = glfw.get_framebuffer_size(window)
-        clicked = hit_test(x, y, fw, fh, clickable_rects + back_rects)
-        if clicked == "back":
-            glfw.set_window_should_close(window, True)
-            return
-        if clicked and clicked.startswith("opt_"):
-            idx = int(clicked.split("_")[1])
-            STATE["option"] = idx
-
-    glfw.set_key_callback(win, on_key)
-    glfw.set_mouse_button_callback(win, on_mouse)
-
-    while not glfw.window_should_close(win):
-        w, h = glfw.get_framebuffer_size(win)
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-
-        _draw_scene(w, h)
 
-        glDisable(GL_LIGHTING)
-        glDisable(GL_DEPTH_TEST)
-        glMatrixMode(GL_PROJECTION)
-        glPushMatrix()
-        glLoadIdentity()
-        glOrtho(0, w, 0, h, -1, 1)
-        glMatrixMode(GL_MODELVIEW)
-        glPushMatrix()
-        glLoadIdentity()
-        clickable_rects = _draw_mode_tabs(w, h)
-        _draw_hud_text(w, h)
-        glPopMatrix()
-        glMatrixMode(GL_PROJECTION)
-        glPopMatrix()
-        glMatrixMode(GL_MODELVIEW)
-        glEnable(GL_DEPTH_TEST)
-        glEnable(GL_LIGHTING)
+def _clear_track():
+    timeline.clear(_TIMELINE["track"])
+    _TIMELINE["start"] = None
+    _TIMELINE["status"] = ""
+
+
+_TIMELINE_KEYS = {
+    glfw.KEY_K: _record_key,
+    glfw.KEY_P: _toggle_playback,
+    glfw.KEY_DELETE: _clear_track,
+    glfw.KEY_F5: _save_track,
+    glfw.KEY_F9: _load_track,
+}
+
+
+def on_key(win, key, scancode, action, mods):
+    if action not in (glfw.PRESS, glfw.REPEAT):
+        return
 
-        back_rects = draw_back_button(w, h)
+    if key == glfw.KEY_1:
+        STATE["option"] = 0
+        return
+    if key == glfw.KEY_2:
+        STATE["option"] = 1
+        return
+    if key == glfw.KEY_3:
+        STATE["option"] = 2
+        return
+    if key == glfw.KEY_4:
+        STATE["option"] = 3
+        return
+    if key == glfw.KEY_5:
+        STATE["option"] = 4
+        return
+    if key == glfw.KEY_TAB and action == glfw.PRESS:
+        STATE["show_ref"] = not STATE["show_ref"]
+        return
+    if key == glfw.KEY_I and action == glfw.PRESS:
+        STATE["instanced"] = not STATE["instanced"]
+        return
+    if action == glfw.PRESS and key in _TIMELINE_KEYS:
+        _TIMELINE_KEYS[key]()
+        return
+    if key in (glfw.KEY_PAGE_UP, glfw.KEY_PAGE_DOWN) and action == glfw.PRESS:
+        step = 1 if key == glfw.KEY_PAGE_UP else -1
+        STATE["instance_idx"] = _clamp(STATE["instance_idx"] + step, 0, len(INSTANCE_COUNTS) - 1)
+        return
+    if key == glfw.KEY_BACKSPACE and action == glfw.PRESS:
+        _reset_state()
+        return
 
-        glfw.swap_buffers(win)
-        glfw.poll_events()
+    step_move = 0.08
+    step_scale = 0.06
+    step_rot = 3.0
+    step_shear_x = 0.06
+    step_shear_y = 0.04
 
-    glfw.destroy_window(win)
+    if STATE["option"] == 0:
+        if key == glfw.KEY_UP:
+            STATE["ty"] = _clamp(STATE["ty"] + step_move, -1.2, 1.2)
+        elif key == glfw.KEY_DOWN:
+            STATE["ty"] = _clamp(STATE["ty"] - step_move, -1.2, 1.2)
+        elif key == glfw.KEY_LEFT:
+            STATE["tx"] = _clamp(STATE["tx"] - step_move, -1.5, 1.5)
+        elif key == glfw.KEY_RIGHT:
+            STATE["tx"] = _clamp(STATE["tx"] + step_move, -1.5, 1.5)
+    elif STATE["option"] == 1:
+        if key == glfw.KEY_UP:
+            STATE["scale"] = _clamp(STATE["scale"] + step_scale, 0.35, 2.8)
+        elif key == glfw.KEY_DOWN:
+            STATE["scale"] = _clamp(STATE["scale"] - step_scale, 0.35, 2.8)
+    elif STATE["option"] == 2:
+        if key == glfw.KEY_RIGHT:
+            STATE["rot_angle"] = _clamp(STATE["rot_angle"] + step_rot, -180.0, 180.0)
+        elif key == glfw.KEY_LEFT:
+            STATE["rot_angle"] = _clamp(STATE["rot_angle"] - step_rot, -180.0, 180.0)
+    elif STATE["option"] == 3:
+        if key == glfw.KEY_X and action == glfw.PRESS:
+            STATE["reflection_axis"] = 0
+        elif key == glfw.KEY_Y and action == glfw.PRESS:
+            STATE["reflection_axis"] = 1
+        elif key == glfw.KEY_Z and action == glfw.PRESS:
+            STATE["reflection_axis"] = 2
+    elif STATE["option"] == 4:
+        if key == glfw.KEY_LEFT:
+            STATE["shx"] = _clamp(STATE["shx"] - step_shear_x, -1.2, 1.2)
+        elif key == glfw.KEY_RIGHT:
+            STATE["shx"] = _clamp(STATE["shx"] + step_shear_x, -1.2, 1.2)
+        elif key == glfw.KEY_UP:
+            STATE["shy"] = _clamp(STATE["shy"] + step_shear_y, -0.9, 0.9)
+        elif key == glfw.KEY_DOWN:
+            STATE["shy"] = _clamp(STATE["shy"] - step_shear_y, -0.9, 0.9)
+
+
+def on_mouse(win, button, action, mods):
+    if button != glfw.MOUSE_BUTTON_LEFT or action != glfw.PRESS:
+        return
+    x, y = host.cursor_pos(win)
+    fw, fh = host.framebuffer_size(win)
+    clicked = hit_test(x, y, fw, fh, _RECTS["tabs"] + _RECTS["back"])
+    if clicked == "back":
+        glfw.set_window_should_close(win, True)
+        return
+    if clicked and clicked.startswith("opt_"):
+        idx = int(clicked.split("_")[1])
+        STATE["option"] = idx
+
+
+def draw_frame(win, w, h):
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+    _draw_scene(w, h)
+    if _TIMELINE["start"] is not None:
+        # Tocando a trilha, o objeto anda a cada quadro
+        host.request_frame()
+    profiler.lap("scene")
+
+    _RECTS["tabs"] = draw_retained(
+        "transformacoes",
+        (w, h, tuple(STATE.values()), _INSTANCES["matrix_ms"], _INSTANCES["vertex_ms"], _timeline_text()),
+        lambda: _draw_overlay(w, h),
+    )
+    profiler.lap("hud")
+    _RECTS["back"] = draw_back_button(w, h)
+    profiler.lap("back")
+
+
+def run():
+    """Abre o módulo sozinho, sem o menu."""
+    host.run(sys.modules[__name__])
@@ -1,34 +1,102 @@
 """Modulo 3 - Viewport com visual padronizado aos modulos corrigidos."""
+import sys
+from math import cos, radians, sin
 import glfw
+import numpy as np
 from OpenGL.GL import (
     GL_COLOR_BUFFER_BIT, GL_DEPTH_BUFFER_BIT, GL_DEPTH_TEST,
-    GL_LIGHTING, GL_LIGHT0, GL_NORMALIZE, GL_SMOOTH,
+    GL_LIGHTING, GL_LIGHT0, GL_NORMALIZE, GL_SMOOTH, GL_SCISSOR_TEST,
     GL_AMBIENT, GL_DIFFUSE, GL_SPECULAR, GL_POSITION,
     GL_PROJECTION, GL_MODELVIEW, GL_QUADS, GL_LINES,
     GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE,
     glClear, glClearColor, glLoadIdentity, glMatrixMode,
-    glViewport, glOrtho, glColor3f,
+    glViewport, glOrtho, glColor3f, glLoadMatrixf,
     glEnable, glDisable, glPushMatrix, glPopMatrix,
-    glLightfv, glMaterialfv, glShadeModel, glRotatef,
+    glLightfv, glMaterialfv, glShadeModel, glLineWidth, glScissor,
     glBegin, glEnd, glVertex2f,
 )
-from OpenGL.GLU import gluLookAt
 from OpenGL import GL
-from utils.shapes import draw_cube_smooth, draw_pyramid, draw_cube_edges, draw_pyramid_edges
-from utils.axes import draw_axes
+from utils import host, lod, matrices, profiler, softraster, viewcache
+from utils.loader import list_models, model_name
+from utils.mesh import Mesh
+from utils.shapes import (
+    EDGE_COLOR, EDGE_LINE_WIDTH,
+    draw_mesh_views, get_mesh, cube_smooth_mesh, cube_edges_mesh, pyramid_mesh, pyramid_edges_mesh, model_mesh,
+)
 from utils.hud import draw_text_2d, draw_viewport_border, text_width
-from utils.panel import draw_back_button, hit_test, BACK_MARGIN, BACK_BUTTON_W
+from utils.overlay import draw_retained
+from utils.panel import draw_back_button, hit_test, BACK_MARGIN, BACK_BUTTON_W, BACK_BUTTON_H
 
 
-DEFAULT_STATE = {"dim": 1.6, "object_index": 1, "show_axes": True}
+DEFAULT_STATE = {"dim": 1.6, "object_index": 1, "show_axes": True, "layout": 0}
 STATE = dict(DEFAULT_STATE)
 DIM_MIN, DIM_MAX = 0.6, 3.0
 DIST = 5.0
+# (nome, malha, arestas ou None) de cada objeto
 OBJECTS = [
-    ("CUBO", lambda: draw_cube_smooth(0.5)),
-    ("PIRAMIDE", lambda: draw_pyramid(0.5, 0.8)),
+    ("CUBO", lambda: cube_smooth_mesh(0.5), lambda: cube_edges_mesh(0.5)),
+    ("PIRAMIDE", lambda: pyramid_mesh(0.5, 0.8), lambda: pyramid_edges_mesh(0.5, 0.8)),
 ]
-VIEW_LABELS = ["FRENTE", "LADO", "TOPO"]
+BUILTIN_OBJECTS = len(OBJECTS)
+CLEAR_COLOR = (0.08, 0.10, 0.14)
+LIGHT_COLORS = {
+    "ambient": (0.30, 0.30, 0.34, 1.0),
+    "diffuse": (0.88, 0.88, 0.90, 1.0),
+    "specular": (0.58, 0.58, 0.60, 1.0),
+}
+LIGHT_POSITION = (3.0, 3.0, 3.0, 1.0)
+MATERIAL = {"ambient_diffuse": (0.65, 0.7, 0.75, 1.0), "specular": (0.3, 0.3, 0.3, 1.0), "shininess": 40.0}
+AXES_SIZE, AXES_LINE_WIDTH = 0.8, 2.0
+# Vistas de câmeras paradas desenhadas em texturas e reaproveitadas (utils/viewcache)
+USE_VIEW_CACHE = True
+# Projeção, câmera e modelo da vista corrente, recalculados sem alocar
+_MATRICES = {"projection": matrices.new(), "view": matrices.new(), "model": matrices.new()}
+# Vista de cada célula do layout (viewport e matrizes), com a "key" de quando foi calculada
+_VIEWS = {}
+# Triângulos do objeto nas vistas do último quadro, sem e com LOD (HUD)
+LOD = {"before": 0, "after": 0}
+
+
+def _orbit_cameras(count, elevation):
+    """`count` câmeras em volta do objeto, a cada 360 / count graus, na mesma elevação."""
+    el = radians(elevation)
+    azimuths = [radians(360.0 * k / count) for k in range(count)]
+    return tuple(
+        {"label": f"CAM {k + 1}", "eye": (sin(az) * cos(el), sin(el), cos(az) * cos(el)), "up": (0, 1, 0)}
+        for k, az in enumerate(azimuths)
+    )
+
+
+FRONT = {"label": "FRENTE", "eye": (0, 0, 1), "up": (0, 1, 0)}
+SIDE = {"label": "LADO", "eye": (1, 0, 0), "up": (0, 1, 0)}
+TOP = {"label": "TOPO", "eye": (0, 1, 0), "up": (0, 0, -1)}
+# Layouts (tecla L): grade de colunas x linhas e a câmera de cada célula, da esquerda para a
+# direita e de cima para baixo. Câmera: direção do olho (a distância é DIST), vetor up e, se
+# tiver "orbit", o giro em graus por segundo em volta do eixo Y
+LAYOUTS = (
+    {"name": "1X3", "cols": 3, "rows": 1, "cameras": (FRONT, SIDE, TOP)},
+    {"name": "2X2", "cols": 2, "rows": 2, "cameras": (FRONT, SIDE, TOP, dict(_orbit_cameras(8, 35.0)[1], label="ISO"))},
+    {
+        "name": "4X4", "cols": 4, "rows": 4,
+        "cameras": _orbit_cameras(15, 20.0) + (dict(_orbit_cameras(1, 35.0)[0], label="ORBITA", orbit=30.0),),
+    },
+)
+# Quadros anteriores comparados no redesenho parcial: com buffer duplo, o buffer de trás pode
+# ter o último quadro (cópia) ou o penúltimo (troca de buffers)
+REDRAW_HISTORY = 2
+# Linha de baixo da ajuda (Z/O/A/L), ao lado do botão voltar
+HELP_Y = BACK_MARGIN + 26
+# Faixas do topo (título, abas e HUD) e de baixo (botão voltar e ajuda, cujo texto sobe até
+# 2 px acima da linha de cima, HELP_Y + 34) que os layouts com mais de uma fileira deixam
+# livres; os rótulos das vistas ficam logo abaixo da faixa do topo
+HUD_BAND = 160
+HUD_BOTTOM_BAND = max(BACK_MARGIN + BACK_BUTTON_H, HELP_Y + 34 + 2) + 8
+# (chave do overlay, versão de cada vista) dos últimos quadros e vistas redesenhadas no último
+_REDRAW = {"history": [], "drawn": 0}
+WINDOW_SIZE = (1180, 650)
+TITLE = "ViewPort | Visual padronizado | Voltar ao menu"
+# Retângulos clicáveis do último quadro (abas e botão voltar)
+_RECTS = {"tabs": [], "back": []}
 
 
 def _draw_quad(x1, y1, x2, y2):
@@ -40,29 +108,29 @@ def _draw_quad(x1, y1, x2, y2):
     glEnd()
 
 
-def _cameras(dist):
-    return [
-        {"eye": (0, 0, dist), "center": (0, 0, 0), "up": (0, 1, 0)},
-        {"eye": (dist, 0, 0), "center": (0, 0, 0), "up": (0, 1, 0)},
-        {"eye": (0, dist, 0), "center": (0, 0, 0), "up": (0, 0, -1)},
-    ]
+def _load_models():
+    """Acrescenta aos objetos os modelos OBJ/PLY da pasta modelos/ (carregados no primeiro desenho)."""
+    del OBJECTS[BUILTIN_OBJECTS:]
+    for path in list_models():
+        OBJECTS.append((model_name(path), lambda path=path: model_mesh(path, 0.6), None))
+
+
+def _fit_label(label, max_w):
+    while text_width(label, 2) > max_w and len(label) > 1:
+        label = label[:-1]
+    return label
 
 
 def _tab_rects(w, h):
-    tabs = []
     tab_w = 230
     tab_h = 44
     gap = 14
-    total = 3 * tab_w + 2 * gap
+    ids = ["obj_0", "obj_1"] + (["obj_model"] if len(OBJECTS) > BUILTIN_OBJECTS else []) + ["axes"]
+    total = len(ids) * tab_w + (len(ids) - 1) * gap
     x = (w - total) / 2
     y1 = h - 106
     y2 = y1 + tab_h
-    tabs.append(("obj_0", x, y1, x + tab_w, y2))
-    x2 = x + tab_w + gap
-    tabs.append(("obj_1", x2, y1, x2 + tab_w, y2))
-    x3 = x2 + tab_w + gap
-    tabs.append(("axes", x3, y1, x3 + tab_w, y2))
-    return tabs
+    return [(tid, x + i * (tab_w + gap), y1, x + i * (tab_w + gap) + tab_w, y2) for i, tid in enumerate(ids)]
 
 
 def _draw_tabs(w, h, hover_id=None):
@@ -76,6 +144,10 @@ def _draw_tabs(w, h, hover_id=None):
         elif tid == "obj_1":
             label = "OBJETO: PIRAMIDE"
             active = STATE["object_index"] == 1
+        elif tid == "obj_model":
+            active = STATE["object_index"] >= BUILTIN_OBJECTS
+            name = OBJECTS[STATE["object_index"] if active else BUILTIN_OBJECTS][0]
+            label = _fit_label(f"MODELO: {name}", x2 - x1 - 16)
         elif tid == "axes":
             label = "EIXOS: ON" if STATE["show_axes"] else "EIXOS: OFF"
             active = STATE["show_axes"]
@@ -112,66 +184,270 @@ def _draw_tabs(w, h, hover_id=None):
 def _draw_hud(w, h):
     obj_name = OBJECTS[STATE["object_index"]][0]
     hud_x = BACK_MARGIN + BACK_BUTTON_W + 16
-    hud_y = BACK_MARGIN + 26
+    hud_y = HELP_Y
     draw_text_2d(18, h - 20, "VIEWPORT - altere objeto, eixos e zoom", 0.90, 0.92, 0.96)
-    draw_text_2d(18, h - 124, f"ATIVA: {obj_name} | EIXOS {'ON' if STATE['show_axes'] else 'OFF'}", 0.82, 0.86, 0.92)
+    layout = LAYOUTS[STATE["layout"]]["name"]
+    draw_text_2d(
+        18, h - 124, f"ATIVA: {obj_name} | EIXOS {'ON' if STATE['show_axes'] else 'OFF'} | LAYOUT {layout}",
+        0.82, 0.86, 0.92,
+    )
+    draw_text_2d(18, h - 142, f"TRIANGULOS: {LOD['before']} SEM LOD / {LOD['after']} COM LOD", 0.72, 0.78, 0.86)
     draw_text_2d(hud_x, hud_y + 34, "Z: zoom in  SHIFT+Z: zoom out", 0.82, 0.86, 0.92)
-    draw_text_2d(hud_x, hud_y + 16, "O: alternar objeto  A: alternar eixos", 0.76, 0.81, 0.89)
+    draw_text_2d(hud_x, hud_y + 16, "O: alternar objeto  A: alternar eixos  L: layout", 0.76, 0.81, 0.89)
     draw_text_2d(hud_x, hud_y - 2, f"ZOOM: {STATE['dim']:.2f}", 0.72, 0.78, 0.86)
 
 
-def _draw_scene(w, h):
-    glViewport(0, 0, w, h)
-    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-    third = w // 3
+def _cell(layout, i, w, h):
+    """Viewport (x, y, largura, altura) da célula `i` do layout. Uma fileira ocupa a altura
+    toda (como as três vistas originais); grades ficam entre a faixa das abas e do HUD e a
+    do botão voltar e da ajuda."""
+    top, bottom = h, 0
+    if layout["rows"] > 1:
+        top, bottom = h - HUD_BAND, HUD_BOTTOM_BAND
+        if top - bottom < layout["rows"]:
+            # Janela baixa demais para as faixas: a grade ocupa a altura toda
+            top, bottom = h, 0
+    cell_w, cell_h = w // layout["cols"], (top - bottom) // layout["rows"]
+    col, row = i % layout["cols"], i // layout["cols"]
+    return (col * cell_w, top - (row + 1) * cell_h, cell_w, cell_h)
+
+
+def _view_matrices(layout, i, w, h, t=0.0):
+    """Viewport, projeção e câmera da célula `i`, as mesmas no OpenGL e no rasterizador por software."""
+    viewport = _cell(layout, i, w, h)
     dim = STATE["dim"]
-    cameras = _cameras(DIST)
-    draw_obj = OBJECTS[STATE["object_index"]][1]
-    light_pos = (3.0, 3.0, 3.0, 1.0)
-
-    for i in range(3):
-        x = i * third
-        glViewport(x, 0, third, h)
+    projection = _MATRICES["projection"]
+    aspect = viewport[2] / viewport[3] if viewport[3] else 1
+    if aspect >= 1:
+        matrices.make_ortho(projection, -dim * aspect, dim * aspect, -dim, dim, -12, 12)
+    else:
+        matrices.make_ortho(projection, -dim, dim, -dim / aspect, dim / aspect, -12, 12)
+    camera = layout["cameras"][i]
+    x, y, z = (DIST * c for c in camera["eye"])
+    angle = radians(camera.get("orbit", 0.0) * t)
+    eye = (x * cos(angle) + z * sin(angle), y, z * cos(angle) - x * sin(angle))
+    view = matrices.make_look_at(_MATRICES["view"], eye, (0, 0, 0), camera["up"])
+    return viewport, projection, view
+
+
+def _views(w, h):
+    """Viewport, projeção, câmera, modelo e escala na tela (utils/lod) de cada célula do
+    layout. Cada vista só é recalculada quando o layout, o zoom (STATE["dim"]), o tamanho do
+    framebuffer ou, nas câmeras que giram, o ângulo mudam; a "key" serve de versão."""
+    layout = LAYOUTS[STATE["layout"]]
+    moving = any("orbit" in camera for camera in layout["cameras"])
+    t = host.get_time() if moving else 0.0
+    views = []
+    for i, camera in enumerate(layout["cameras"]):
+        key = (STATE["layout"], i, STATE["dim"], w, h, camera.get("orbit", 0.0) * t)
+        view = _VIEWS.get(i)
+        if view is None or view["key"] != key:
+            viewport, projection, matrix = _view_matrices(layout, i, w, h, t)
+            # Cópias: as matrizes do módulo são reescritas na próxima vista
+            view = _VIEWS[i] = {
+                "key": key, "viewport": viewport, "projection": projection.copy(), "view": matrix.copy(),
+                "model": _model_matrix(matrix).copy(),
+                "scale": float(lod.pixels_per_unit(projection, matrix, (0.0, 0.0, 0.0), viewport[3])[0]),
+            }
+        views.append(view)
+    return views
+
+
+def _view_levels(lods, views):
+    """Nível de LOD (utils/lod) do objeto, centrado na origem, pelo tamanho projetado em cada vista."""
+    return [int(level) for level in lod.select(lods, [view["scale"] for view in views])]
+
+
+def _count_triangles(lods, levels):
+    LOD.update(
+        before=int(lods["triangles"][0]) * len(levels), after=int(sum(lods["triangles"][level] for level in levels)),
+    )
+
+
+def _frame(w, h):
+    """O que as vistas do quadro precisam: níveis do objeto (utils/lod), arestas, vistas e o
+    nível de cada vista; atualiza os triângulos do HUD."""
+    _name, build_mesh, build_edges = OBJECTS[STATE["object_index"]]
+    lods = lod.chain(build_mesh())
+    views = _views(w, h)
+    levels = _view_levels(lods, views)
+    _count_triangles(lods, levels)
+    return {"lods": lods, "edges": build_edges, "views": views, "levels": levels}
+
+
+def _model_matrix(view):
+    return matrices.rotate(matrices.rotate(matrices.copy(_MATRICES["model"], view), 18, 0, 1, 0), 8, 1, 0, 0)
+
+
+def _view_loader(view, matrix, lit=True):
+    """Função que carrega a vista (viewport e recorte, projeção e a matriz `matrix` da vista)
+    antes de cada desenho de draw_mesh_views."""
+    def load():
+        glViewport(*view["viewport"])
+        glScissor(*view["viewport"])
         glMatrixMode(GL_PROJECTION)
-        glLoadIdentity()
-        aspect = third / h if h else 1
-        if aspect >= 1:
-            glOrtho(-dim * aspect, dim * aspect, -dim, dim, -12, 12)
-        else:
-            glOrtho(-dim, dim, -dim / aspect, dim / aspect, -12, 12)
-
+        glLoadMatrixf(view["projection"])
         glMatrixMode(GL_MODELVIEW)
-        glLoadIdentity()
-        cam = cameras[i]
-        gluLookAt(
-            cam["eye"][0], cam["eye"][1], cam["eye"][2],
-            cam["center"][0], cam["center"][1], cam["center"][2],
-            cam["up"][0], cam["up"][1], cam["up"][2],
-        )
-        glLightfv(GL_LIGHT0, GL_POSITION, light_pos)
-        glMaterialfv(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE, (0.65, 0.7, 0.75, 1.0))
-        glMaterialfv(GL_FRONT_AND_BACK, GL_SPECULAR, (0.3, 0.3, 0.3, 1.0))
-        glMaterialfv(GL_FRONT_AND_BACK, GL.GL_SHININESS, (40.0,))
-        glShadeModel(GL_SMOOTH)
-        glPushMatrix()
-        glRotatef(18, 0, 1, 0)
-        glRotatef(8, 1, 0, 0)
-        draw_obj()
+        if lit:
+            # A posição da luz fica guardada nas coordenadas do olho: uma por câmera
+            glLoadMatrixf(view["view"])
+            glLightfv(GL_LIGHT0, GL_POSITION, LIGHT_POSITION)
+        glLoadMatrixf(view[matrix])
+    return load
+
+
+def _draw_views(meshes, loaders):
+    """Desenha meshes[i] na vista i (None pula a vista); as vistas com o mesmo Mesh saem de
+    um só draw_mesh_views, com os buffers ligados uma vez."""
+    for mesh in dict.fromkeys(mesh for mesh in meshes if mesh is not None):
+        draw_mesh_views(mesh, [load for other, load in zip(meshes, loaders) if other is mesh])
+
+
+def _versions(views):
+    """O que define os pixels de cada vista: câmera (a key de _views), objeto e eixos."""
+    return tuple((view["key"], STATE["object_index"], STATE["show_axes"]) for view in views)
+
+
+def _views_to_redraw(overlay_key, versions):
+    """Índices das vistas que mudaram em relação aos últimos REDRAW_HISTORY quadros, ou None
+    para redesenhar a janela inteira (histórico curto ou overlay diferente: textos novos
+    ficariam por cima dos antigos)."""
+    previous = _REDRAW["history"]
+    _REDRAW["history"] = (previous + [(overlay_key, versions)])[-REDRAW_HISTORY:]
+    if len(previous) < REDRAW_HISTORY or any(key != overlay_key or len(old) != len(versions) for key, old in previous):
+        return None
+    return [i for i, version in enumerate(versions) if any(old[i] != version for _key, old in previous)]
+
+
+def _draw_views_passes(views, levels, lods, build_edges):
+    """Objeto, arestas e eixos nas `views`, cada uma com o nível de LOD de `levels`."""
+    meshes = [lods["meshes"][level] for level in levels]
+    # Material e sombreamento são os mesmos em todas as vistas: vão uma vez por chamada
+    glMaterialfv(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE, MATERIAL["ambient_diffuse"])
+    glMaterialfv(GL_FRONT_AND_BACK, GL_SPECULAR, MATERIAL["specular"])
+    glMaterialfv(GL_FRONT_AND_BACK, GL.GL_SHININESS, (MATERIAL["shininess"],))
+    glShadeModel(GL_SMOOTH)
+    _draw_views(meshes, [_view_loader(view, "model") for view in views])
+    if build_edges is not None:
+        # Arestas só na malha completa: nos níveis reduzidos elas não coincidem com as faces
+        edges = build_edges()
         glDisable(GL_LIGHTING)
-        if STATE["object_index"] == 0:
-            draw_cube_edges(0.5)
-        else:
-            draw_pyramid_edges(0.5, 0.8)
+        glLineWidth(EDGE_LINE_WIDTH)
+        glColor3f(*EDGE_COLOR)
+        _draw_views(
+            [None if level else edges for level in levels], [_view_loader(view, "model", lit=False) for view in views],
+        )
+        glLineWidth(1.0)
         glEnable(GL_LIGHTING)
-        glPopMatrix()
+    if STATE["show_axes"]:
+        glLineWidth(AXES_LINE_WIDTH)
+        _draw_views([_gl_axes_mesh(mesh) for mesh in meshes], [_view_loader(view, "view") for view in views])
+        glLineWidth(1.0)
+
+
+def _cached_view(view, level, lods, build_edges):
+    """Função que desenha só a vista `view` (utils/viewcache)."""
+    return lambda: _draw_views_passes([view], [level], lods, build_edges)
+
+
+def _draw_scene(w, h, redraw=None, frame=None):
+    """Desenha as vistas do layout. Com `redraw` (índices), só essas vistas são limpas e
+    redesenhadas, cada uma recortada (glScissor) na sua célula; as outras mantêm os pixels.
+    `frame` é o _frame(w, h) já calculado no quadro (sem ele, é calculado aqui).
+
+    As vistas de câmeras paradas saem do cache de texturas (utils/viewcache), que só as
+    desenha de novo quando a versão delas (_versions) muda; as câmeras que giram mudam a cada
+    quadro e são desenhadas direto.
+    """
+    frame = frame or _frame(w, h)
+    lods, build_edges, views, levels = frame["lods"], frame["edges"], frame["views"], frame["levels"]
+    cameras = LAYOUTS[STATE["layout"]]["cameras"]
+    if redraw is None:
+        glViewport(0, 0, w, h)
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        redraw = range(len(views))
+    direct = [i for i in redraw if "orbit" in cameras[i] or not USE_VIEW_CACHE]
+    glEnable(GL_SCISSOR_TEST)
+    for i in direct if len(redraw) < len(views) else ():
+        glScissor(*views[i]["viewport"])
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+    _REDRAW["drawn"] = len(redraw)
+    versions = _versions(views)
+    viewcache.draw_cached("viewport", (w, h), [
+        (i, versions[i], views[i]["viewport"], _cached_view(views[i], levels[i], lods, build_edges))
+        for i in redraw if i not in direct
+    ])
+    if direct:
+        _draw_views_passes([views[i] for i in direct], [levels[i] for i in direct], lods, build_edges)
+    glDisable(GL_SCISSOR_TEST)
+
+
+def _axes_mesh(normal):
+    """Eixos de draw_axes como malha de linhas. Eles são desenhados com a iluminação ligada,
+    então a cor vem do material e da normal corrente (a do último vértice do objeto)."""
+    ends = np.eye(3) * AXES_SIZE
+    positions = np.zeros((6, 3))
+    positions[1::2] = ends
+    return Mesh(positions, np.arange(6), np.tile(normal, (6, 1)), primitive="lines")
+
+
+def _gl_axes_mesh(mesh):
+    """_axes_mesh com a normal do último vértice de `mesh`, guardada para o OpenGL."""
+    normal = tuple(mesh.normals[mesh.indices[-1]].tolist())
+    return get_mesh(("axes", AXES_SIZE, normal), lambda: _axes_mesh(normal))
+
+
+def soft_items(w, h):
+    """Itens de utils/softraster com o que _draw_scene desenha nas vistas do layout, e as luzes
+    comuns (nenhuma: cada vista tem a sua, pela câmera dela)."""
+    frame = _frame(w, h)
+    lods, build_edges, levels = frame["lods"], frame["edges"], frame["levels"]
+    items = []
+    for entry, level in zip(frame["views"], levels):
+        mesh = lods["meshes"][level]
+        viewport, projection, view, model = entry["viewport"], entry["projection"], entry["view"], entry["model"]
+        lights = [softraster.light(view, LIGHT_POSITION, LIGHT_COLORS)]
+        base = {"projection": projection, "viewport": viewport}
+        items.append(dict(base, mesh=mesh, model_view=model, material=MATERIAL, lights=lights))
+        if build_edges is not None and not level:
+            items.append(dict(base, mesh=build_edges(), model_view=model, color=EDGE_COLOR, line_width=EDGE_LINE_WIDTH))
         if STATE["show_axes"]:
-            draw_axes(0.8, 2.0)
+            axes = _axes_mesh(mesh.normals[mesh.indices[-1]])
+            items.append(dict(
+                base, mesh=axes, model_view=view, material=MATERIAL, line_width=AXES_LINE_WIDTH, lights=lights,
+            ))
+    return items, ()
+
+
+def soft_frame(w, h):
+    """Quadro (h, w, 3) uint8 das vistas do layout, sem OpenGL (bordas e textos ficam de fora)."""
+    items, lights = soft_items(w, h)
+    return softraster.render((w, h), CLEAR_COLOR, items, lights)
+
 
+def _draw_view_frames(w, h):
+    """Bordas das vistas do layout."""
+    layout = LAYOUTS[STATE["layout"]]
     glViewport(0, 0, w, h)
-    for i in range(3):
-        vx = i * third
-        draw_viewport_border(w, h, vx, 0, third, h)
+    for i in range(len(layout["cameras"])):
+        draw_viewport_border(w, h, *_cell(layout, i, w, h))
 
+
+def _draw_view_labels(w, h):
+    """Rótulo de cada vista no topo da própria célula (abaixo das abas e do HUD no 1X3)."""
+    layout = LAYOUTS[STATE["layout"]]
+    for i, camera in enumerate(layout["cameras"]):
+        vx, vy, vw, vh = _cell(layout, i, w, h)
+        label = camera["label"]
+        cx = vx + (vw / 2) - (text_width(label, 2) / 2)
+        draw_text_2d(cx, min(vy + vh, h - HUD_BAND) - 20, label, 0.95, 0.95, 0.90)
+
+
+def _draw_overlay(w, h, hover_id=None):
+    """Bordas das vistas, abas e textos 2D; retorna os retângulos clicáveis das abas."""
+    _draw_view_frames(w, h)
+    glDisable(GL_LIGHTING)
+    glDisable(GL_DEPTH_TEST)
     glMatrixMode(GL_PROJECTION)
     glPushMatrix()
     glLoadIdentity()
@@ -179,99 +455,95 @@ def _draw_scene(w, h):
     glMatrixMode(GL_MODELVIEW)
     glPushMatrix()
     glLoadIdentity()
-    for i in range(3):
-        cx = i * third + (third / 2) - (text_width(VIEW_LABELS[i], 2) / 2)
-        draw_text_2d(cx, h - 170, VIEW_LABELS[i], 0.95, 0.95, 0.90)
+    _draw_view_labels(w, h)
+    tabs = _draw_tabs(w, h, hover_id=hover_id)
+    _draw_hud(w, h)
     glPopMatrix()
     glMatrixMode(GL_PROJECTION)
     glPopMatrix()
     glMatrixMode(GL_MODELVIEW)
+    glEnable(GL_DEPTH_TEST)
+    glEnable(GL_LIGHTING)
+    return tabs
 
 
-def run():
+def _reset_state():
     STATE.update(DEFAULT_STATE)
+    _REDRAW["history"] = []
+    _load_models()
 
-    if not glfw.init():
-        return
-    glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 2)
-    glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 1)
-    win = glfw.create_window(1180, 650, "ViewPort | Visual padronizado | Voltar ao menu", None, None)
-    if not win:
-        glfw.terminate()
-        return
-    glfw.make_context_current(win)
-    glClearColor(0.08, 0.10, 0.14, 1.0)
+
+def enter(win):
+    _reset_state()
+    glClearColor(*CLEAR_COLOR, 1.0)
     glEnable(GL_DEPTH_TEST)
     glEnable(GL_NORMALIZE)
     glEnable(GL_LIGHTING)
     glEnable(GL_LIGHT0)
-    glLightfv(GL_LIGHT0, GL_AMBIENT, (0.30, 0.30, 0.34, 1.0))
-    glLightfv(GL_LIGHT0, GL_DIFFUSE, (0.88, 0.88, 0.90, 1.0))
-    glLightfv(GL_LIGHT0, GL_SPECULAR, (0.58, 0.58, 0.60, 1.0))
-
-    tab_rects = []
-    back_rects = []
-
-    def on_key(window, key, scancode, action, mods):
-        if action != glfw.PRESS:
-            return
-        if key == glfw.KEY_Z:
-            if mods & glfw.MOD_SHIFT:
-                STATE["dim"] = min(DIM_MAX, STATE["dim"] + 0.25)
-            else:
-                STATE["dim"] = max(DIM_MIN, STATE["dim"] - 0.25)
-        elif key == glfw.KEY_O:
-            STATE["object_index"] = (STATE["object_index"] + 1) % len(OBJECTS)
-        elif key == glfw.KEY_A:
-            STATE["show_axes"] = not STATE["show_axes"]
-
-    def on_mouse(window, button, action, mods):
-        if button != glfw.MOUSE_BUTTON_LEFT or action != glfw.PRESS:
-            return
-        x, y = glfw.get_cursor_pos(window)
-        fw, fh = glfw.get_framebuffer_size(window)
-        clicked = hit_test(x, y, fw, fh, tab_rects + back_rects)
-        if clicked == "back":
-            glfw.set_window_should_close(window, True)
-            return
-        if clicked == "obj_0":
-            STATE["object_index"] = 0
-        elif clicked == "obj_1":
-            STATE["object_index"] = 1
-        elif clicked == "axes":
-            STATE["show_axes"] = not STATE["show_axes"]
-
-    glfw.set_key_callback(win, on_key)
-    glfw.set_mouse_button_callback(win, on_mouse)
-
-    while not glfw.window_should_close(win):
-        w, h = glfw.get_framebuffer_size(win)
-        _draw_scene(w, h)
-
-        mx, my = glfw.get_cursor_pos(win)
-        hover_id = hit_test(mx, my, w, h, _tab_rects(w, h))
+    glLightfv(GL_LIGHT0, GL_AMBIENT, LIGHT_COLORS["ambient"])
+    glLightfv(GL_LIGHT0, GL_DIFFUSE, LIGHT_COLORS["diffuse"])
+    glLightfv(GL_LIGHT0, GL_SPECULAR, LIGHT_COLORS["specular"])
 
-        glDisable(GL_LIGHTING)
-        glDisable(GL_DEPTH_TEST)
-        glMatrixMode(GL_PROJECTION)
-        glPushMatrix()
-        glLoadIdentity()
-        glOrtho(0, w, 0, h, -1, 1)
-        glMatrixMode(GL_MODELVIEW)
-        glPushMatrix()
-        glLoadIdentity()
-        tab_rects = _draw_tabs(w, h, hover_id=hover_id)
-        _draw_hud(w, h)
-        glPopMatrix()
-        glMatrixMode(GL_PROJECTION)
-        glPopMatrix()
-        glMatrixMode(GL_MODELVIEW)
-        glEnable(GL_DEPTH_TEST)
-        glEnable(GL_LIGHTING)
 
-        back_rects = draw_back_button(w, h)
+def on_key(win, key, scancode, action, mods):
+    if action != glfw.PRESS:
+        return
+    if key == glfw.KEY_Z:
+        if mods & glfw.MOD_SHIFT:
+            STATE["dim"] = min(DIM_MAX, STATE["dim"] + 0.25)
+        else:
+            STATE["dim"] = max(DIM_MIN, STATE["dim"] - 0.25)
+    elif key == glfw.KEY_O:
+        STATE["object_index"] = (STATE["object_index"] + 1) % len(OBJECTS)
+    elif key == glfw.KEY_A:
+        STATE["show_axes"] = not STATE["show_axes"]
+    elif key == glfw.KEY_L:
+        STATE["layout"] = (STATE["layout"] + 1) % len(LAYOUTS)
 
-        glfw.swap_buffers(win)
-        glfw.poll_events()
 
-    glfw.destroy_window(win)
+def on_mouse(win, button, action, mods):
+    if button != glfw.MOUSE_BUTTON_LEFT or action != glfw.PRESS:
+        return
+    x, y = host.cursor_pos(win)
+    fw, fh = host.framebuffer_size(win)
+    clicked = hit_test(x, y, fw, fh, _RECTS["tabs"] + _RECTS["back"])
+    if clicked == "back":
+        glfw.set_window_should_close(win, True)
+        return
+    if clicked == "obj_0":
+        STATE["object_index"] = 0
+    elif clicked == "obj_1":
+        STATE["object_index"] = 1
+    elif clicked == "obj_model":
+        # Primeiro clique escolhe o primeiro modelo; os seguintes avançam entre os modelos
+        index = STATE["object_index"] + 1 if STATE["object_index"] >= BUILTIN_OBJECTS else BUILTIN_OBJECTS
+        STATE["object_index"] = index if index < len(OBJECTS) else BUILTIN_OBJECTS
+    elif clicked == "axes":
+        STATE["show_axes"] = not STATE["show_axes"]
+
+
+def hover_id(x, y, w, h):
+    return hit_test(x, y, w, h, _tab_rects(w, h))
+
+
+def draw_frame(win, w, h):
+    hover = hover_id(*host.cursor_pos(win), w, h)
+    frame = _frame(w, h)
+    overlay_key = (w, h, hover, tuple(STATE.values()), LOD["before"], LOD["after"])
+    # Com o painel do F3 ligado a janela inteira é redesenhada: ele muda de tamanho
+    redraw = None if profiler.overlay_visible() else _views_to_redraw(overlay_key, _versions(frame["views"]))
+    _draw_scene(w, h, redraw, frame)
+    if any("orbit" in camera for camera in LAYOUTS[STATE["layout"]]["cameras"]):
+        # Uma câmera gira: cada quadro pede o próximo
+        host.request_frame()
+    profiler.lap("scene")
+
+    _RECTS["tabs"] = draw_retained("viewport", overlay_key, lambda: _draw_overlay(w, h, hover))
+    profiler.lap("hud")
+    _RECTS["back"] = draw_back_button(w, h)
+    profiler.lap("back")
+
+
+def run():
+    """Abre o módulo sozinho, sem o menu."""
+    host.run(sys.modules[__name__])
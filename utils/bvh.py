@@ -0,0 +1,125 @@
+"""Hierarquia de volumes envolventes (BVH) de caixas alinhadas aos eixos, para descartar
+o que está fora do tronco de visão (frustum culling).
+
+Tudo fica em arrays planos. build() ordena os objetos pelo código de Morton do centro da
+caixa, junta LEAF_SIZE objetos consecutivos em cada folha e monta os níveis de baixo para
+cima: o nó i de um nível é a união dos nós 2i e 2i + 1 do nível de baixo
+(np.minimum.reduceat / np.maximum.reduceat). Como a ordem de Morton mantém próximos os
+objetos próximos no espaço, as caixas dos nós ficam justas, e cada nó cobre um trecho
+contínuo dos objetos ordenados.
+
+cull() desce a árvore um nível por vez e testa todos os nós ativos do nível contra os
+seis planos de uma vez (NumPy vetorizado): um nó inteiro fora de um plano é descartado com
+tudo o que tem embaixo, um nó inteiro dentro aceita o trecho dele sem descer, e só os que
+cruzam algum plano abrem os filhos. Nas folhas que cruzam, cada objeto é testado.
+"""
+import numpy as np
+
+# Objetos por folha
+LEAF_SIZE = 16
+_MORTON_BITS = 10
+
+
+def frustum_planes(projection, view):
+    """Os seis planos (esquerda, direita, baixo, cima, near, far) do tronco de visão em
+    coordenadas do mundo, como array (6, 4): (a, b, c, d) com a·x + b·y + c·z + d >= 0 dentro.
+
+    `projection` e `view` são matrizes por colunas (utils/matrices); vale para perspectiva e
+    ortogonal. As normais saem normalizadas, então a·x + b·y + c·z + d é a distância.
+    """
+    # Por colunas, clip = v · view · projection; a coluna k de `clip` dá a coordenada k
+    clip = np.asarray(view, dtype=np.float64) @ np.asarray(projection, dtype=np.float64)
+    x, y, z, w = clip.T
+    planes = np.stack([w + x, w - x, w + y, w - y, w + z, w - z])
+    return planes / np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+
+
+def _classify(mins, maxs, planes):
+    """-1 (fora de algum plano), 0 (cruza) ou 1 (dentro de todos) para cada caixa."""
+    center = (mins + maxs) * 0.5
+    extent = (maxs - mins) * 0.5
+    distance = center @ planes[:, :3].T + planes[:, 3]
+    radius = extent @ np.abs(planes[:, :3]).T
+    outside = (distance + radius < 0.0).any(axis=1)
+    inside = (distance - radius >= 0.0).all(axis=1)
+    return np.where(outside, -1, np.where(inside, 1, 0))
+
+
+def _spread_bits(v):
+    """Intercala dois zeros entre os bits de v (até 10 bits) para o código de Morton."""
+    v = v.astype(np.uint32)
+    v = (v | (v << 16)) & 0x030000FF
+    v = (v | (v << 8)) & 0x0300F00F
+    v = (v | (v << 4)) & 0x030C30C3
+    v = (v | (v << 2)) & 0x09249249
+    return v
+
+
+def _morton(points):
+    low = points.min(axis=0)
+    span = np.maximum(points.max(axis=0) - low, 1e-12)
+    cells = ((points - low) / span * ((1 << _MORTON_BITS) - 1)).astype(np.uint32)
+    return (_spread_bits(cells[:, 0]) << 2) | (_spread_bits(cells[:, 1]) << 1) | _spread_bits(cells[:, 2])
+
+
+def build(mins, maxs):
+    """BVH das caixas (n, 3) `mins` / `maxs` (um objeto por linha).
+
+    Devolve um dict com order (índice original de cada objeto na ordem da árvore), as caixas
+    dos objetos nessa ordem e levels: (mins, maxs, objetos por nó) da raiz até as folhas.
+    """
+    mins = np.asarray(mins, dtype=np.float64).reshape(-1, 3)
+    maxs = np.asarray(maxs, dtype=np.float64).reshape(-1, 3)
+    count = len(mins)
+    order = np.argsort(_morton((mins + maxs) * 0.5), kind="stable") if count else np.zeros(0, dtype=np.intp)
+    mins, maxs = mins[order], maxs[order]
+    levels = []
+    if count:
+        starts = np.arange(0, count, LEAF_SIZE)
+        node_min = np.minimum.reduceat(mins, starts, axis=0)
+        node_max = np.maximum.reduceat(maxs, starts, axis=0)
+        span = LEAF_SIZE
+        levels.append((node_min, node_max, span))
+        while len(node_min) > 1:
+            pairs = np.arange(0, len(node_min), 2)
+            node_min = np.minimum.reduceat(node_min, pairs, axis=0)
+            node_max = np.maximum.reduceat(node_max, pairs, axis=0)
+            span *= 2
+            levels.append((node_min, node_max, span))
+        levels.reverse()
+    return {"order": order, "mins": mins, "maxs": maxs, "levels": levels, "count": count}
+
+
+def _ranges(starts, ends):
+    """Concatenação de arange(start, end) para cada par, sem laço em Python."""
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if not total:
+        return np.zeros(0, dtype=np.intp)
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return np.arange(total, dtype=np.intp) + offsets
+
+
+def cull(bvh, planes):
+    """Índices originais (em ordem crescente) dos objetos cuja caixa toca o tronco de visão."""
+    count = bvh["count"]
+    accepted = []
+    active = np.zeros(1 if count else 0, dtype=np.intp)
+    for depth, (node_min, node_max, span) in enumerate(bvh["levels"]):
+        if not len(active):
+            break
+        state = _classify(node_min[active], node_max[active], planes)
+        inside = active[state == 1]
+        accepted.append(_ranges(inside * span, np.minimum((inside + 1) * span, count)))
+        crossing = active[state == 0]
+        if depth + 1 < len(bvh["levels"]):
+            children = np.concatenate([crossing * 2, crossing * 2 + 1])
+            active = np.sort(children[children < len(bvh["levels"][depth + 1][0])])
+        else:
+            # Folhas que cruzam: testa cada objeto delas
+            objects = _ranges(crossing * span, np.minimum((crossing + 1) * span, count))
+            state = _classify(bvh["mins"][objects], bvh["maxs"][objects], planes)
+            accepted.append(objects[state >= 0])
+    if not accepted:
+        return np.zeros(0, dtype=np.intp)
+    return np.sort(bvh["order"][np.concatenate(accepted)])
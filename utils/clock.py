@@ -0,0 +1,162 @@
+"""Relógio das animações: passo fixo de simulação e ritmo de quadros (frame pacing).
+
+Simulação: tick(now) avança a animação em passos inteiros de SIM_DT segundos, contados a
+partir do tempo `now` (host.get_time, que no bench vem do roteiro). O número de passos
+depende só do tempo, não de quantos quadros houve, então a mesma sequência de tempos dá
+sempre a mesma animação. Depois de uma parada longa (janela arrastada, depurador) no máximo
+MAX_STEPS passos são simulados e o resto do atraso é descartado. render_time() soma a fração
+do passo seguinte (alpha), para o desenho não andar em degraus quando o quadro é mais rápido
+que o passo.
+
+Ritmo: com set_target_fps(fps), pace() (chamado pelo host depois do swap) espera o próximo
+instante do ritmo: dorme até uma margem antes (SPIN_S no começo) e gira (espera ativa) o
+resto, porque o time.sleep do sistema acorda atrasado. A margem se ajusta ao maior atraso
+recente do sleep. Um quadro que passa do instante não é compensado: o ritmo recomeça dali e os quadros
+perdidos entram na conta. stats() dá quadros perdidos e o jitter (distância entre o período
+medido e o alvo) dos últimos HISTORY quadros.
+"""
+import time
+import numpy as np
+
+# Passo da simulação (s) e passos simulados no máximo por quadro
+SIM_DT = 1.0 / 120.0
+MAX_STEPS = 8
+# Margem inicial e limites da espera ativa antes de cada quadro (s)
+SPIN_S = 0.002
+SPIN_MIN_S, SPIN_MAX_S = 0.0005, 0.004
+HISTORY = 600
+
+_CLOCK = {
+    # Simulação: passos dados, origem (tempo do passo 0) e fração do próximo passo
+    "steps": 0,
+    "origin": None,
+    "alpha": 0.0,
+    "skipped_steps": 0,
+    # Ritmo: fps alvo (None = sem limite), próximo instante e fim do último quadro
+    "target_fps": None,
+    "deadline": None,
+    "last": None,
+    "spin_s": SPIN_S,
+    "periods": np.zeros(HISTORY),
+    "count": 0,
+    "dropped": 0,
+}
+
+
+def reset():
+    """Recomeça a simulação; o próximo tick() define a origem."""
+    _CLOCK.update(steps=0, origin=None, alpha=0.0, skipped_steps=0)
+
+
+def tick(now):
+    """Avança a simulação até o tempo `now` (s); retorna quantos passos foram simulados."""
+    if _CLOCK["origin"] is None:
+        # Primeiro quadro: o passo 0 é o tempo do relógio (a animação continua de onde o
+        # tempo está, como antes do passo fixo)
+        _CLOCK["origin"] = 0.0
+        _CLOCK["steps"] = int(now / SIM_DT + 1e-9)
+        _CLOCK["alpha"] = now / SIM_DT - _CLOCK["steps"]
+        return 0
+    elapsed = (now - _CLOCK["origin"]) / SIM_DT
+    # A pequena folga evita perder um passo por arredondamento (ex.: 60 quadros de 1/60 s)
+    due = int(elapsed + 1e-9) - _CLOCK["steps"]
+    steps = min(max(due, 0), MAX_STEPS)
+    if due > steps:
+        # Atraso grande: a origem anda junto, e a animação segue sem correr atrás
+        skipped = due - steps
+        _CLOCK["origin"] += skipped * SIM_DT
+        _CLOCK["skipped_steps"] += skipped
+        elapsed -= skipped
+    _CLOCK["steps"] += steps
+    _CLOCK["alpha"] = min(max(elapsed - _CLOCK["steps"], 0.0), 1.0)
+    return steps
+
+
+def sim_time():
+    """Tempo simulado (s): passos dados x SIM_DT."""
+    return _CLOCK["steps"] * SIM_DT
+
+
+def render_time():
+    """Tempo para desenhar (s): o simulado mais a fração do próximo passo."""
+    return (_CLOCK["steps"] + _CLOCK["alpha"]) * SIM_DT
+
+
+def set_target_fps(fps):
+    """Limita os quadros por segundo do loop da janela (None ou 0: sem limite)."""
+    if fps is not None and fps < 0:
+        raise ValueError("fps alvo não pode ser negativo")
+    _CLOCK["target_fps"] = fps or None
+    idle()
+
+
+def target_fps():
+    return _CLOCK["target_fps"]
+
+
+def idle():
+    """O loop parou de desenhar (esperando eventos): o ritmo recomeça no próximo quadro."""
+    _CLOCK["deadline"] = None
+    _CLOCK["last"] = None
+
+
+def _wait_until(deadline):
+    remaining = deadline - time.perf_counter()
+    if remaining > _CLOCK["spin_s"]:
+        wake = deadline - _CLOCK["spin_s"]
+        time.sleep(remaining - _CLOCK["spin_s"])
+        late = time.perf_counter() - wake
+        # Margem: um pouco acima do atraso do sleep, descendo devagar quando ele melhora
+        spin = max(late * 1.5, _CLOCK["spin_s"] * 0.95)
+        _CLOCK["spin_s"] = min(max(spin, SPIN_MIN_S), SPIN_MAX_S)
+    while time.perf_counter() < deadline:
+        pass
+
+
+def pace():
+    """Fim do quadro: espera o instante do próximo quadro (com fps alvo) e mede o período."""
+    fps = _CLOCK["target_fps"]
+    if fps:
+        period = 1.0 / fps
+        now = time.perf_counter()
+        deadline = _CLOCK["deadline"]
+        if deadline is None or now > deadline + period:
+            # Primeiro quadro ou atraso de mais de um período: recomeça o ritmo daqui
+            deadline = now
+        else:
+            _wait_until(deadline)
+        _CLOCK["deadline"] = deadline + period
+    now = time.perf_counter()
+    last = _CLOCK["last"]
+    _CLOCK["last"] = now
+    if last is None:
+        return
+    measured = now - last
+    _CLOCK["periods"][_CLOCK["count"] % HISTORY] = measured
+    _CLOCK["count"] += 1
+    if fps:
+        _CLOCK["dropped"] += max(int(round(measured * fps)) - 1, 0)
+
+
+def stats():
+    """Ritmo dos últimos quadros: fps alvo e medido, quadros perdidos, jitter (ms) e passos
+    de simulação descartados; None sem quadros medidos."""
+    count = min(_CLOCK["count"], HISTORY)
+    if not count:
+        return None
+    periods = _CLOCK["periods"][:count] * 1000.0
+    fps = _CLOCK["target_fps"]
+    target = 1000.0 / fps if fps else float(np.median(periods))
+    jitter = np.abs(periods - target)
+    return {
+        "target_fps": fps,
+        "fps": 1000.0 / float(periods.mean()),
+        "frames": _CLOCK["count"],
+        "dropped": _CLOCK["dropped"],
+        "jitter_ms": {
+            "mean": float(jitter.mean()),
+            "p95": float(np.percentile(jitter, 95)),
+            "max": float(jitter.max()),
+        },
+        "skipped_steps": _CLOCK["skipped_steps"],
+    }
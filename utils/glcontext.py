@@ -0,0 +1,41 @@
+"""Recursos OpenGL por contexto (texturas, buffers, display lists).
+
+Cada módulo cria a própria janela GLFW, e nomes de textura/buffer só valem no
+contexto que os criou. Os recursos ficam guardados por (contexto, nome).
+"""
+import ctypes
+import glfw
+
+_RESOURCES = {}
+_CONTEXT = {"override": None}
+
+
+def set_context_key(key):
+    """Força a chave do contexto atual (contextos fora do GLFW, ex.: EGL offscreen)."""
+    _CONTEXT["override"] = key
+
+
+def context_id(win=None):
+    """Identificador do contexto de `win` (ou do contexto atual)."""
+    if win is None:
+        if _CONTEXT["override"] is not None:
+            return _CONTEXT["override"]
+        win = glfw.get_current_context()
+    return ctypes.cast(win, ctypes.c_void_p).value if win else None
+
+
+def get_resource(name, factory):
+    """Recurso `name` do contexto atual; `factory()` cria na primeira vez."""
+    key = (context_id(), name)
+    res = _RESOURCES.get(key)
+    if res is None:
+        res = factory()
+        _RESOURCES[key] = res
+    return res
+
+
+def forget_context(win=None):
+    """Esquece os recursos do contexto (chamar antes de glfw.destroy_window)."""
+    ctx = context_id(win)
+    for key in [k for k in _RESOURCES if k[0] == ctx]:
+        del _RESOURCES[key]
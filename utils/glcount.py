@@ -0,0 +1,152 @@
+"""Contagem de chamadas OpenGL por quadro (opcional; bench.py e `main.py --glcount`).
+
+install() troca, nos módulos do projeto, cada função gl*/glu* importada com `from OpenGL.GL
+import ...` por uma versão que conta a chamada e repassa para a original; uninstall() desfaz.
+O custo de cada chamada do PyOpenGL é quase todo no Python, então o número de chamadas por
+quadro é um bom indicador do orçamento do modo imediato.
+
+Com install(callers=True), cada chamada também é atribuída à função que a fez
+(ex.: hud._draw_char_blocks, shapes.draw_mesh); o painel F3 mostra as maiores do último
+quadro e summary_table() monta a tabela impressa ao sair.
+"""
+import sys
+from collections import Counter
+
+# Módulos que desenham; os que não estiverem importados são ignorados
+MODULES = (
+    "main",
+    "utils.hud", "utils.shapes", "utils.panel", "utils.overlay", "utils.axes", "utils.viewcache",
+    "modulos.transformacoes", "modulos.projecao", "modulos.viewport", "modulos.iluminacao",
+)
+
+_GLCOUNT = {
+    # (módulo, nome) -> função original
+    "installed": {},
+    # Contadores por (chamador, função); chamador é None sem atribuição
+    "frame": Counter(),
+    "last": Counter(),
+    "total": Counter(),
+    "frames": 0,
+}
+# code object -> "modulo.funcao"
+_CALLER_NAMES = {}
+
+
+def _caller_name(frame):
+    code = frame.f_code
+    name = _CALLER_NAMES.get(code)
+    if name is None:
+        module = frame.f_globals.get("__name__", "?")
+        module = "main" if module == "__main__" else module.rsplit(".", 1)[-1]
+        name = _CALLER_NAMES[code] = f"{module}.{code.co_name}"
+    return name
+
+
+def _counted(name, fn, callers):
+    frame = _GLCOUNT["frame"]
+    key = (None, name)
+
+    if callers:
+        def counted(*args, **kwargs):
+            frame[(_caller_name(sys._getframe(1)), name)] += 1
+            return fn(*args, **kwargs)
+    else:
+        def counted(*args, **kwargs):
+            frame[key] += 1
+            return fn(*args, **kwargs)
+
+    counted.__name__ = name
+    counted.__wrapped__ = fn
+    return counted
+
+
+def active():
+    return bool(_GLCOUNT["installed"])
+
+
+def install(module_names=MODULES, callers=False):
+    for module_name in module_names:
+        module = sys.modules.get(module_name)
+        if module is None:
+            continue
+        for name, value in list(vars(module).items()):
+            if not name.startswith("gl") or not callable(value) or hasattr(value, "__wrapped__"):
+                continue
+            # Funções de extensão ausentes são falsas (shapes testa bool(glGenBuffers))
+            if not value:
+                continue
+            _GLCOUNT["installed"][(module, name)] = value
+            setattr(module, name, _counted(name, value, callers))
+
+
+def uninstall():
+    for (module, name), fn in _GLCOUNT["installed"].items():
+        setattr(module, name, fn)
+    _GLCOUNT["installed"].clear()
+
+
+def end_frame():
+    if not _GLCOUNT["installed"]:
+        return
+    frame = _GLCOUNT["frame"]
+    _GLCOUNT["total"].update(frame)
+    _GLCOUNT["frames"] += 1
+    _GLCOUNT["last"] = Counter(frame)
+    frame.clear()
+
+
+def reset():
+    _GLCOUNT["frame"].clear()
+    _GLCOUNT["last"] = Counter()
+    _GLCOUNT["total"].clear()
+    _GLCOUNT["frames"] = 0
+
+
+def _grouped(counts, index):
+    grouped = Counter()
+    for key, count in counts.items():
+        if key[index] is not None:
+            grouped[key[index]] += count
+    return grouped
+
+
+def stats():
+    """Média de chamadas por quadro: total, por função, por chamador e por (chamador, função)."""
+    frames = _GLCOUNT["frames"]
+    if not frames:
+        return None
+    total = _GLCOUNT["total"]
+    return {
+        "frames": frames,
+        "calls_per_frame": sum(total.values()) / frames,
+        "functions": {name: count / frames for name, count in _grouped(total, 1).most_common()},
+        "callers": {name: count / frames for name, count in _grouped(total, 0).most_common()},
+        "pairs": {key: count / frames for key, count in total.most_common() if key[0] is not None},
+    }
+
+
+def last_frame(limit=3):
+    """Chamadas do último quadro: total e os `limit` chamadores com mais chamadas."""
+    last = _GLCOUNT["last"]
+    return sum(last.values()), _grouped(last, 0).most_common(limit)
+
+
+def summary_table(limit=25):
+    """Tabela em texto das chamadas por quadro (por chamador e função, ou só por função)."""
+    summary = stats()
+    if summary is None:
+        return "glcount: nenhum quadro contado"
+    lines = [f"Chamadas OpenGL: {summary['calls_per_frame']:.1f} por quadro ({summary['frames']} quadros)"]
+    if summary["pairs"]:
+        rows = [(caller, name, count) for (caller, name), count in summary["pairs"].items()]
+        header = ("chamador", "função")
+    else:
+        rows = [("", name, count) for name, count in summary["functions"].items()]
+        header = ("", "função")
+    rows = rows[:limit]
+    width = max([len(header[0])] + [len(row[0]) for row in rows])
+    name_width = max([len(header[1])] + [len(row[1]) for row in rows])
+    lines.append(f"{header[0]:<{width}}  {header[1]:<{name_width}}  por quadro")
+    for caller, name, count in rows:
+        lines.append(f"{caller:<{width}}  {name:<{name_width}}  {count:10.2f}")
+    return "\n".join(lines)
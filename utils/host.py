@@ -0,0 +1,208 @@
+"""Janela GLFW única: o menu e os módulos são cenas trocadas sem recriar janela nem contexto.
+
+Uma cena é um objeto (aqui, o próprio módulo) com:
+    WINDOW_SIZE, TITLE
+    enter(win)                 configura o estado GL da cena (fundo, luzes) e zera o estado
+    draw_frame(win, w, h)      desenha um quadro
+    exit(win)                  opcional
+    on_key(win, key, scancode, action, mods), on_mouse(win, button, action, mods)   opcionais
+    hover_id(x, y, w, h)       opcional: botão ou aba sob o cursor (None fora deles)
+
+O estado GL alterado pela cena é desfeito na troca (glPushAttrib/glPopAttrib); texturas,
+buffers e display lists (utils/glcontext) continuam válidos e a próxima cena os reaproveita.
+Fechar a janela (ou "Voltar ao menu") numa cena volta para a cena inicial; na inicial, encerra.
+Cada quadro é medido por utils/profiler (a cena marca as fases "scene", "hud" e "back"; F3
+mostra o painel).
+
+As cenas leem mouse, tamanho do framebuffer e tempo por cursor_pos/framebuffer_size/get_time,
+e não direto do glfw: num replay (bench.py) esses valores vêm do roteiro, sem janela.
+
+O loop só desenha quando a janela está marcada como suja: teclado, cliques, o cursor
+entrando em outro botão ou aba (hover_id da cena muda) ou entrando/saindo da janela,
+tamanho, exposição da janela e troca de cena marcam; uma cena
+que anima chama request_frame() no draw_frame para ganhar o próximo quadro. Sem nada disso
+o loop dorme em glfw.wait_events_timeout e não gasta CPU. Com o painel do F3 ligado o
+desenho é contínuo, para o painel medir quadros de verdade. Com um fps alvo (utils/clock),
+cada quadro desenhado espera o instante do próximo.
+"""
+import glfw
+from OpenGL.GL import (
+    GL_ALL_ATTRIB_BITS, GL_PROJECTION, GL_MODELVIEW,
+    glPushAttrib, glPopAttrib, glMatrixMode, glLoadIdentity,
+)
+from utils import clock, glcount, profiler
+from utils.glcontext import forget_context
+
+# Espera máxima por eventos com a janela parada (s)
+IDLE_WAIT_S = 0.5
+
+_HOST = {"win": None, "home": None, "scene": None, "next": None, "replay": None, "dirty": True, "hover": None}
+
+
+def switch_to(scene):
+    """Troca de cena ao fim do quadro atual."""
+    _HOST["next"] = scene
+
+
+def request_frame():
+    """Pede mais um quadro depois do atual (animações); chamar a cada quadro enquanto anima."""
+    _HOST["dirty"] = True
+
+
+def start_replay(size):
+    """Passa a responder mouse, tamanho e tempo a partir do roteiro (ver set_replay)."""
+    _HOST["replay"] = {"cursor": (-1.0, -1.0), "size": tuple(size), "time": 0.0}
+
+
+def set_replay(cursor=None, time=None):
+    if cursor is not None:
+        _HOST["replay"]["cursor"] = cursor
+    if time is not None:
+        _HOST["replay"]["time"] = time
+
+
+def stop_replay():
+    _HOST["replay"] = None
+
+
+def cursor_pos(win):
+    replay = _HOST["replay"]
+    return replay["cursor"] if replay is not None else glfw.get_cursor_pos(win)
+
+
+def framebuffer_size(win):
+    replay = _HOST["replay"]
+    return replay["size"] if replay is not None else glfw.get_framebuffer_size(win)
+
+
+def get_time():
+    replay = _HOST["replay"]
+    return replay["time"] if replay is not None else glfw.get_time()
+
+
+def _invalidate(win, *args):
+    _HOST["dirty"] = True
+
+
+def _on_cursor_pos(win, x, y):
+    """Movimento do mouse: só redesenha quando o item sob o cursor (hover_id da cena) muda."""
+    hover_id = getattr(_HOST["scene"], "hover_id", None)
+    if hover_id is None:
+        return
+    w, h = glfw.get_framebuffer_size(win)
+    hover = hover_id(x, y, w, h)
+    if hover != _HOST["hover"]:
+        _HOST["hover"] = hover
+        _HOST["dirty"] = True
+
+
+def _on_key(win, key, scancode, action, mods):
+    _HOST["dirty"] = True
+    if key == glfw.KEY_F3 and action == glfw.PRESS:
+        profiler.toggle_overlay()
+        return
+    handler = getattr(_HOST["scene"], "on_key", None)
+    if handler is not None:
+        handler(win, key, scancode, action, mods)
+
+
+def _on_mouse(win, button, action, mods):
+    _HOST["dirty"] = True
+    handler = getattr(_HOST["scene"], "on_mouse", None)
+    if handler is not None:
+        handler(win, button, action, mods)
+
+
+def enter_scene(scene, win):
+    """Isola o estado GL e chama scene.enter; matrizes voltam à identidade, como num contexto novo."""
+    glPushAttrib(GL_ALL_ATTRIB_BITS)
+    glMatrixMode(GL_PROJECTION)
+    glLoadIdentity()
+    glMatrixMode(GL_MODELVIEW)
+    glLoadIdentity()
+    scene.enter(win)
+
+
+def exit_scene(scene, win):
+    handler = getattr(scene, "exit", None)
+    if handler is not None:
+        handler(win)
+    glPopAttrib()
+
+
+def _enter(scene):
+    win = _HOST["win"]
+    glfw.set_window_title(win, scene.TITLE)
+    if tuple(glfw.get_window_size(win)) != tuple(scene.WINDOW_SIZE):
+        glfw.set_window_size(win, *scene.WINDOW_SIZE)
+    enter_scene(scene, win)
+    _HOST["scene"] = scene
+    _HOST["dirty"] = True
+    _HOST["hover"] = None
+
+
+def _exit(scene):
+    exit_scene(scene, _HOST["win"])
+    _HOST["scene"] = None
+
+
+def _open_window(scene):
+    if not glfw.init():
+        return None
+    glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 2)
+    glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 1)
+    win = glfw.create_window(scene.WINDOW_SIZE[0], scene.WINDOW_SIZE[1], scene.TITLE, None, None)
+    if not win:
+        glfw.terminate()
+        return None
+    glfw.make_context_current(win)
+    glfw.set_key_callback(win, _on_key)
+    glfw.set_mouse_button_callback(win, _on_mouse)
+    glfw.set_cursor_pos_callback(win, _on_cursor_pos)
+    glfw.set_cursor_enter_callback(win, _invalidate)
+    glfw.set_framebuffer_size_callback(win, _invalidate)
+    glfw.set_window_refresh_callback(win, _invalidate)
+    return win
+
+
+def run(home):
+    """Abre a janela com a cena `home` e roda até ela ser fechada. Retorna False se a janela não abrir."""
+    win = _open_window(home)
+    if win is None:
+        return False
+    _HOST.update(win=win, home=home, next=None)
+    _enter(home)
+    while True:
+        if glfw.window_should_close(win):
+            if _HOST["scene"] is home:
+                break
+            glfw.set_window_should_close(win, False)
+            _HOST["next"] = home
+        if _HOST["next"] is not None:
+            scene, _HOST["next"] = _HOST["next"], None
+            _exit(_HOST["scene"])
+            _enter(scene)
+        if not _HOST["dirty"] and not profiler.overlay_visible():
+            clock.idle()
+            glfw.wait_events_timeout(IDLE_WAIT_S)
+            continue
+        _HOST["dirty"] = False
+        profiler.begin_frame()
+        w, h = glfw.get_framebuffer_size(win)
+        _HOST["scene"].draw_frame(win, w, h)
+        profiler.draw_overlay(w, h)
+        profiler.lap("hud")
+        glfw.swap_buffers(win)
+        profiler.lap("swap")
+        glfw.poll_events()
+        profiler.lap("poll")
+        profiler.end_frame()
+        glcount.end_frame()
+        # Espera do ritmo (--fps) fora das fases medidas: o perfil mostra só o trabalho
+        clock.pace()
+    _exit(_HOST["scene"])
+    forget_context(win)
+    glfw.destroy_window(win)
+    glfw.terminate()
+    _HOST.update(win=None, home=None)
+    return True
@@ -1,12 +1,23 @@
 """2D text and HUD helpers (5x7 bitmap font, no GLUT)."""
+import ctypes
 import unicodedata
+from functools import lru_cache
+import numpy as np
 from OpenGL.GL import (
     GL_PROJECTION, GL_MODELVIEW, GL_DEPTH_TEST,
-    GL_QUADS, GL_LINES,
+    GL_QUADS, GL_LINES, GL_FLOAT, GL_VERTEX_ARRAY, GL_TEXTURE_COORD_ARRAY,
+    GL_TEXTURE_2D, GL_ALPHA, GL_UNSIGNED_BYTE, GL_NEAREST, GL_CLAMP_TO_EDGE,
+    GL_TEXTURE_MIN_FILTER, GL_TEXTURE_MAG_FILTER, GL_TEXTURE_WRAP_S, GL_TEXTURE_WRAP_T,
+    GL_UNPACK_ALIGNMENT, GL_ALPHA_TEST, GL_GREATER,
+    GL_ENABLE_BIT, GL_TEXTURE_BIT, GL_COLOR_BUFFER_BIT,
     glMatrixMode, glLoadIdentity, glOrtho,
     glPushMatrix, glPopMatrix, glDisable, glEnable,
     glColor3f, glBegin, glEnd, glVertex2f,
+    glEnableClientState, glDisableClientState, glVertexPointer, glDrawArrays,
+    glTexCoordPointer, glGenTextures, glBindTexture, glTexParameteri, glTexImage2D,
+    glPixelStorei, glAlphaFunc, glPushAttrib, glPopAttrib,
 )
+from utils.glcontext import get_resource
 
 # 5x7 font: 7 rows x 5 bits per row
 _FONT_5X7 = {
@@ -64,6 +75,21 @@ _FONT_5X7 = {
 }
 
 
+_ALIASES = {
+    "–": "-",
+    "—": "-",
+    "_": "-",
+    "“": '"',
+    "”": '"',
+    "‘": "'",
+    "’": "'",
+}
+# Letras acentuadas do português (rótulos do menu e HUDs dos módulos)
+_PT_CHARS = "áàâãäéèêëíìîïóòôõöúùûüçñ"
+TEXT_CACHE_SIZE = 512
+
+
+@lru_cache(maxsize=1024)
 def _normalize_char(c):
     if not isinstance(c, str) or len(c) != 1:
         return "?"
@@ -72,49 +98,200 @@ def _normalize_char(c):
     ch = basic[0] if basic else c
     if "a" <= ch <= "z":
         ch = ch.upper()
-    aliases = {
-        "–": "-",
-        "—": "-",
-        "_": "-",
-        "“": '"',
-        "”": '"',
-        "‘": "'",
-        "’": "'",
-    }
-    ch = aliases.get(ch, ch)
+    ch = _ALIASES.get(ch, ch)
     return ch if ch in _FONT_5X7 else "?"
 
 
-def _get_glyph(c):
-    return _FONT_5X7.get(c, _FONT_5X7["?"])
+def _build_translation():
+    """Tabela para str.translate com o mesmo resultado de _normalize_char."""
+    chars = "abcdefghijklmnopqrstuvwxyz" + _PT_CHARS + _PT_CHARS.upper() + "".join(_ALIASES)
+    return str.maketrans({c: _normalize_char(c) for c in chars})
 
 
-def _draw_char_blocks(x, y, glyph, scale, r, g, b):
-    glColor3f(r, g, b)
+_TRANSLATION = _build_translation()
+_GLYPH_CHARS = tuple(_FONT_5X7)
+_GLYPH_INDEX = {c: i for i, c in enumerate(_GLYPH_CHARS)}
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _glyph_indices(text):
+    """Índices em _GLYPH_CHARS de cada caractere da string (uint8)."""
+    translated = text.translate(_TRANSLATION)
+    index = _GLYPH_INDEX
+    idx = np.fromiter(
+        (index[c] if c in index else index[_normalize_char(c)] for c in translated),
+        dtype=np.uint8,
+        count=len(translated),
+    )
+    idx.flags.writeable = False
+    return idx
+
+
+def _glyph_quads(glyph):
+    """Quads dos pixels acesos do glifo, em unidades de bloco (origem no canto do bloco da linha 0)."""
+    quads = []
     for row, bits in enumerate(glyph):
         for col in range(5):
             if (bits >> (4 - col)) & 1:
-                x1 = x + col * scale
-                y1 = y - row * scale
-                x2 = x1 + scale
-                y2 = y1 + scale
-                glBegin(GL_QUADS)
-                glVertex2f(x1, y1)
-                glVertex2f(x2, y1)
-                glVertex2f(x2, y2)
-                glVertex2f(x1, y2)
-                glEnd()
+                x1, y1 = col, -row
+                quads += [(x1, y1), (x1 + 1, y1), (x1 + 1, y1 + 1), (x1, y1 + 1)]
+    return np.array(quads, dtype=np.float32).reshape(-1, 2)
+
+
+# Geometria de todos os glifos calculada uma única vez, empilhada em um array só
+_GLYPH_QUADS = [_glyph_quads(_FONT_5X7[c]) for c in _GLYPH_CHARS]
+_GLYPH_VERTS = np.concatenate(_GLYPH_QUADS)
+_GLYPH_COUNTS = np.array([len(q) for q in _GLYPH_QUADS], dtype=np.intp)
+_GLYPH_STARTS = np.concatenate(([0], np.cumsum(_GLYPH_COUNTS)[:-1]))
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _text_vertices(text, scale, x, y):
+    """Todos os quads de uma string em um único array (n*4, 2), já em coordenadas de tela."""
+    idx = _glyph_indices(text)
+    counts = _GLYPH_COUNTS[idx]
+    total = int(counts.sum())
+    if not total:
+        return None
+    # Índices "ragged": para cada caractere, os vértices do seu glifo em _GLYPH_VERTS
+    ends = np.cumsum(counts)
+    rows = np.arange(total) - np.repeat(ends - counts, counts) + np.repeat(_GLYPH_STARTS[idx], counts)
+    verts = _GLYPH_VERTS[rows]
+    verts[:, 0] += np.repeat(np.arange(len(idx), dtype=np.float32) * 6, counts)
+    verts *= scale
+    verts += (x, y)
+    verts.flags.writeable = False
+    return verts
+
+
+def _draw_vertex_array(verts, r, g, b):
+    glColor3f(r, g, b)
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glVertexPointer(2, GL_FLOAT, 0, verts)
+    glDrawArrays(GL_QUADS, 0, len(verts))
+    glDisableClientState(GL_VERTEX_ARRAY)
+
+
+# Atlas: glifos 5x7 em células 6x8 (1 texel de folga), 16 glifos por linha
+_ATLAS_COLS = 16
+_ATLAS_CELL_W, _ATLAS_CELL_H = 6, 8
+
+
+def _build_atlas_pixels():
+    """Rasteriza a fonte inteira em uma imagem de alfa (uint8) com NumPy."""
+    n = len(_GLYPH_CHARS)
+    rows = -(-n // _ATLAS_COLS)
+    bits = np.array([_FONT_5X7[c] for c in _GLYPH_CHARS], dtype=np.uint8)
+    mask = (bits[:, :, None] >> np.arange(4, -1, -1, dtype=np.uint8)) & 1
+    cells = np.zeros((rows * _ATLAS_COLS, _ATLAS_CELL_H, _ATLAS_CELL_W), dtype=np.uint8)
+    cells[:n, :7, :5] = mask * 255
+    cells = cells.reshape(rows, _ATLAS_COLS, _ATLAS_CELL_H, _ATLAS_CELL_W)
+    return np.ascontiguousarray(cells.transpose(0, 2, 1, 3).reshape(rows * _ATLAS_CELL_H, -1))
+
+
+_ATLAS_PIXELS = _build_atlas_pixels()
+
+
+def _create_atlas_texture():
+    height, width = _ATLAS_PIXELS.shape
+    glPushAttrib(GL_TEXTURE_BIT)
+    tex = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_2D, tex)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+    glTexImage2D(GL_TEXTURE_2D, 0, GL_ALPHA, width, height, 0, GL_ALPHA, GL_UNSIGNED_BYTE, _ATLAS_PIXELS)
+    glPopAttrib()
+    return tex
+
+
+def _atlas_texture():
+    return get_resource("hud_font_atlas", _create_atlas_texture)
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _text_atlas_vertices(text, scale, x, y):
+    """Um quad texturizado por caractere visível: array intercalado (n*4, 4) com x, y, u, v."""
+    height, width = _ATLAS_PIXELS.shape
+    idx = _glyph_indices(text)
+    pos = np.flatnonzero(_GLYPH_COUNTS[idx])
+    if not len(pos):
+        return None
+    idx = idx[pos]
+    u0 = (idx % _ATLAS_COLS) * (_ATLAS_CELL_W / width)
+    u1 = u0 + 5 / width
+    v0 = (idx // _ATLAS_COLS) * (_ATLAS_CELL_H / height)
+    v1 = v0 + 7 / height
+    x1 = x + pos * (6 * scale)
+    x2 = x1 + 5 * scale
+    y1 = np.full(len(pos), y - 6 * scale)
+    y2 = np.full(len(pos), y + scale)
+    verts = np.stack(
+        [
+            np.stack([x1, y1, u0, v1], axis=1),
+            np.stack([x2, y1, u1, v1], axis=1),
+            np.stack([x2, y2, u1, v0], axis=1),
+            np.stack([x1, y2, u0, v0], axis=1),
+        ],
+        axis=1,
+    ).reshape(-1, 4).astype(np.float32)
+    verts.flags.writeable = False
+    return verts
+
+
+def _draw_atlas_array(verts, r, g, b):
+    stride = verts.strides[0]
+    glPushAttrib(GL_ENABLE_BIT | GL_TEXTURE_BIT | GL_COLOR_BUFFER_BIT)
+    glEnable(GL_TEXTURE_2D)
+    glBindTexture(GL_TEXTURE_2D, _atlas_texture())
+    glEnable(GL_ALPHA_TEST)
+    glAlphaFunc(GL_GREATER, 0.5)
+    glColor3f(r, g, b)
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+    glVertexPointer(2, GL_FLOAT, stride, verts)
+    glTexCoordPointer(2, GL_FLOAT, stride, ctypes.c_void_p(verts.ctypes.data + 2 * verts.itemsize))
+    glDrawArrays(GL_QUADS, 0, len(verts))
+    glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+    glDisableClientState(GL_VERTEX_ARRAY)
+    glPopAttrib()
+
+
+TEXT_BACKENDS = ("blocks", "atlas")
+_TEXT = {"backend": "blocks"}
+
+
+def set_text_backend(name):
+    """'blocks': quads sólidos por pixel da fonte; 'atlas': um quad texturizado por caractere."""
+    if name not in TEXT_BACKENDS:
+        raise ValueError(f"backend de texto desconhecido: {name!r}")
+    _TEXT["backend"] = name
+
+
+def get_text_backend():
+    return _TEXT["backend"]
+
+
+def prepare_text_backend():
+    """Cria recursos GL do backend atual (ex.: a textura do atlas) fora de display lists."""
+    if _TEXT["backend"] == "atlas":
+        _atlas_texture()
 
 
 def draw_text_blocks(x, y, text, scale=2, r=1, g=1, b=1):
+    """Uma chamada de desenho por string; a geometria fica em cache por (texto, escala, posição)."""
     if not text:
         return
-    cx = x
-    char_w = 6 * scale
-    for c in text:
-        glyph = _get_glyph(_normalize_char(c))
-        _draw_char_blocks(cx, y, glyph, scale, r, g, b)
-        cx += char_w
+    if _TEXT["backend"] == "atlas":
+        verts = _text_atlas_vertices(text, scale, x, y)
+        if verts is not None:
+            _draw_atlas_array(verts, r, g, b)
+        return
+    verts = _text_vertices(text, scale, x, y)
+    if verts is not None:
+        _draw_vertex_array(verts, r, g, b)
 
 
 def draw_text_2d(x, y, text, r=1, g=1, b=1):
@@ -0,0 +1,409 @@
+"""Carregador de modelos OBJ/PLY para Mesh (utils/mesh).
+
+O arquivo é lido em blocos de bytes; as linhas de cada bloco viram arrays NumPy de uma
+vez (máscaras de bytes + np.fromstring), sem objetos por linha. PLY binário é mapeado em memória
+(np.memmap). O resultado fica em cache num `.npz` ao lado do arquivo, válido enquanto
+for mais novo que o original.
+"""
+import os
+import numpy as np
+from utils.mesh import Mesh, vertex_normals
+
+MODEL_EXTENSIONS = (".obj", ".ply")
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modelos")
+CHUNK_BYTES = 1 << 24
+
+# ---------------------------------------------------------------------------
+# Leitura em blocos e polígonos de tamanho variável
+# ---------------------------------------------------------------------------
+
+
+def _read_chunks(path, offset=0):
+    """Blocos de ~CHUNK_BYTES que sempre terminam em fim de linha."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        tail = b""
+        while True:
+            block = f.read(CHUNK_BYTES)
+            if not block:
+                if tail:
+                    yield tail
+                return
+            block = tail + block
+            cut = block.rfind(b"\n") + 1
+            tail = block[cut:]
+            if cut:
+                yield block[:cut]
+
+
+def _fan_tokens(values, line_ids):
+    """Triangula em leque polígonos dados como lista plana de índices + linha de origem."""
+    if len(values) == 0:
+        return np.empty((0, 3), dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, line_ids[1:] != line_ids[:-1]])
+    sizes = np.diff(np.r_[starts, len(values)])
+    corner = np.arange(len(values)) - np.repeat(starts, sizes)
+    last = np.flatnonzero(corner >= 2)
+    first = values[np.repeat(starts, sizes)[last]]
+    return np.stack([first, values[last - 1], values[last]], axis=1)
+
+
+def _ragged(text, dtype):
+    """Linhas de números com quantidade variável -> (valores, linha de cada valor)."""
+    # -1 separa as linhas: não aparece como índice depois do ajuste feito por quem chama
+    tokens = np.fromstring(text.replace(b"\n", b" -1 ") + b" -1", dtype=dtype, sep=" ")
+    sep = tokens == -1
+    line_ids = np.cumsum(sep)
+    return tokens[~sep], line_ids[~sep]
+
+
+# ---------------------------------------------------------------------------
+# OBJ
+# ---------------------------------------------------------------------------
+
+_SPACE, _TAB, _CR, _NL = b" \t\r\n"
+_HASH, _SLASH, _ZERO = b"#/0"
+
+
+def _obj_chunk(chunk):
+    """Classifica as linhas do bloco e limpa os bytes de uma vez só.
+
+    Retorna (bytes limpos, início e tamanho de cada linha, primeiro byte de cada linha
+    depois dos espaços e tabs do começo, linhas "v", linhas "f"). Comentários, "\\r" e as
+    referências "/vt/vn" das faces viram espaço.
+    """
+    raw = np.frombuffer(chunk, dtype=np.uint8)
+    buf = raw.copy()
+    ends = np.flatnonzero(raw == _NL) + 1
+    if not len(ends) or ends[-1] != len(raw):
+        ends = np.r_[ends, len(raw)]
+    starts = np.r_[0, ends[:-1]]
+    heads = starts
+    if raw[0] in (_SPACE, _TAB) or b"\n " in chunk or b"\n\t" in chunk:
+        # Linhas indentadas: o primeiro byte que não é espaço (no máximo o último da linha)
+        index = np.arange(len(raw), dtype=np.int64)
+        solid = np.where((raw == _SPACE) | (raw == _TAB), len(raw), index)
+        heads = np.minimum(np.minimum.accumulate(solid[::-1])[::-1][starts], ends - 1)
+    second = raw[np.minimum(heads + 1, len(raw) - 1)]
+    blank_after = (second == _SPACE) | (second == _TAB)
+    is_v = (raw[heads] == ord("v")) & blank_after
+    is_f = (raw[heads] == ord("f")) & blank_after
+    if b"#" in chunk:
+        # Do "#" até o fim da linha: +1 no primeiro "#" de cada linha, -1 no fim dela
+        hashes = np.flatnonzero(raw == _HASH)
+        line = np.searchsorted(starts, hashes, side="right") - 1
+        first = np.r_[True, line[1:] != line[:-1]]
+        marks = np.zeros(len(raw) + 1, dtype=np.int32)
+        marks[hashes[first]] += 1
+        marks[ends[line[first]]] -= 1
+        buf[np.cumsum(marks[:-1]) > 0] = _SPACE
+    if b"/" in chunk:
+        # Da "/" até o próximo espaço: "7/3/2" -> "7"
+        index = np.arange(len(raw), dtype=np.int32)
+        blank = (raw == _SPACE) | (raw == _TAB) | (raw == _NL) | (raw == _CR)
+        last_slash = np.maximum.accumulate(np.where(raw == _SLASH, index, -1))
+        last_blank = np.maximum.accumulate(np.where(blank, index, -1))
+        buf[last_slash > last_blank] = _SPACE
+    if b"\r" in chunk:
+        buf[raw == _CR] = _SPACE
+    return buf, starts, ends - starts, heads, is_v, is_f
+
+
+def _obj_vertices(buf, starts, sizes, is_v):
+    values = np.fromstring(buf[np.repeat(is_v, sizes)].tobytes(), dtype=np.float64, sep=" ")
+    rows = int(is_v.sum())
+    if values.size == 3 * rows:
+        return values.reshape(rows, 3)
+    # "v x y z w" e cores "v x y z r g b": ficam só as 3 primeiras colunas de cada linha
+    blank = (buf == _SPACE) | (buf == _TAB) | (buf == _NL)
+    token_start = ~blank & np.r_[True, blank[:-1]]
+    counts = np.add.reduceat(token_start.astype(np.int32), starts)[is_v]
+    first = np.cumsum(counts) - counts
+    return values[first[:, None] + np.arange(3)]
+
+
+def _obj_faces(buf, sizes, heads, is_v, is_f, count):
+    """Triângulos (índices base 0) das faces do bloco; `count` = vértices de blocos anteriores.
+
+    Em OBJ os índices começam em 1 e negativos contam a partir do último vértice lido.
+    """
+    buf[heads[is_f]] = _ZERO  # o "f" vira 0, que nunca é índice válido: separa as faces
+    tokens = np.fromstring(buf[np.repeat(is_f, sizes)].tobytes(), dtype=np.int64, sep=" ")
+    sep = tokens == 0
+    face_ids = (np.cumsum(sep) - 1)[~sep]
+    values = tokens[~sep]
+    negative = values < 0
+    if negative.any():
+        # Vértices disponíveis para cada face = anteriores ao bloco + os "v" acima dela no bloco
+        seen = count + (np.cumsum(is_v) - is_v)[is_f]
+        values[negative] += seen[face_ids[negative]] + 1
+    return _fan_tokens(values - 1, face_ids)
+
+
+def _parse_obj(path):
+    positions = []
+    triangles = []
+    count = 0
+    for chunk in _read_chunks(path):
+        buf, starts, sizes, heads, is_v, is_f = _obj_chunk(chunk)
+        if is_f.any():
+            triangles.append(_obj_faces(buf, sizes, heads, is_v, is_f, count))
+        if is_v.any():
+            buf[heads[is_v]] = _SPACE  # tira o "v"
+            positions.append(_obj_vertices(buf, starts, sizes, is_v))
+            count += int(is_v.sum())
+    return _concat(positions, (0, 3), np.float64), _concat(triangles, (0, 3), np.int64)
+
+
+# ---------------------------------------------------------------------------
+# PLY
+# ---------------------------------------------------------------------------
+
+_PLY_TYPES = {
+    "char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2", "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4", "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4", "double": "f8", "float64": "f8",
+}
+
+
+def _ply_header(path):
+    """(formato, elementos, tamanho do cabeçalho); elemento = [nome, quantidade, propriedades]."""
+    fmt = None
+    elements = []
+    with open(path, "rb") as f:
+        if f.readline().strip() != b"ply":
+            raise ValueError(f"{path}: não é um arquivo PLY")
+        for raw in f:
+            parts = raw.decode("ascii", "replace").split()
+            if not parts or parts[0] in ("comment", "obj_info"):
+                continue
+            if parts[0] == "format":
+                fmt = parts[1]
+            elif parts[0] == "element":
+                elements.append([parts[1], int(parts[2]), []])
+            elif parts[0] == "property":
+                if parts[1] == "list":
+                    elements[-1][2].append((parts[4], _PLY_TYPES[parts[2]], _PLY_TYPES[parts[3]]))
+                else:
+                    elements[-1][2].append((parts[2], _PLY_TYPES[parts[1]], None))
+            elif parts[0] == "end_header":
+                return fmt, elements, f.tell()
+    raise ValueError(f"{path}: cabeçalho PLY sem end_header")
+
+
+def _scalar_dtype(props, order):
+    return np.dtype([(name, order + kind) for name, kind, _item in props])
+
+
+def _ply_positions(vertex_data):
+    positions = np.stack([vertex_data["x"], vertex_data["y"], vertex_data["z"]], axis=1)
+    normals = None
+    if all(name in vertex_data.dtype.names for name in ("nx", "ny", "nz")):
+        normals = np.stack([vertex_data["nx"], vertex_data["ny"], vertex_data["nz"]], axis=1)
+    return positions, normals
+
+
+def _parse_ply_binary(path, elements, offset, order):
+    positions = normals = None
+    triangles = np.empty((0, 3), dtype=np.int64)
+    for name, count, props in elements:
+        if all(item is None for _n, _k, item in props):
+            dtype = _scalar_dtype(props, order)
+            if name == "vertex":
+                data = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,))
+                positions, normals = _ply_positions(data)
+            offset += dtype.itemsize * count
+        elif name == "face":
+            triangles, offset = _ply_binary_faces(path, count, props, offset, order)
+        else:
+            # Elemento com listas que não é "face": não dá para saber onde termina
+            break
+    return positions, normals, triangles
+
+
+def _ply_binary_faces(path, count, props, offset, order):
+    """Faces binárias. Caso comum (todas com o mesmo número de cantos) vira um dtype fixo."""
+    if count == 0:
+        return np.empty((0, 3), dtype=np.int64), offset
+    with open(path, "rb") as f:
+        f.seek(offset)
+        head = f.read(1024)
+    fields = []
+    lists = {}
+    probe = 0
+    for name, kind, item in props:
+        if item is None:
+            fields.append((name, order + kind))
+            probe += np.dtype(kind).itemsize
+            continue
+        # Tamanho das listas lido na primeira face; as demais precisam repetir
+        n = int(np.frombuffer(head, dtype=order + kind, count=1, offset=probe)[0])
+        fields += [("n_" + name, order + kind), (name, order + item, (n,))]
+        lists[name] = n
+        probe += np.dtype(kind).itemsize + n * np.dtype(item).itemsize
+    key = "vertex_indices" if "vertex_indices" in lists else "vertex_index"
+    dtype = np.dtype(fields)
+    size = lists.get(key, 0)
+    if size >= 3 and offset + dtype.itemsize * count <= os.path.getsize(path):
+        data = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,))
+        if all(np.all(data["n_" + name] == n) for name, n in lists.items()):
+            polys = np.asarray(data[key], dtype=np.int64)
+            # Leque por polígono, na ordem dos polígonos: (count, size - 2, 3)
+            fan = np.stack([polys[:, [0, k, k + 1]] for k in range(1, size - 1)], axis=1)
+            return fan.reshape(-1, 3), offset + dtype.itemsize * count
+    return _ply_binary_faces_ragged(path, count, props, offset, order)
+
+
+def _ply_binary_faces_ragged(path, count, props, offset, order):
+    """Faces com número variável de cantos: percorre os registros, um por vez."""
+    values = []
+    line_ids = []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    pos = 0
+    for i in range(count):
+        for name, kind, item in props:
+            kind = np.dtype(order + kind)
+            if item is None:
+                pos += kind.itemsize
+                continue
+            n = int(np.frombuffer(data, dtype=kind, count=1, offset=pos)[0])
+            pos += kind.itemsize
+            item = np.dtype(order + item)
+            if name in ("vertex_indices", "vertex_index"):
+                values.append(np.frombuffer(data, dtype=item, count=n, offset=pos))
+                line_ids.append(np.full(n, i))
+            pos += n * item.itemsize
+    if not values:
+        return np.empty((0, 3), dtype=np.int64), offset + pos
+    tris = _fan_tokens(np.concatenate(values).astype(np.int64), np.concatenate(line_ids))
+    return tris, offset + pos
+
+
+def _parse_ply_ascii(path, elements, offset):
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    newlines = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == ord("\n"))
+    positions = normals = None
+    triangles = np.empty((0, 3), dtype=np.int64)
+    line = 0
+    start = 0
+    for name, count, props in elements:
+        end = int(newlines[line + count - 1]) + 1 if count else start
+        text = data[start:end]
+        if name == "vertex":
+            columns = np.fromstring(text, dtype=np.float64, sep=" ").reshape(count, len(props))
+            names = [p[0] for p in props]
+            positions = columns[:, [names.index(axis) for axis in "xyz"]]
+            if all(axis in names for axis in ("nx", "ny", "nz")):
+                normals = columns[:, [names.index(axis) for axis in ("nx", "ny", "nz")]]
+        elif name == "face" and props[0][2] is not None:
+            # Primeira propriedade = lista de índices; cada linha começa pela contagem
+            values, line_ids = _ragged(text, np.int64)
+            first = np.r_[True, line_ids[1:] != line_ids[:-1]]
+            triangles = _fan_tokens(values[~first], line_ids[~first])
+        line += count
+        start = end
+    return positions, normals, triangles
+
+
+def _parse_ply(path):
+    fmt, elements, offset = _ply_header(path)
+    if fmt == "ascii":
+        positions, normals, triangles = _parse_ply_ascii(path, elements, offset)
+    elif fmt in ("binary_little_endian", "binary_big_endian"):
+        order = "<" if fmt == "binary_little_endian" else ">"
+        positions, normals, triangles = _parse_ply_binary(path, elements, offset, order)
+    else:
+        raise ValueError(f"{path}: formato PLY desconhecido: {fmt}")
+    if positions is None:
+        raise ValueError(f"{path}: PLY sem elemento vertex")
+    return positions, normals, triangles
+
+
+# ---------------------------------------------------------------------------
+# API
+# ---------------------------------------------------------------------------
+
+
+def _concat(parts, empty_shape, dtype):
+    return np.concatenate(parts) if parts else np.empty(empty_shape, dtype=dtype)
+
+
+def _cache_path(path):
+    return path + ".npz"
+
+
+def _load_cache(path):
+    cache = _cache_path(path)
+    try:
+        if os.path.getmtime(cache) < os.path.getmtime(path):
+            return None
+        with np.load(cache) as data:
+            return Mesh(data["positions"], data["indices"], data["normals"])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _save_cache(path, mesh):
+    try:
+        with open(_cache_path(path), "wb") as f:
+            np.savez(f, positions=mesh.positions, indices=mesh.indices, normals=mesh.normals)
+    except OSError:
+        pass  # pasta só leitura: segue sem cache
+
+
+def parse_model(path):
+    """Lê OBJ ou PLY: (posições (n, 3), normais (n, 3) ou None, triângulos (m, 3))."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".obj":
+        positions, triangles = _parse_obj(path)
+        return positions, None, triangles
+    if ext == ".ply":
+        return _parse_ply(path)
+    raise ValueError(f"formato de modelo não suportado: {path}")
+
+
+def load_mesh(path, use_cache=True):
+    """Mesh do arquivo (normais suaves calculadas se o arquivo não tiver), com cache `.npz`."""
+    if use_cache:
+        mesh = _load_cache(path)
+        if mesh is not None:
+            return mesh
+    positions, normals, triangles = parse_model(path)
+    triangles = triangles[(triangles >= 0).all(axis=1) & (triangles < len(positions)).all(axis=1)]
+    if not len(triangles):
+        # Sem faces não há o que desenhar, e o .npz guardaria o modelo vazio
+        raise ValueError(f"{path}: modelo sem faces")
+    if normals is None:
+        normals = vertex_normals(np.asarray(positions, dtype=np.float64), triangles)
+    mesh = Mesh(positions, triangles, normals)
+    if use_cache:
+        _save_cache(path, mesh)
+    return mesh
+
+
+def fit_mesh(mesh, radius=0.6):
+    """Cópia centrada na origem e escalada para caber numa esfera de raio `radius`."""
+    lo = mesh.positions.min(axis=0)
+    hi = mesh.positions.max(axis=0)
+    centered = mesh.positions - (lo + hi) / 2
+    extent = float(np.sqrt((centered ** 2).sum(axis=1).max())) if len(centered) else 0.0
+    scale = radius / extent if extent > 0 else 1.0
+    return Mesh(centered * scale, mesh.indices, mesh.normals, mesh.primitive)
+
+
+def list_models(directory=MODELS_DIR):
+    """Caminhos dos modelos OBJ/PLY da pasta, em ordem alfabética."""
+    try:
+        names = sorted(os.listdir(directory))
+    except OSError:
+        return []
+    return [os.path.join(directory, n) for n in names if n.lower().endswith(MODEL_EXTENSIONS)]
+
+
+def model_name(path):
+    return os.path.splitext(os.path.basename(path))[0].upper()
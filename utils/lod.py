@@ -0,0 +1,111 @@
+"""Níveis de detalhe (LOD) de malhas por agrupamento de vértices e escolha pelo erro na tela.
+
+build() monta, uma vez por malha, versões reduzidas por agrupamento de vértices (vertex
+clustering): o espaço da malha é dividido numa grade de células de lado LOD_CELLS x a
+diagonal da caixa envolvente, os vértices de cada célula viram um só (a média deles) e os
+triângulos que perdem área (dois cantos na mesma célula) ou ficam repetidos saem. Tudo é
+NumPy vetorizado (np.unique com return_inverse). Níveis que reduzem pouco (mais de
+LOD_RATIO dos triângulos do anterior), ou que não deixam nenhum, são pulados. O erro de
+cada nível é o maior deslocamento de um vértice original até o vértice que o substituiu,
+em unidades da malha.
+
+No desenho, pixels_per_unit() dá quantos pixels uma unidade do mundo ocupa na posição de
+cada objeto (perspectiva ou ortogonal, pela matriz de projeção) e select() escolhe o nível
+mais reduzido cujo erro projetado não passa de PIXEL_ERROR pixels.
+"""
+import numpy as np
+from utils.mesh import Mesh, face_normals, vertex_normals
+
+# Lado da célula de cada nível reduzido, em frações da diagonal da caixa da malha
+LOD_CELLS = (1 / 128, 1 / 64, 1 / 32, 1 / 16, 1 / 8, 1 / 4)
+# Cada nível guardado tem no máximo esta fração dos triângulos do anterior
+LOD_RATIO = 0.75
+# Erro máximo aceito na tela, em pixels
+PIXEL_ERROR = 1.0
+
+_CHAINS = {}
+
+
+def _is_flat(mesh):
+    """Malha Flat: os três vértices de cada triângulo têm a normal da face."""
+    if mesh.normals is None:
+        return False
+    corners = mesh.normals[mesh.indices.reshape(-1, 3)]
+    return bool(np.allclose(corners, corners[:, :1]))
+
+
+def decimate(mesh, cell, flat=False):
+    """Mesh reduzido com vértices agrupados em células de lado `cell` e o erro do nível.
+
+    Com `flat`, cada triângulo ganha vértices próprios com a normal da face (como
+    mesh.flat_mesh); senão as normais são as médias de mesh.vertex_normals.
+    """
+    positions = mesh.positions.astype(np.float64)
+    triangles = mesh.indices.reshape(-1, 3).astype(np.intp)
+    cells = np.floor((positions - positions.min(axis=0)) / cell).astype(np.int64)
+    _keys, cluster = np.unique(cells, axis=0, return_inverse=True)
+    cluster = cluster.ravel()
+    sizes = np.bincount(cluster)
+    merged = np.stack([np.bincount(cluster, weights=positions[:, axis]) for axis in range(3)], axis=1)
+    merged /= sizes[:, None]
+    error = float(np.linalg.norm(positions - merged[cluster], axis=1).max()) if len(positions) else 0.0
+
+    tris = cluster[triangles]
+    tris = tris[(tris[:, 0] != tris[:, 1]) & (tris[:, 1] != tris[:, 2]) & (tris[:, 2] != tris[:, 0])]
+    # Triângulos com os mesmos três vértices: fica o primeiro (com a orientação dele)
+    _unique, first = np.unique(np.sort(tris, axis=1), axis=0, return_index=True)
+    tris = tris[np.sort(first)]
+    used, tris = np.unique(tris, return_inverse=True)
+    tris = tris.reshape(-1, 3)
+    merged = merged[used]
+    if flat:
+        normals = np.repeat(face_normals(merged, tris), 3, axis=0)
+        return Mesh(merged[tris].reshape(-1, 3), np.arange(tris.size), normals), error
+    return Mesh(merged, tris, vertex_normals(merged, tris)), error
+
+
+def build(mesh):
+    """Níveis de `mesh`: dict com meshes (o original primeiro), errors (crescentes) e
+    triangles (por nível)."""
+    meshes, errors = [mesh], [0.0]
+    if mesh.primitive == "triangles" and mesh.triangle_count:
+        flat = _is_flat(mesh)
+        diagonal = float(np.linalg.norm(mesh.positions.max(axis=0) - mesh.positions.min(axis=0)))
+        for fraction in LOD_CELLS:
+            coarse, error = decimate(mesh, diagonal * fraction, flat)
+            if 0 < coarse.triangle_count <= meshes[-1].triangle_count * LOD_RATIO:
+                meshes.append(coarse)
+                errors.append(max(error, errors[-1]))
+    return {
+        "meshes": meshes,
+        "errors": np.array(errors),
+        "triangles": np.array([m.triangle_count for m in meshes], dtype=np.int64),
+    }
+
+
+def chain(mesh):
+    """Níveis de `mesh`, montados na primeira vez. As malhas de utils/shapes são únicas por
+    forma e tamanho, então a própria malha serve de chave."""
+    entry = _CHAINS.get(id(mesh))
+    if entry is None or entry[0] is not mesh:
+        entry = (mesh, build(mesh))
+        _CHAINS[id(mesh)] = entry
+    return entry[1]
+
+
+def pixels_per_unit(projection, view, points, height):
+    """Pixels na tela por unidade do mundo em cada ponto (n, 3), numa viewport de `height`
+    pixels de altura. Matrizes por colunas (utils/matrices)."""
+    projection = np.asarray(projection, dtype=np.float64)
+    mvp = np.asarray(view, dtype=np.float64) @ projection
+    w = np.asarray(points, dtype=np.float64).reshape(-1, 3) @ mvp[:3, 3] + mvp[3, 3]
+    # Pontos no plano do olho ou atrás dele ficam com o nível completo
+    return np.where(w > 1e-6, projection[1, 1] * height * 0.5 / np.maximum(w, 1e-6), np.inf)
+
+
+def select(lods, scale, tolerance=PIXEL_ERROR):
+    """Nível de cada objeto (a escala `scale` de pixels_per_unit): o mais reduzido com erro
+    projetado até `tolerance` pixels."""
+    with np.errstate(divide="ignore"):
+        limit = tolerance / np.asarray(scale, dtype=np.float64)
+    return np.searchsorted(lods["errors"], limit, side="right") - 1
@@ -0,0 +1,199 @@
+"""Matrizes 4x4 float32 no layout do OpenGL, operadas sem alocar (buffers pré-alocados).
+
+Cada matriz é um array NumPy C-contíguo (4, 4) guardado por colunas: m[coluna, linha], a
+mesma ordem de memória que glLoadMatrixf espera. Assim a matriz vai para o GL direto, sem
+transpor nem copiar para um array ctypes.
+
+As funções make_* escrevem a transformação (ou a projeção e a câmera de gluPerspective,
+glOrtho e gluLookAt) em `out`; translate, scale, rotate, reflect, shear e multiply
+multiplicam m = m · X no lugar, como glTranslatef/glScalef/glRotatef fazem com a matriz
+corrente. compose(out, a, b) escreve a · b em `out`. Nada aloca arrays: os produtos usam
+np.matmul(..., out=) e buffers de rascunho deste módulo.
+"""
+from math import cos, radians, sin, sqrt, tan
+import numpy as np
+
+
+def new():
+    """Matriz identidade nova (alocar uma vez, fora do loop)."""
+    return np.identity(4, dtype=np.float32)
+
+
+# Rascunho de translate/scale/...: a transformação elementar e o produto antes da cópia
+_SCRATCH = {"op": new(), "product": new()}
+
+
+def load_identity(m):
+    m[...] = 0.0
+    m[0, 0] = m[1, 1] = m[2, 2] = m[3, 3] = 1.0
+    return m
+
+
+def copy(out, m):
+    out[...] = m
+    return out
+
+
+def compose(out, a, b):
+    """out = a · b (no layout por colunas, o produto fica b @ a). `out` não pode ser a nem b."""
+    np.matmul(b, a, out=out)
+    return out
+
+
+def make_translation(out, x, y, z):
+    load_identity(out)
+    out[3, 0] = x
+    out[3, 1] = y
+    out[3, 2] = z
+    return out
+
+
+def make_scale(out, sx, sy, sz):
+    load_identity(out)
+    out[0, 0] = sx
+    out[1, 1] = sy
+    out[2, 2] = sz
+    return out
+
+
+def make_rotation(out, angle, x, y, z):
+    """Rotação de `angle` graus em torno do eixo (x, y, z), como glRotatef."""
+    length = sqrt(x * x + y * y + z * z)
+    load_identity(out)
+    if length == 0.0:
+        return out
+    x, y, z = x / length, y / length, z / length
+    c = cos(radians(angle))
+    s = sin(radians(angle))
+    k = 1.0 - c
+    # out[coluna, linha]
+    out[0, 0] = x * x * k + c
+    out[0, 1] = y * x * k + z * s
+    out[0, 2] = x * z * k - y * s
+    out[1, 0] = x * y * k - z * s
+    out[1, 1] = y * y * k + c
+    out[1, 2] = y * z * k + x * s
+    out[2, 0] = x * z * k + y * s
+    out[2, 1] = y * z * k - x * s
+    out[2, 2] = z * z * k + c
+    return out
+
+
+def make_reflection(out, axis):
+    """Espelha a coordenada `axis` (0 = x, 1 = y, 2 = z)."""
+    load_identity(out)
+    out[axis, axis] = -1.0
+    return out
+
+
+def make_shear(out, shx=0.0, shy=0.0, shz=0.0):
+    """x' = x + shx·y, y' = y + shy·x, z' = z + shz·x."""
+    load_identity(out)
+    out[1, 0] = shx
+    out[0, 1] = shy
+    out[0, 2] = shz
+    return out
+
+
+def make_perspective(out, fovy, aspect, near, far):
+    """Projeção perspectiva de gluPerspective (`fovy` em graus)."""
+    f = 1.0 / tan(radians(fovy) / 2.0)
+    out[...] = 0.0
+    out[0, 0] = f / aspect
+    out[1, 1] = f
+    out[2, 2] = (far + near) / (near - far)
+    out[3, 2] = 2.0 * far * near / (near - far)
+    out[2, 3] = -1.0
+    return out
+
+
+def make_ortho(out, left, right, bottom, top, near, far):
+    """Projeção ortogonal de glOrtho."""
+    load_identity(out)
+    out[0, 0] = 2.0 / (right - left)
+    out[1, 1] = 2.0 / (top - bottom)
+    out[2, 2] = -2.0 / (far - near)
+    out[3, 0] = -(right + left) / (right - left)
+    out[3, 1] = -(top + bottom) / (top - bottom)
+    out[3, 2] = -(far + near) / (far - near)
+    return out
+
+
+def make_look_at(out, eye, center, up=(0.0, 1.0, 0.0)):
+    """Câmera de gluLookAt: olho em `eye` olhando para `center`."""
+    fx, fy, fz = (center[i] - eye[i] for i in range(3))
+    length = sqrt(fx * fx + fy * fy + fz * fz) or 1.0
+    fx, fy, fz = fx / length, fy / length, fz / length
+    # s = f x up (normalizado), u = s x f
+    sx, sy, sz = fy * up[2] - fz * up[1], fz * up[0] - fx * up[2], fx * up[1] - fy * up[0]
+    length = sqrt(sx * sx + sy * sy + sz * sz) or 1.0
+    sx, sy, sz = sx / length, sy / length, sz / length
+    ux, uy, uz = sy * fz - sz * fy, sz * fx - sx * fz, sx * fy - sy * fx
+    load_identity(out)
+    for col, (s, u, f) in enumerate(((sx, ux, fx), (sy, uy, fy), (sz, uz, fz))):
+        out[col, 0] = s
+        out[col, 1] = u
+        out[col, 2] = -f
+    out[3, 0] = -(sx * eye[0] + sy * eye[1] + sz * eye[2])
+    out[3, 1] = -(ux * eye[0] + uy * eye[1] + uz * eye[2])
+    out[3, 2] = fx * eye[0] + fy * eye[1] + fz * eye[2]
+    return out
+
+
+def _post_multiply(m, op):
+    product = _SCRATCH["product"]
+    compose(product, m, op)
+    m[...] = product
+    return m
+
+
+def multiply(m, other):
+    """m = m · other, no lugar."""
+    return _post_multiply(m, other)
+
+
+def translate(m, x, y, z):
+    return _post_multiply(m, make_translation(_SCRATCH["op"], x, y, z))
+
+
+def scale(m, sx, sy, sz):
+    return _post_multiply(m, make_scale(_SCRATCH["op"], sx, sy, sz))
+
+
+def rotate(m, angle, x, y, z):
+    return _post_multiply(m, make_rotation(_SCRATCH["op"], angle, x, y, z))
+
+
+def reflect(m, axis):
+    return _post_multiply(m, make_reflection(_SCRATCH["op"], axis))
+
+
+def shear(m, shx=0.0, shy=0.0, shz=0.0):
+    return _post_multiply(m, make_shear(_SCRATCH["op"], shx, shy, shz))
+
+
+def inverse(out, m):
+    """Inversa de uma matriz afim (última linha 0 0 0 1) pela adjunta do bloco 3x3.
+
+    Levanta ValueError se a matriz for singular. `out` pode ser a própria `m`.
+    """
+    a, b, c = float(m[0, 0]), float(m[1, 0]), float(m[2, 0])
+    d, e, f = float(m[0, 1]), float(m[1, 1]), float(m[2, 1])
+    g, h, i = float(m[0, 2]), float(m[1, 2]), float(m[2, 2])
+    tx, ty, tz = float(m[3, 0]), float(m[3, 1]), float(m[3, 2])
+    co_a = e * i - f * h
+    co_b = f * g - d * i
+    co_c = d * h - e * g
+    det = a * co_a + b * co_b + c * co_c
+    if abs(det) < 1e-12:
+        raise ValueError("matriz singular")
+    inv = 1.0 / det
+    # Inversa do bloco 3x3 (linhas r0, r1, r2), depois a translação -R⁻¹·t
+    r0 = (co_a * inv, (c * h - b * i) * inv, (b * f - c * e) * inv)
+    r1 = (co_b * inv, (a * i - c * g) * inv, (c * d - a * f) * inv)
+    r2 = (co_c * inv, (b * g - a * h) * inv, (a * e - b * d) * inv)
+    load_identity(out)
+    for row, values in enumerate((r0, r1, r2)):
+        out[0, row], out[1, row], out[2, row] = values
+        out[3, row] = -(values[0] * tx + values[1] * ty + values[2] * tz)
+    return out
@@ -0,0 +1,157 @@
+"""Malha indexada compacta (posições/normais float32, índices uint16) e normais vetorizadas.
+
+Malhas com mais de 65536 vértices (modelos carregados de arquivo) usam índices uint32.
+"""
+import numpy as np
+
+
+class Mesh:
+    """Vértices compartilhados, normais já calculadas e índices de triângulos (ou pares de linhas)."""
+
+    __slots__ = ("positions", "normals", "indices", "primitive")
+
+    def __init__(self, positions, indices, normals=None, primitive="triangles"):
+        self.positions = np.ascontiguousarray(positions, dtype=np.float32).reshape(-1, 3)
+        self.normals = None if normals is None else np.ascontiguousarray(normals, dtype=np.float32).reshape(-1, 3)
+        index_type = np.uint16 if len(self.positions) <= 65536 else np.uint32
+        self.indices = np.ascontiguousarray(indices, dtype=index_type).ravel()
+        self.primitive = primitive
+
+    @property
+    def vertex_count(self):
+        return len(self.positions)
+
+    @property
+    def triangle_count(self):
+        return len(self.indices) // 3 if self.primitive == "triangles" else 0
+
+    def interleaved(self):
+        """Array (n, 6) com x, y, z, nx, ny, nz (ou (n, 3) sem normais) para envio à GPU."""
+        if self.normals is None:
+            return self.positions
+        return np.ascontiguousarray(np.hstack([self.positions, self.normals]))
+
+
+def _normalize(v):
+    length = np.linalg.norm(v, axis=-1, keepdims=True)
+    return np.divide(v, length, out=np.zeros_like(v), where=length > 0)
+
+
+def _fan(polygons):
+    """Triangula polígonos convexos em leque, na ordem dos polígonos: (n, 3) índices e polígono de origem."""
+    tris = []
+    owner = []
+    sub = []
+    for size in sorted({len(p) for p in polygons}):
+        ids = np.array([i for i, p in enumerate(polygons) if len(p) == size], dtype=np.intp)
+        poly = np.array([polygons[i] for i in ids], dtype=np.intp)
+        for k in range(1, size - 1):
+            tris.append(np.stack([poly[:, 0], poly[:, k], poly[:, k + 1]], axis=1))
+            owner.append(ids)
+            sub.append(np.full(len(ids), k))
+    owner = np.concatenate(owner)
+    order = np.lexsort((np.concatenate(sub), owner))
+    return np.concatenate(tris)[order], owner[order]
+
+
+def face_normals(positions, triangles):
+    """Normal unitária de cada triângulo: (p1 - p0) x (p2 - p0)."""
+    p = positions[triangles]
+    return _normalize(np.cross(p[:, 1] - p[:, 0], p[:, 2] - p[:, 0]))
+
+
+def vertex_normals(positions, triangles):
+    """Normais suaves: média das normais das faces vizinhas, ponderada pelo ângulo do canto.
+
+    O peso por ângulo não depende de como quads foram divididos em triângulos.
+    """
+    p = positions[triangles].astype(np.float64)
+    n = _normalize(np.cross(p[:, 1] - p[:, 0], p[:, 2] - p[:, 0]))
+    acc = np.zeros((len(positions), 3))
+    for k in range(3):
+        a = _normalize(p[:, (k + 1) % 3] - p[:, k])
+        b = _normalize(p[:, (k + 2) % 3] - p[:, k])
+        angle = np.arccos(np.clip(np.einsum("ij,ij->i", a, b), -1.0, 1.0))
+        for axis in range(3):
+            acc[:, axis] += np.bincount(
+                triangles[:, k], weights=n[:, axis] * angle, minlength=len(positions)
+            )
+    return _normalize(acc)
+
+
+def polygon_normals(positions, polygons):
+    """Normais suaves de malhas com polígonos: média das normais dos polígonos vizinhos, todas
+    com o mesmo peso (como as formas desenhadas à mão de antes do Mesh)."""
+    positions = np.asarray(positions, dtype=np.float64)
+    firsts = np.array([p[:3] for p in polygons], dtype=np.intp)
+    normals = face_normals(positions, firsts)
+    corners = np.concatenate([np.asarray(p, dtype=np.intp) for p in polygons])
+    owner = np.repeat(np.arange(len(polygons)), [len(p) for p in polygons])
+    acc = np.zeros((len(positions), 3))
+    np.add.at(acc, corners, normals[owner])
+    return _normalize(acc)
+
+
+def flat_mesh(positions, polygons):
+    """Cada polígono ganha cópias próprias dos vértices com a normal da face (Flat)."""
+    positions = np.asarray(positions, dtype=np.float64)
+    sizes = np.array([len(p) for p in polygons], dtype=np.intp)
+    starts = np.cumsum(sizes) - sizes
+    corners = positions[np.concatenate([np.asarray(p, dtype=np.intp) for p in polygons])]
+    tris, _owner = _fan([range(start, start + size) for start, size in zip(starts, sizes)])
+    normals = face_normals(corners, np.stack([starts, starts + 1, starts + 2], axis=1))
+    return Mesh(corners, tris, np.repeat(normals, sizes, axis=0))
+
+
+def smooth_mesh(positions, polygons, flat=()):
+    """Vértices compartilhados com normais médias por polígono (Gouraud, polygon_normals).
+
+    Polígonos em `flat` (índices em `polygons`) contam na média dos vizinhos, mas são
+    desenhados com vértices próprios e a normal da face (ex.: a base da pirâmide).
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    tris, owner = _fan(polygons)
+    normals = polygon_normals(positions, polygons)
+    is_flat = np.isin(owner, list(flat))
+    smooth_tris = tris[~is_flat]
+    if not is_flat.any():
+        return Mesh(positions, smooth_tris, normals)
+    flat_part = flat_mesh(positions, [polygons[i] for i in flat])
+    offset = len(positions)
+    return Mesh(
+        np.concatenate([positions, flat_part.positions]),
+        np.concatenate([smooth_tris.ravel(), flat_part.indices.astype(np.intp) + offset]),
+        np.concatenate([normals, flat_part.normals]),
+    )
+
+
+def instance_mesh(mesh, instance_matrices):
+    """Uma cópia de `mesh` para cada matriz (n, 4, 4) (por colunas, utils/matrices), num Mesh só.
+
+    Posições e normais de todas as cópias saem de um único matmul vetorizado; as normais usam
+    a inversa transposta do bloco 3x3 de cada matriz (certas com escala não uniforme, reflexão
+    e cisalhamento) e são renormalizadas.
+    """
+    mats = np.asarray(instance_matrices, dtype=np.float32)
+    linear = mats[:, :3, :3]
+    translation = mats[:, None, 3, :3]
+    normals = None
+    if (linear == linear[0]).all():
+        # Mesmo bloco 3x3 em todas (ex.: uma grade com a mesma transformação): transforma a
+        # malha uma vez e só soma as translações
+        positions = (mesh.positions @ linear[0])[None, :, :] + translation
+        if mesh.normals is not None:
+            local = _normalize(mesh.normals @ np.linalg.inv(linear[0]).T)
+            normals = np.broadcast_to(local, positions.shape)
+    else:
+        # Por colunas, vértice (linha) · m = (M · v)ᵀ
+        positions = mesh.positions @ linear + translation
+        if mesh.normals is not None:
+            normals = _normalize(mesh.normals @ np.linalg.inv(linear).transpose(0, 2, 1))
+    offsets = np.arange(len(mats), dtype=np.int64)[:, None] * mesh.vertex_count
+    indices = mesh.indices.astype(np.int64)[None, :] + offsets
+    return Mesh(positions, indices, normals, mesh.primitive)
+
+
+def line_mesh(positions, edges):
+    return Mesh(positions, edges, primitive="lines")
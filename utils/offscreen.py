@@ -0,0 +1,203 @@
+"""Renderização sem janela visível, para gerar quadros de referência em máquinas sem display.
+
+Dois caminhos para o contexto: janela GLFW invisível (quando há display) ou EGL com Mesa
+em modo surfaceless, que roda no rasterizador por software (llvmpipe) sem GPU. Nos dois
+casos o quadro é desenhado num framebuffer object do tamanho pedido, lido com glReadPixels
+para NumPy e salvo em PNG ou PPM.
+
+O PyOpenGL escolhe a plataforma (GLX ou EGL) na primeira importação de OpenGL: por isso
+este módulo só importa OpenGL dentro das funções, e configure_platform() precisa rodar
+antes de qualquer `from OpenGL ...` do programa.
+"""
+import ctypes
+import os
+import struct
+import sys
+import zlib
+import numpy as np
+
+BACKENDS = ("auto", "glfw", "egl")
+IMAGE_FORMATS = ("png", "ppm")
+
+
+def has_display():
+    if sys.platform in ("win32", "darwin"):
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def resolve_backend(name):
+    if name not in BACKENDS:
+        raise ValueError(f"backend desconhecido: {name!r} (use {', '.join(BACKENDS)})")
+    if name == "auto":
+        return "glfw" if has_display() else "egl"
+    return name
+
+
+def configure_platform(argv, headless=None):
+    """Com --headless (ou headless=True) e --backend egl ou sem display, faz o PyOpenGL usar EGL."""
+    if headless is None:
+        headless = "--headless" in argv
+    if not headless:
+        return
+    backend = argv[argv.index("--backend") + 1] if "--backend" in argv[:-1] else "auto"
+    if backend in BACKENDS and resolve_backend(backend) == "egl":
+        os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+        os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+
+
+# ---------------------------------------------------------------------------
+# Contexto
+# ---------------------------------------------------------------------------
+
+
+def _open_glfw():
+    import glfw
+    if not glfw.init():
+        raise RuntimeError("Falha ao inicializar GLFW (sem display? use --backend egl)")
+    glfw.window_hint(glfw.VISIBLE, False)
+    glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 2)
+    glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 1)
+    win = glfw.create_window(16, 16, "offscreen", None, None)
+    if not win:
+        glfw.terminate()
+        raise RuntimeError("Falha ao criar a janela invisível do GLFW")
+    glfw.make_context_current(win)
+    # Sem vsync: medições (bench.py) não ficam presas à taxa do monitor
+    glfw.swap_interval(0)
+    return {"backend": "glfw", "win": win, "targets": {}}
+
+
+def _open_egl():
+    from OpenGL import EGL
+    from utils.glcontext import set_context_key
+    display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    if not EGL.eglInitialize(display, None, None):
+        raise RuntimeError("Falha ao inicializar EGL")
+    attrs = [
+        EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+        EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+        EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8, EGL.EGL_BLUE_SIZE, 8,
+        EGL.EGL_DEPTH_SIZE, 24,
+        EGL.EGL_NONE,
+    ]
+    config = EGL.EGLConfig()
+    count = EGL.EGLint()
+    EGL.eglChooseConfig(display, (EGL.EGLint * len(attrs))(*attrs), ctypes.pointer(config), 1, ctypes.pointer(count))
+    if not count.value:
+        raise RuntimeError("EGL sem configuração com OpenGL e pbuffer")
+    # A superfície só existe para tornar o contexto corrente; o desenho vai para o FBO
+    size = (EGL.EGLint * 5)(EGL.EGL_WIDTH, 16, EGL.EGL_HEIGHT, 16, EGL.EGL_NONE)
+    surface = EGL.eglCreatePbufferSurface(display, config, size)
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, None)
+    if not context or not EGL.eglMakeCurrent(display, surface, surface, context):
+        raise RuntimeError("Falha ao criar o contexto OpenGL do EGL")
+    # Sem janela GLFW, os recursos GL (utils/glcontext) ficam numa chave fixa
+    set_context_key("offscreen")
+    return {"backend": "egl", "display": display, "surface": surface, "context": context, "targets": {}}
+
+
+def open_context(backend="auto"):
+    """Cria e torna corrente um contexto OpenGL sem janela visível."""
+    backend = resolve_backend(backend)
+    return _open_egl() if backend == "egl" else _open_glfw()
+
+
+def close_context(ctx):
+    from OpenGL.GL import glBindFramebuffer, glDeleteFramebuffers, glDeleteRenderbuffers, GL_FRAMEBUFFER
+    from utils.glcontext import forget_context, set_context_key
+    glBindFramebuffer(GL_FRAMEBUFFER, 0)
+    for fbo, color, depth in ctx["targets"].values():
+        glDeleteFramebuffers(1, [fbo])
+        glDeleteRenderbuffers(2, [color, depth])
+    ctx["targets"].clear()
+    if ctx["backend"] == "egl":
+        from OpenGL import EGL
+        forget_context()
+        set_context_key(None)
+        EGL.eglMakeCurrent(ctx["display"], EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+        EGL.eglDestroyContext(ctx["display"], ctx["context"])
+        EGL.eglDestroySurface(ctx["display"], ctx["surface"])
+        EGL.eglTerminate(ctx["display"])
+    else:
+        import glfw
+        forget_context(ctx["win"])
+        glfw.destroy_window(ctx["win"])
+        glfw.terminate()
+
+
+# ---------------------------------------------------------------------------
+# Alvo de desenho e leitura
+# ---------------------------------------------------------------------------
+
+
+def bind_target(ctx, w, h):
+    """Liga um FBO w x h (cor RGBA8 + profundidade 24 bits), criado na primeira vez."""
+    from OpenGL.GL import (
+        GL_FRAMEBUFFER, GL_RENDERBUFFER, GL_RGBA8, GL_DEPTH_COMPONENT24,
+        GL_COLOR_ATTACHMENT0, GL_DEPTH_ATTACHMENT, GL_FRAMEBUFFER_COMPLETE,
+        glGenFramebuffers, glGenRenderbuffers, glBindFramebuffer, glBindRenderbuffer,
+        glRenderbufferStorage, glFramebufferRenderbuffer, glCheckFramebufferStatus,
+    )
+    target = ctx["targets"].get((w, h))
+    if target is None:
+        fbo = glGenFramebuffers(1)
+        color, depth = glGenRenderbuffers(2)
+        glBindRenderbuffer(GL_RENDERBUFFER, color)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA8, w, h)
+        glBindRenderbuffer(GL_RENDERBUFFER, depth)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, w, h)
+        glBindRenderbuffer(GL_RENDERBUFFER, 0)
+        glBindFramebuffer(GL_FRAMEBUFFER, fbo)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, color)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, depth)
+        if glCheckFramebufferStatus(GL_FRAMEBUFFER) != GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError(f"FBO {w}x{h} incompleto")
+        target = (fbo, color, depth)
+        ctx["targets"][(w, h)] = target
+    glBindFramebuffer(GL_FRAMEBUFFER, target[0])
+
+
+def read_pixels(w, h):
+    """Framebuffer corrente como array (h, w, 3) uint8, primeira linha no topo."""
+    from OpenGL.GL import GL_RGB, GL_UNSIGNED_BYTE, GL_PACK_ALIGNMENT, glPixelStorei, glReadPixels, glFinish
+    glFinish()
+    glPixelStorei(GL_PACK_ALIGNMENT, 1)
+    data = glReadPixels(0, 0, w, h, GL_RGB, GL_UNSIGNED_BYTE)
+    return np.frombuffer(data, dtype=np.uint8).reshape(h, w, 3)[::-1]
+
+
+# ---------------------------------------------------------------------------
+# Imagens
+# ---------------------------------------------------------------------------
+
+
+def _png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+def write_png(path, rgb):
+    h, w, _ = rgb.shape
+    # Cada linha começa com o filtro 0 (nenhum)
+    rows = np.hstack([np.zeros((h, 1), dtype=np.uint8), rgb.reshape(h, w * 3)])
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0)))
+        f.write(_png_chunk(b"IDAT", zlib.compress(rows.tobytes(), 6)))
+        f.write(_png_chunk(b"IEND", b""))
+
+
+def write_ppm(path, rgb):
+    h, w, _ = rgb.shape
+    with open(path, "wb") as f:
+        f.write(f"P6\n{w} {h}\n255\n".encode("ascii"))
+        f.write(np.ascontiguousarray(rgb).tobytes())
+
+
+def save_image(path, rgb):
+    """Salva em PNG ou PPM conforme a extensão de `path`."""
+    if path.lower().endswith(".ppm"):
+        write_ppm(path, rgb)
+    else:
+        write_png(path, rgb)
@@ -0,0 +1,35 @@
+"""Overlay 2D retido: grava o desenho em uma display list e só regrava quando a chave muda."""
+from OpenGL.GL import (
+    GL_COMPILE_AND_EXECUTE,
+    glGenLists, glNewList, glEndList, glCallList,
+)
+from utils.glcontext import get_resource
+from utils.hud import get_text_backend, prepare_text_backend
+
+
+def _new_entry():
+    return {"list": glGenLists(1), "key": None, "result": None}
+
+
+def draw_retained(name, key, build):
+    """Desenha o overlay `name` e retorna o valor de `build()`.
+
+    `build()` desenha em modo imediato e só é chamado quando `key` muda (estado,
+    hover, tamanho do framebuffer); nos demais quadros basta um glCallList.
+    Não pode ser chamado dentro de outro draw_retained (display lists não aninham na gravação).
+    """
+    entry = get_resource("overlay:" + name, _new_entry)
+    key = (get_text_backend(), key)
+    if entry["key"] == key:
+        glCallList(entry["list"])
+        return entry["result"]
+    # Recursos do texto (textura do atlas) precisam existir antes da gravação
+    prepare_text_backend()
+    glNewList(entry["list"], GL_COMPILE_AND_EXECUTE)
+    try:
+        result = build()
+    finally:
+        glEndList()
+    entry["key"] = key
+    entry["result"] = result
+    return result
@@ -7,6 +7,7 @@ from OpenGL.GL import (
     glBegin, glEnd, glVertex2f, glColor3f, glIsEnabled,
 )
 from utils.hud import draw_text_2d, text_width
+from utils.overlay import draw_retained
 
 BACK_BUTTON_W = 200
 BACK_BUTTON_H = 44
@@ -24,12 +25,20 @@ def _draw_quad(x1, y1, x2, y2):
 
 def draw_back_button(w, h):
     """Desenha botão no canto inferior esquerdo. Retorna [(id, x1, y1, x2, y2)] para hit_test."""
+    lighting_was_enabled = bool(glIsEnabled(GL_LIGHTING))
+    depth_was_enabled = bool(glIsEnabled(GL_DEPTH_TEST))
+    key = (w, h, lighting_was_enabled, depth_was_enabled)
+    return draw_retained(
+        "back_button", key,
+        lambda: _draw_back_button(w, h, lighting_was_enabled, depth_was_enabled),
+    )
+
+
+def _draw_back_button(w, h, lighting_was_enabled, depth_was_enabled):
     x1 = BACK_MARGIN
     y1 = BACK_MARGIN
     x2 = x1 + BACK_BUTTON_W
     y2 = y1 + BACK_BUTTON_H
-    lighting_was_enabled = glIsEnabled(GL_LIGHTING)
-    depth_was_enabled = glIsEnabled(GL_DEPTH_TEST)
     glDisable(GL_DEPTH_TEST)
     glDisable(GL_LIGHTING)
     glMatrixMode(GL_PROJECTION)
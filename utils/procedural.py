@@ -0,0 +1,77 @@
+"""Cenas grandes geradas por procedimento: milhares a milhões de objetos em arrays planos.
+
+Cada gerador devolve (kinds, positions): o tipo de cada objeto (uint8, índice na lista de
+tipos da cena) e a posição (n, 3) float32. Nada é criado por objeto em Python; as posições
+saem de operações NumPy vetorizadas e de um gerador com semente fixa, então a mesma
+chamada sempre gera a mesma cena.
+
+grid() espalha os objetos numa grade quadrada no plano XZ. clusters() distribui os objetos
+conforme um ruído de valor suave (value noise) elevado ao cubo, o que forma aglomerados e
+vazios; a altura acompanha um segundo ruído, como morros.
+"""
+import numpy as np
+
+SEED = 2024
+# Distância média entre objetos vizinhos (a área cresce com a quantidade)
+SPACING = 2.0
+# Células da grade de ruído ao longo da área e altura máxima dos morros de clusters()
+NOISE_CELLS = 24
+HILL_HEIGHT = 6.0
+# Resolução em que clusters() amostra a densidade
+DENSITY_CELLS = 256
+
+
+def grid(count, kind_count=2, spacing=SPACING):
+    """`count` objetos numa grade k x k no plano y = 0, centrada na origem; os tipos se
+    alternam como num tabuleiro."""
+    k = int(np.ceil(np.sqrt(count) - 1e-9))
+    i = np.arange(count)
+    col, row = i % k, i // k
+    positions = np.zeros((count, 3), dtype=np.float32)
+    positions[:, 0] = (col - (k - 1) / 2.0) * spacing
+    positions[:, 2] = (row - (k - 1) / 2.0) * spacing
+    kinds = ((col + row) % kind_count).astype(np.uint8)
+    return kinds, positions
+
+
+def _value_noise(rng, cells):
+    """Função (x, z) -> [0, 1] interpolando valores aleatórios numa grade `cells` x `cells`
+    com smoothstep; x e z em [0, 1]."""
+    lattice = rng.random((cells + 1, cells + 1))
+
+    def sample(x, z):
+        gx, gz = x * cells, z * cells
+        ix = np.minimum(gx.astype(np.intp), cells - 1)
+        iz = np.minimum(gz.astype(np.intp), cells - 1)
+        fx, fz = gx - ix, gz - iz
+        sx, sz = fx * fx * (3 - 2 * fx), fz * fz * (3 - 2 * fz)
+        top = lattice[iz, ix] * (1 - sx) + lattice[iz, ix + 1] * sx
+        bottom = lattice[iz + 1, ix] * (1 - sx) + lattice[iz + 1, ix + 1] * sx
+        return top * (1 - sz) + bottom * sz
+
+    return sample
+
+
+def clusters(count, kind_count=2, spacing=SPACING, seed=SEED):
+    """`count` objetos em aglomerados guiados por ruído, num quadrado centrado na origem."""
+    rng = np.random.default_rng(seed)
+    density = _value_noise(rng, NOISE_CELLS)
+    height = _value_noise(rng, NOISE_CELLS // 3)
+    # O ruído é amostrado numa grade fina; cada objeto sorteia uma célula com probabilidade
+    # proporcional à densidade (sem rejeição) e uma posição dentro dela
+    cells = DENSITY_CELLS
+    centers = (np.arange(cells) + 0.5) / cells
+    cx, cz = np.meshgrid(centers, centers)
+    weights = density(cx.ravel(), cz.ravel()) ** 3
+    cell = rng.choice(len(weights), size=count, p=weights / weights.sum())
+    u = np.empty((count, 2))
+    u[:, 0] = (cell % cells + rng.random(count)) / cells
+    u[:, 1] = (cell // cells + rng.random(count)) / cells
+    # Área ocupada de cerca de spacing² por objeto nas partes densas (a média do peso é ~1/4)
+    side = spacing * np.sqrt(count * 4.0)
+    positions = np.empty((count, 3), dtype=np.float32)
+    positions[:, 0] = (u[:, 0] - 0.5) * side
+    positions[:, 1] = height(u[:, 0], u[:, 1]) * HILL_HEIGHT
+    positions[:, 2] = (u[:, 1] - 0.5) * side
+    kinds = rng.integers(0, kind_count, count).astype(np.uint8)
+    return kinds, positions
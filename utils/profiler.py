@@ -0,0 +1,176 @@
+"""Tempo de CPU por quadro, dividido nas fases do loop (cena, HUD, botão voltar, swap, poll).
+
+O loop chama begin_frame(), marca o fim de cada fase com lap(fase) e fecha com end_frame().
+Os últimos HISTORY quadros ficam num buffer circular NumPy, de onde saem média e percentis
+(p50/p95/p99). F3 liga o painel (desenhado com utils/hud); start_csv(caminho) grava um
+quadro por linha. Com utils/glcount ligado, o painel mostra também as chamadas OpenGL do
+último quadro e os chamadores com mais chamadas.
+"""
+import time
+import numpy as np
+from OpenGL.GL import (
+    GL_DEPTH_TEST, GL_LIGHTING, GL_TEXTURE_2D, GL_QUADS,
+    GL_PROJECTION, GL_MODELVIEW, GL_ENABLE_BIT, GL_CURRENT_BIT, GL_VIEWPORT_BIT,
+    glPushAttrib, glPopAttrib, glDisable, glMatrixMode, glPushMatrix, glPopMatrix,
+    glLoadIdentity, glOrtho, glViewport, glColor3f, glBegin, glEnd, glVertex2f,
+)
+from utils import clock, glcount
+from utils.hud import draw_text_2d, text_width
+
+PHASES = ("scene", "hud", "back", "swap", "poll")
+PHASE_LABELS = {"scene": "CENA", "hud": "HUD", "back": "VOLTAR", "swap": "SWAP", "poll": "POLL"}
+HISTORY = 600
+# Texto do painel refeito a cada REFRESH_S: números novos a cada quadro encheriam o cache de texto
+REFRESH_S = 0.5
+LINE_HEIGHT = 18
+
+_PHASE_INDEX = {name: i for i, name in enumerate(PHASES)}
+_PROF = {
+    "start": 0.0,
+    "last": 0.0,
+    "current": np.zeros(len(PHASES)),
+    # Colunas: fases (ms) e, por último, o quadro inteiro (ms)
+    "ring": np.zeros((HISTORY, len(PHASES) + 1)),
+    "count": 0,
+    "overlay": False,
+    "lines": [],
+    "refreshed": 0.0,
+    "csv": None,
+}
+
+
+def begin_frame():
+    now = time.perf_counter()
+    _PROF["start"] = now
+    _PROF["last"] = now
+    _PROF["current"][:] = 0.0
+
+
+def lap(phase):
+    """Soma à fase `phase` o tempo desde a marca anterior."""
+    now = time.perf_counter()
+    _PROF["current"][_PHASE_INDEX[phase]] += now - _PROF["last"]
+    _PROF["last"] = now
+
+
+def end_frame():
+    row = _PROF["ring"][_PROF["count"] % HISTORY]
+    row[:-1] = _PROF["current"] * 1000.0
+    row[-1] = (time.perf_counter() - _PROF["start"]) * 1000.0
+    _PROF["count"] += 1
+    if _PROF["csv"] is not None:
+        _PROF["csv"].write(f"{_PROF['count']}," + ",".join(f"{v:.4f}" for v in row) + "\n")
+
+
+def _history():
+    return _PROF["ring"][:min(_PROF["count"], HISTORY)]
+
+
+def stats():
+    """Resumo dos últimos quadros: fps, percentis do quadro e média/p95 de cada fase (ms)."""
+    rows = _history()
+    if not len(rows):
+        return None
+    p50, p95, p99 = np.percentile(rows[:, -1], (50, 95, 99))
+    mean = rows.mean(axis=0)
+    phase_p95 = np.percentile(rows[:, :-1], 95, axis=0)
+    return {
+        "frames": len(rows),
+        "fps": 1000.0 / mean[-1] if mean[-1] > 0 else 0.0,
+        "frame_ms": {"mean": mean[-1], "p50": p50, "p95": p95, "p99": p99},
+        "phases_ms": {name: {"mean": mean[i], "p95": phase_p95[i]} for i, name in enumerate(PHASES)},
+    }
+
+
+def reset():
+    _PROF["count"] = 0
+    _PROF["lines"] = []
+
+
+def start_csv(path):
+    stop_csv()
+    _PROF["csv"] = open(path, "w", encoding="utf-8")
+    _PROF["csv"].write("frame," + ",".join(f"{name}_ms" for name in PHASES) + ",total_ms\n")
+
+
+def stop_csv():
+    if _PROF["csv"] is not None:
+        _PROF["csv"].close()
+        _PROF["csv"] = None
+
+
+def toggle_overlay():
+    _PROF["overlay"] = not _PROF["overlay"]
+    _PROF["refreshed"] = 0.0
+
+
+def overlay_visible():
+    return _PROF["overlay"]
+
+
+def _overlay_lines():
+    summary = stats()
+    if summary is None:
+        return ["PERFIL (F3)"]
+    frame = summary["frame_ms"]
+    lines = [
+        f"PERFIL (F3)  FPS {summary['fps']:.1f}",
+        f"QUADRO P50 {frame['p50']:.2f} P95 {frame['p95']:.2f} P99 {frame['p99']:.2f}",
+        "FASE     MEDIA    P95 (MS)",
+    ]
+    for name in PHASES:
+        phase = summary["phases_ms"][name]
+        lines.append(f"{PHASE_LABELS[name]:<8} {phase['mean']:6.2f} {phase['p95']:6.2f}")
+    pacing = clock.stats() if clock.target_fps() else None
+    if pacing is not None:
+        lines.append(f"RITMO {pacing['target_fps']:g} FPS  MEDIDO {pacing['fps']:.1f}")
+        lines.append(f"PERDIDOS {pacing['dropped']}  JITTER P95 {pacing['jitter_ms']['p95']:.2f} MS")
+    if glcount.active():
+        calls, callers = glcount.last_frame()
+        lines.append(f"GL {calls} CHAMADAS/QUADRO")
+        lines.extend(f"{caller[-22:]:<22} {count:5d}" for caller, count in callers)
+    return lines
+
+
+def draw_overlay(w, h):
+    """Painel no canto inferior direito (só quando ligado com F3)."""
+    if not _PROF["overlay"]:
+        return
+    now = time.perf_counter()
+    if now - _PROF["refreshed"] >= REFRESH_S:
+        _PROF["lines"] = _overlay_lines()
+        _PROF["refreshed"] = now
+    lines = _PROF["lines"]
+    box_w = max(text_width(line, 2) for line in lines) + 16
+    box_h = len(lines) * LINE_HEIGHT + 10
+    x1 = w - box_w - 12
+    y1 = 12
+    glPushAttrib(GL_ENABLE_BIT | GL_CURRENT_BIT | GL_VIEWPORT_BIT)
+    glDisable(GL_LIGHTING)
+    glDisable(GL_DEPTH_TEST)
+    glDisable(GL_TEXTURE_2D)
+    glViewport(0, 0, w, h)
+    glMatrixMode(GL_PROJECTION)
+    glPushMatrix()
+    glLoadIdentity()
+    glOrtho(0, w, 0, h, -1, 1)
+    glMatrixMode(GL_MODELVIEW)
+    glPushMatrix()
+    glLoadIdentity()
+    glColor3f(0.05, 0.06, 0.09)
+    glBegin(GL_QUADS)
+    glVertex2f(x1, y1)
+    glVertex2f(x1 + box_w, y1)
+    glVertex2f(x1 + box_w, y1 + box_h)
+    glVertex2f(x1, y1 + box_h)
+    glEnd()
+    y = y1 + box_h - 6  # draw_text_2d recebe o topo da linha
+    for i, line in enumerate(lines):
+        color = (0.96, 0.86, 0.46) if i == 0 else (0.84, 0.88, 0.94)
+        draw_text_2d(x1 + 8, y, line, *color)
+        y -= LINE_HEIGHT
+    glPopMatrix()
+    glMatrixMode(GL_PROJECTION)
+    glPopMatrix()
+    glMatrixMode(GL_MODELVIEW)
+    glPopAttrib()
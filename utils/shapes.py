@@ -1,176 +1,298 @@
-"""Objetos 3D reutilizáveis (glBegin/glEnd). Normais por face ou por vértice."""
-import math
+"""Objetos 3D reutilizáveis. Normais por face ou por vértice.
+
+Cada primitiva vira um Mesh (utils/mesh) uma única vez por (forma, tamanho, altura,
+sombreamento), com normais calculadas na montagem. Os arrays intercalados
+(x, y, z, nx, ny, nz) vão para buffers na GPU (VBO) e são desenhados com
+glDrawElements. Sem VBO, os mesmos arrays são desenhados como vertex arrays do
+lado do cliente. Modelos OBJ/PLY (utils/loader) passam pelo mesmo caminho; malhas
+geradas em execução (lotes de instâncias) usam draw_dynamic_mesh, que regrava um
+único par de buffers. As funções *_mesh devolvem os mesmos Mesh sem desenhar (lotes de
+instâncias e o rasterizador por software, utils/softraster).
+"""
+import ctypes
+import numpy as np
 from OpenGL.GL import (
-    GL_QUADS, GL_TRIANGLES, GL_LINES, GL_LINE_WIDTH,
-    glBegin, glEnd, glVertex3f, glNormal3f, glColor3f, glLineWidth,
+    GL_TRIANGLES, GL_LINES, GL_FLOAT, GL_UNSIGNED_SHORT, GL_UNSIGNED_INT,
+    GL_ARRAY_BUFFER, GL_ELEMENT_ARRAY_BUFFER, GL_STATIC_DRAW, GL_DYNAMIC_DRAW,
+    GL_VERTEX_ARRAY, GL_NORMAL_ARRAY,
+    glColor3f, glLineWidth, glNormal3f,
+    glGenBuffers, glBindBuffer, glBufferData,
+    glEnableClientState, glDisableClientState, glVertexPointer, glNormalPointer,
+    glDrawElements,
 )
+from utils.glcontext import get_resource
+from utils.loader import fit_mesh, load_mesh
+from utils.mesh import Mesh, flat_mesh, smooth_mesh, line_mesh
+
 EDGE_LINE_WIDTH = 1.6
 EDGE_COLOR = (0.0, 0.0, 0.0)
+USE_VBO = True
+_GL_PRIMITIVES = {"triangles": GL_TRIANGLES, "lines": GL_LINES}
+
+_MESHES = {}
+
+
+def get_mesh(key, build):
+    """Mesh `key` (montado uma vez, compartilhado entre contextos)."""
+    mesh = _MESHES.get(key)
+    if mesh is None:
+        mesh = build()
+        _MESHES[key] = mesh
+    return mesh
+
+
+def _vbo_supported():
+    return USE_VBO and bool(glGenBuffers)
+
+
+def _upload(mesh, gpu=None, usage=GL_STATIC_DRAW):
+    """Envia o Mesh para VBO/IBO; sem suporte a buffers, mantém os arrays (fallback).
+
+    Com `gpu` (de um _upload anterior), regrava os mesmos buffers em vez de criar outros.
+    """
+    verts = mesh.interleaved()
+    buffers = (gpu["vbo"], gpu["ibo"]) if gpu is not None and gpu["vbo"] is not None else None
+    gpu = {
+        "verts": verts,
+        "indices": mesh.indices,
+        "stride": verts.strides[0],
+        "has_normals": verts.shape[1] == 6,
+        "count": len(mesh.indices),
+        "mode": _GL_PRIMITIVES[mesh.primitive],
+        "index_type": GL_UNSIGNED_SHORT if mesh.indices.dtype == np.uint16 else GL_UNSIGNED_INT,
+        "vbo": None,
+        "ibo": None,
+        "last_normal": None if mesh.normals is None else tuple(mesh.normals[mesh.indices[-1]].tolist()),
+    }
+    if not _vbo_supported():
+        return gpu
+    gpu["vbo"], gpu["ibo"] = buffers if buffers is not None else glGenBuffers(2)
+    glBindBuffer(GL_ARRAY_BUFFER, gpu["vbo"])
+    glBufferData(GL_ARRAY_BUFFER, verts.nbytes, verts, usage)
+    glBindBuffer(GL_ARRAY_BUFFER, 0)
+    glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, gpu["ibo"])
+    glBufferData(GL_ELEMENT_ARRAY_BUFFER, mesh.indices.nbytes, mesh.indices, usage)
+    glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+    # Com buffers, os arrays já estão na GPU: não ficam duplicados na memória do processo
+    gpu["verts"] = gpu["indices"] = None
+    return gpu
+
+
+def draw_mesh(key, build):
+    """Desenha o Mesh `key` (criado por `build()` na primeira vez) a partir dos buffers do contexto."""
+    _draw_gpu(get_resource(("mesh",) + key, lambda: _upload(get_mesh(key, build))))
+
+
+def draw_dynamic_mesh(slot, version, build):
+    """Desenha o Mesh do buffer `slot`, remontado com `build()` sempre que `version` muda.
+
+    Ao contrário de draw_mesh, nada fica em cache por versão: cada slot tem um só par de
+    buffers (GL_DYNAMIC_DRAW), regravado a cada mudança.
+    """
+    gpu = get_resource(("dynamic", slot), lambda: {"version": None, "vbo": None})
+    if gpu["version"] != version:
+        uploaded = _upload(build(), gpu if gpu["version"] is not None else None, GL_DYNAMIC_DRAW)
+        gpu.clear()
+        gpu.update(uploaded, version=version)
+    _draw_gpu(gpu)
+
+
+def draw_mesh_views(mesh, views):
+    """Desenha `mesh` uma vez por vista, com os buffers ligados e os ponteiros de vértice
+    passados uma só vez; cada vista em `views` é uma função sem argumentos chamada antes do
+    seu glDrawElements (viewport, matrizes, luz).
+
+    Os buffers ficam guardados pela identidade de `mesh`, que precisa durar enquanto o
+    contexto existir (malhas de get_mesh ou de utils/lod).
+    """
+    gpu = get_resource(("mesh-views", id(mesh)), lambda: _upload(mesh))
+    _bind_gpu(gpu)
+    for load_view in views:
+        load_view()
+        _draw_elements(gpu)
+    _unbind_gpu(gpu)
+
+
+def _draw_gpu(gpu):
+    _bind_gpu(gpu)
+    _draw_elements(gpu)
+    _unbind_gpu(gpu)
+
+
+def _bind_gpu(gpu):
+    stride = gpu["stride"]
+    if gpu["vbo"] is not None:
+        glBindBuffer(GL_ARRAY_BUFFER, gpu["vbo"])
+        base = 0
+    else:
+        base = gpu["verts"].ctypes.data
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glVertexPointer(3, GL_FLOAT, stride, ctypes.c_void_p(base))
+    if gpu["has_normals"]:
+        glEnableClientState(GL_NORMAL_ARRAY)
+        glNormalPointer(GL_FLOAT, stride, ctypes.c_void_p(base + 12))
+    if gpu["ibo"] is not None:
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, gpu["ibo"])
+
+
+def _draw_elements(gpu):
+    if gpu["ibo"] is not None:
+        glDrawElements(gpu["mode"], gpu["count"], gpu["index_type"], ctypes.c_void_p(0))
+    else:
+        glDrawElements(gpu["mode"], gpu["count"], gpu["index_type"], ctypes.c_void_p(gpu["indices"].ctypes.data))
+
+
+def _unbind_gpu(gpu):
+    if gpu["ibo"] is not None:
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+    if gpu["has_normals"]:
+        glDisableClientState(GL_NORMAL_ARRAY)
+        # A normal corrente fica indefinida após o draw; deixa a do último vértice, como no
+        # modo imediato (eixos e bordas desenhados com iluminação dependem dela)
+        glNormal3f(*gpu["last_normal"])
+    glDisableClientState(GL_VERTEX_ARRAY)
+    if gpu["vbo"] is not None:
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+
+# Cantos do cubo e faces (sentido anti-horário visto de fora). O vértice inicial de cada
+# quad define a diagonal da divisão em triângulos e, com ela, a interpolação da cor;
+# cada variante mantém a ordem em que sempre foi desenhada.
+_CUBE_FACES = [(0, 1, 2, 3), (4, 5, 6, 7), (5, 3, 2, 6), (4, 7, 1, 0), (7, 6, 2, 1), (4, 0, 3, 5)]
+_CUBE_FACES_SMOOTH = [(0, 1, 2, 3), (4, 5, 6, 7), (3, 2, 6, 5), (4, 7, 1, 0), (1, 7, 6, 2), (4, 0, 3, 5)]
+_CUBE_EDGES = [(0,1),(1,2),(2,3),(3,0), (4,5),(5,6),(6,7),(7,4), (0,4),(1,7),(2,6),(3,5)]
+# Pirâmide: base 0..3, ápice 4; a face lateral i é (i, i+1, ápice)
+_PYRAMID_FACES = [(0, 1, 2, 3)] + [(i, (i + 1) % 4, 4) for i in range(4)]
+_PYRAMID_EDGES = [(i, (i + 1) % 4) for i in range(4)] + [(4, i) for i in range(4)]
+# Icosaedro de partida da esfera (faces no sentido anti-horário visto de fora)
+_GOLDEN = (1 + 5 ** 0.5) / 2
+_ICOSAHEDRON = [
+    (-1, _GOLDEN, 0), (1, _GOLDEN, 0), (-1, -_GOLDEN, 0), (1, -_GOLDEN, 0),
+    (0, -1, _GOLDEN), (0, 1, _GOLDEN), (0, -1, -_GOLDEN), (0, 1, -_GOLDEN),
+    (_GOLDEN, 0, -1), (_GOLDEN, 0, 1), (-_GOLDEN, 0, -1), (-_GOLDEN, 0, 1),
+]
+_ICOSAHEDRON_FACES = [
+    (0, 11, 5), (0, 5, 1), (0, 1, 7), (0, 7, 10), (0, 10, 11), (1, 5, 9), (5, 11, 4), (11, 10, 2), (10, 7, 6),
+    (7, 1, 8), (3, 9, 4), (3, 4, 2), (3, 2, 6), (3, 6, 8), (3, 8, 9), (4, 9, 5), (2, 4, 11), (6, 2, 10),
+    (8, 6, 7), (9, 8, 1),
+]
+
+
+def _cube_positions(s):
+    return [(-s, -s, s), (s, -s, s), (s, s, s), (-s, s, s), (-s, -s, -s), (-s, s, -s), (s, s, -s), (s, -s, -s)]
+
+
+def _pyramid_positions(s, height):
+    h2 = height / 2
+    return [(-s, -h2, -s), (s, -h2, -s), (s, -h2, s), (-s, -h2, s), (0, h2, 0)]
+
+
+def _icosphere(radius, subdivisions):
+    """Icosaedro subdividido: cada triângulo vira quatro, com os pontos médios das arestas
+    (compartilhados entre vizinhos) projetados na esfera. Normais = direção radial."""
+    unit = np.array(_ICOSAHEDRON, dtype=np.float64)
+    unit /= np.linalg.norm(unit, axis=1, keepdims=True)
+    tris = np.array(_ICOSAHEDRON_FACES, dtype=np.intp)
+    for _ in range(subdivisions):
+        edges = np.sort(np.concatenate([tris[:, [0, 1]], tris[:, [1, 2]], tris[:, [2, 0]]]), axis=1)
+        unique, inverse = np.unique(edges, axis=0, return_inverse=True)
+        middle = unit[unique[:, 0]] + unit[unique[:, 1]]
+        ab, bc, ca = inverse.reshape(3, -1) + len(unit)
+        unit = np.concatenate([unit, middle / np.linalg.norm(middle, axis=1, keepdims=True)])
+        a, b, c = tris.T
+        tris = np.concatenate([
+            np.stack([a, ab, ca], axis=1), np.stack([ab, b, bc], axis=1),
+            np.stack([ca, bc, c], axis=1), np.stack([ab, bc, ca], axis=1),
+        ])
+    return Mesh(unit * radius, tris, unit)
+
+
+def cube_mesh(size=0.5):
+    """Mesh do cubo Flat (o mesmo que draw_cube desenha), para montar lotes de instâncias."""
+    return get_mesh(("cube", size, None, "flat"), lambda: flat_mesh(_cube_positions(size), _CUBE_FACES))
+
+
+def cube_smooth_mesh(size=0.5):
+    return get_mesh(("cube", size, None, "smooth"), lambda: smooth_mesh(_cube_positions(size), _CUBE_FACES_SMOOTH))
+
+
+def cube_edges_mesh(size=0.5):
+    return get_mesh(("cube", size, None, "edges"), lambda: line_mesh(_cube_positions(size), _CUBE_EDGES))
+
+
+def pyramid_mesh(size=0.5, height=0.7):
+    return get_mesh(
+        ("pyramid", size, height, "flat"), lambda: flat_mesh(_pyramid_positions(size, height), _PYRAMID_FACES)
+    )
+
+
+def pyramid_smooth_mesh(size=0.5, height=0.7):
+    return get_mesh(
+        ("pyramid", size, height, "smooth"),
+        lambda: smooth_mesh(_pyramid_positions(size, height), _PYRAMID_FACES, flat=(0,)),
+    )
+
+
+def pyramid_edges_mesh(size=0.5, height=0.7):
+    return get_mesh(
+        ("pyramid", size, height, "edges"), lambda: line_mesh(_pyramid_positions(size, height), _PYRAMID_EDGES)
+    )
+
+
+def sphere_mesh(radius=0.5, subdivisions=3):
+    """Esfera suave com 20 x 4^subdivisions triângulos (Gouraud)."""
+    return get_mesh(("sphere", radius, subdivisions, "smooth"), lambda: _icosphere(radius, subdivisions))
+
+
+def model_mesh(path, radius=0.6):
+    return get_mesh(("model", path, radius, "smooth"), lambda: fit_mesh(load_mesh(path), radius))
 
 
 def draw_cube(size=0.5):
     """Cubo centrado na origem, lado 2*size. Normais por face (Flat)."""
-    s = size
-    glBegin(GL_QUADS)
-    glNormal3f(0, 0, 1)
-    glVertex3f(-s, -s, s); glVertex3f(s, -s, s); glVertex3f(s, s, s); glVertex3f(-s, s, s)
-    glNormal3f(0, 0, -1)
-    glVertex3f(-s, -s, -s); glVertex3f(-s, s, -s); glVertex3f(s, s, -s); glVertex3f(s, -s, -s)
-    glNormal3f(0, 1, 0)
-    glVertex3f(-s, s, -s); glVertex3f(-s, s, s); glVertex3f(s, s, s); glVertex3f(s, s, -s)
-    glNormal3f(0, -1, 0)
-    glVertex3f(-s, -s, -s); glVertex3f(s, -s, -s); glVertex3f(s, -s, s); glVertex3f(-s, -s, s)
-    glNormal3f(1, 0, 0)
-    glVertex3f(s, -s, -s); glVertex3f(s, s, -s); glVertex3f(s, s, s); glVertex3f(s, -s, s)
-    glNormal3f(-1, 0, 0)
-    glVertex3f(-s, -s, -s); glVertex3f(-s, -s, s); glVertex3f(-s, s, s); glVertex3f(-s, s, -s)
-    glEnd()
+    draw_mesh(("cube", size, None, "flat"), lambda: cube_mesh(size))
 
 
 def draw_cube_edges(size=0.5):
     """Desenha as 12 arestas do cubo em preto (chamar após draw_cube/draw_cube_smooth)."""
-    s = size
-    verts = [(-s,-s,s),(s,-s,s),(s,s,s),(-s,s,s), (-s,-s,-s),(-s,s,-s),(s,s,-s),(s,-s,-s)]
-    edges = [(0,1),(1,2),(2,3),(3,0), (4,5),(5,6),(6,7),(7,4), (0,4),(1,7),(2,6),(3,5)]
     glLineWidth(EDGE_LINE_WIDTH)
     glColor3f(*EDGE_COLOR)
-    glBegin(GL_LINES)
-    for i, j in edges:
-        glVertex3f(*verts[i])
-        glVertex3f(*verts[j])
-    glEnd()
+    draw_mesh(("cube", size, None, "edges"), lambda: cube_edges_mesh(size))
     glLineWidth(1.0)
 
 
 def draw_pyramid_edges(size=0.5, height=0.7):
     """Desenha as 8 arestas da pirâmide em preto."""
-    s = size
-    h2 = height / 2
-    apex = (0, h2, 0)
-    base = [(-s,-h2,-s),(s,-h2,-s),(s,-h2,s),(-s,-h2,s)]
     glLineWidth(EDGE_LINE_WIDTH)
     glColor3f(*EDGE_COLOR)
-    glBegin(GL_LINES)
-    for i in range(4):
-        j = (i + 1) % 4
-        glVertex3f(*base[i])
-        glVertex3f(*base[j])
-    for i in range(4):
-        glVertex3f(*apex)
-        glVertex3f(*base[i])
-    glEnd()
+    draw_mesh(("pyramid", size, height, "edges"), lambda: pyramid_edges_mesh(size, height))
     glLineWidth(1.0)
 
 
-def _norm(v):
-    L = math.sqrt(v[0]*v[0] + v[1]*v[1] + v[2]*v[2])
-    return (v[0]/L, v[1]/L, v[2]/L) if L > 0 else v
-
-
 def draw_cube_smooth(size=0.5):
     """Cubo com normais por vértice (Gouraud)."""
-    s = size
-    vertices = [
-        ((-s, -s, s), (-1, -1, 1)), ((s, -s, s), (1, -1, 1)), ((s, s, s), (1, 1, 1)), ((-s, s, s), (-1, 1, 1)),
-        ((-s, -s, -s), (-1, -1, -1)), ((-s, s, -s), (-1, 1, -1)), ((s, s, -s), (1, 1, -1)), ((s, -s, -s), (1, -1, -1)),
-    ]
-    quads = [(0, 1, 2, 3), (4, 5, 6, 7), (3, 2, 6, 5), (4, 7, 1, 0), (1, 7, 6, 2), (4, 0, 3, 5)]
-    for quad in quads:
-        glBegin(GL_QUADS)
-        for i in quad:
-            v, n = vertices[i]
-            glNormal3f(*_norm(n))
-            glVertex3f(*v)
-        glEnd()
+    draw_mesh(("cube", size, None, "smooth"), lambda: cube_smooth_mesh(size))
 
 
 def draw_pyramid(size=0.5, height=0.7):
     """Pirâmide base quadrada, normais por face."""
-    s = size
-    h2 = height / 2
-    glBegin(GL_QUADS)
-    glNormal3f(0, -1, 0)
-    glVertex3f(-s, -h2, -s)
-    glVertex3f(s, -h2, -s)
-    glVertex3f(s, -h2, s)
-    glVertex3f(-s, -h2, s)
-    glEnd()
-    apex = (0, h2, 0)
-    base_verts = [(-s, -h2, -s), (s, -h2, -s), (s, -h2, s), (-s, -h2, s)]
-    for i in range(4):
-        v0 = base_verts[i]
-        v1 = base_verts[(i + 1) % 4]
-        dx1, dy1, dz1 = v1[0]-v0[0], v1[1]-v0[1], v1[2]-v0[2]
-        dx2, dy2, dz2 = apex[0]-v0[0], apex[1]-v0[1], apex[2]-v0[2]
-        nx = dy1*dz2 - dz1*dy2
-        ny = dz1*dx2 - dx1*dz2
-        nz = dx1*dy2 - dy1*dx2
-        length = (nx*nx + ny*ny + nz*nz) ** 0.5
-        if length > 0:
-            nx, ny, nz = nx/length, ny/length, nz/length
-        glBegin(GL_TRIANGLES)
-        glNormal3f(nx, ny, nz)
-        glVertex3f(*v0)
-        glVertex3f(*v1)
-        glVertex3f(*apex)
-        glEnd()
+    draw_mesh(("pyramid", size, height, "flat"), lambda: pyramid_mesh(size, height))
 
 
 def draw_pyramid_smooth(size=0.5, height=0.7):
-    """Pirâmide com normais por vértice (Gouraud)."""
-    s = size
-    h2 = height / 2
-    apex = (0, h2, 0)
-    base_verts = [(-s, -h2, -s), (s, -h2, -s), (s, -h2, s), (-s, -h2, s)]
-    n_apex = (0, 0, 0)
-    for i in range(4):
-        v0 = base_verts[i]
-        v1 = base_verts[(i + 1) % 4]
-        dx1, dy1, dz1 = v1[0]-v0[0], v1[1]-v0[1], v1[2]-v0[2]
-        dx2, dy2, dz2 = apex[0]-v0[0], apex[1]-v0[1], apex[2]-v0[2]
-        nx = dy1*dz2 - dz1*dy2
-        ny = dz1*dx2 - dx1*dz2
-        nz = dx1*dy2 - dy1*dx2
-        n_apex = (n_apex[0]+nx, n_apex[1]+ny, n_apex[2]+nz)
-    length = (n_apex[0]**2 + n_apex[1]**2 + n_apex[2]**2) ** 0.5
-    if length > 0:
-        n_apex = (n_apex[0]/length, n_apex[1]/length, n_apex[2]/length)
-
-    def face_normal(i):
-        v0 = base_verts[i]
-        v1 = base_verts[(i + 1) % 4]
-        dx1, dy1, dz1 = v1[0]-v0[0], v1[1]-v0[1], v1[2]-v0[2]
-        dx2, dy2, dz2 = apex[0]-v0[0], apex[1]-v0[1], apex[2]-v0[2]
-        nx = dy1*dz2 - dz1*dy2
-        ny = dz1*dx2 - dx1*dz2
-        nz = dx1*dy2 - dy1*dx2
-        L = (nx*nx+ny*ny+nz*nz)**0.5
-        return (nx/L, ny/L, nz/L) if L > 0 else (0, 1, 0)
-    normals_base = [face_normal(i) for i in range(4)]
-    for i in range(4):
-        n1 = normals_base[i]
-        n2 = normals_base[(i - 1) % 4]
-        nb = (0, -1, 0)
-        nx = n1[0] + n2[0] + nb[0]
-        ny = n1[1] + n2[1] + nb[1]
-        nz = n1[2] + n2[2] + nb[2]
-        L = math.sqrt(nx*nx+ny*ny+nz*nz) or 1
-        normals_base[i] = (nx/L, ny/L, nz/L)
-    glBegin(GL_QUADS)
-    for i in range(4):
-        glNormal3f(0, -1, 0)
-        glVertex3f(*base_verts[i])
-    glEnd()
-    for i in range(4):
-        v0 = base_verts[i]
-        v1 = base_verts[(i + 1) % 4]
-        n0 = normals_base[i]
-        n1 = normals_base[(i + 1) % 4]
-        glBegin(GL_TRIANGLES)
-        glNormal3f(*n0)
-        glVertex3f(*v0)
-        glNormal3f(*n1)
-        glVertex3f(*v1)
-        glNormal3f(*n_apex)
-        glVertex3f(*apex)
-        glEnd()
+    """Pirâmide com normais por vértice (Gouraud); a base continua plana."""
+    draw_mesh(("pyramid", size, height, "smooth"), lambda: pyramid_smooth_mesh(size, height))
+
+
+def draw_sphere(radius=0.5, subdivisions=3):
+    draw_mesh(("sphere", radius, subdivisions, "smooth"), lambda: sphere_mesh(radius, subdivisions))
+
+
+def draw_lod(lods, level):
+    """Desenha o nível `level` dos LOD de utils/lod.chain (o nível 0 é a malha original)."""
+    draw_mesh(("lod", id(lods), level), lambda: lods["meshes"][level])
+
+
+def draw_model(path, radius=0.6):
+    """Modelo OBJ/PLY centrado na origem, cabendo numa esfera de raio `radius`. Normais por vértice."""
+    draw_mesh(("model", path, radius, "smooth"), lambda: model_mesh(path, radius))
@@ -0,0 +1,371 @@
+"""Rasterizador por software em NumPy vetorizado, para máquinas sem OpenGL funcionando.
+
+Reproduz o pipeline fixo que as cenas usam com o OpenGL: vértices transformados pelas
+matrizes por colunas de utils/matrices, iluminação por vértice como GL_LIGHTING (ambiente
+global, ambiente + difusa + especular Blinn-Phong com observador no infinito, normais
+renormalizadas como GL_NORMALIZE), sombreamento FLAT (cor do último vértice do triângulo)
+ou SMOOTH (Gouraud, com correção de perspectiva), z-buffer float32 com GL_LESS e linhas
+largas desenhadas como quads, como o Mesa faz.
+
+A rasterização é por blocos. A tela é dividida em ladrilhos de TILE x TILE pixels, cada
+triângulo vai para os ladrilhos que a sua caixa envolvente toca e as funções de aresta
+(as coordenadas baricêntricas) são avaliadas de uma vez para todos os pares (ladrilho,
+triângulo), em arrays (pares, TILE, TILE). A profundidade entre os triângulos de um mesmo
+ladrilho se resolve com um mínimo por ladrilho (np.minimum.reduceat) e só os pixels
+vencedores são sombreados.
+
+Uma cena é uma lista de itens (dicts), ver draw_item(). Limitação: triângulos que cruzam
+o plano near são descartados em vez de recortados (as cenas não chegam perto dele).
+"""
+import numpy as np
+from utils import matrices
+
+TILE = 16
+# Pares (ladrilho, triângulo) avaliados por vez; limita a memória dos arrays (pares, TILE, TILE)
+MAX_PAIRS = 2048
+# GL_LIGHT_MODEL_AMBIENT padrão
+GLOBAL_AMBIENT = (0.2, 0.2, 0.2)
+_MIN_W = 1e-6
+_PIXEL_CENTERS = np.arange(TILE, dtype=np.float32) + 0.5
+
+
+def _to_rgb8(color):
+    return (np.clip(color, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8)
+
+
+def _padded(w, h):
+    return -(-w // TILE) * TILE, -(-h // TILE) * TILE
+
+
+def target_nbytes(w, h):
+    """Tamanho do buffer único de new_target(w, h, buffer=...): cor RGB8 e profundidade float32."""
+    tw, th = _padded(w, h)
+    return th * tw * 7
+
+
+def new_target(w, h, clear_color=(0.0, 0.0, 0.0), buffer=None):
+    """Buffers de w x h pixels (arredondados para ladrilhos inteiros): cor RGB8, como o
+    framebuffer do GL, e profundidade float32, com a primeira linha embaixo.
+
+    Com `buffer` (target_nbytes(w, h) bytes, por exemplo uma memória compartilhada) os dois
+    arrays são vistas dele; clear_color=None mantém o conteúdo em vez de limpar.
+    """
+    tw, th = _padded(w, h)
+    if buffer is None:
+        color = np.empty((th, tw, 3), dtype=np.uint8)
+        depth = np.empty((th, tw), dtype=np.float32)
+    else:
+        color = np.ndarray((th, tw, 3), dtype=np.uint8, buffer=buffer)
+        depth = np.ndarray((th, tw), dtype=np.float32, buffer=buffer, offset=color.nbytes)
+    target = {"size": (w, h), "color": color, "depth": depth}
+    if clear_color is not None:
+        clear(target, clear_color)
+    return target
+
+
+def clear(target, clear_color, rect=None):
+    """Limpa a cor e a profundidade de `target`, ou só do retângulo (x0, y0, x1, y1) em pixels."""
+    color, depth = target["color"], target["depth"]
+    if rect is not None:
+        x0, y0, x1, y1 = rect
+        color, depth = color[y0:y1, x0:x1], depth[y0:y1, x0:x1]
+    # Preenche uma linha e copia as linhas inteiras (bem mais rápido que difundir o RGB)
+    color[0] = _to_rgb8(np.asarray(clear_color[:3]))
+    color[1:] = color[0]
+    depth[...] = 1.0
+
+
+def image(target):
+    """Quadro (h, w, 3) uint8 com a primeira linha no topo, como offscreen.read_pixels."""
+    w, h = target["size"]
+    return target["color"][:h, :w][::-1]
+
+
+def light(view, position, colors):
+    """Luz com a posição (x, y, z, w) transformada por `view`, como glLightfv(GL_POSITION);
+    view=None quando a posição já está em coordenadas do olho (modelview identidade).
+
+    `colors` tem ambient, diffuse e specular (RGB ou RGBA).
+    """
+    position = np.asarray(position, dtype=np.float64)
+    if view is not None:
+        position = position @ np.asarray(view, dtype=np.float64)
+    return {
+        "position": position,
+        "ambient": np.asarray(colors["ambient"][:3], dtype=np.float64),
+        "diffuse": np.asarray(colors["diffuse"][:3], dtype=np.float64),
+        "specular": np.asarray(colors["specular"][:3], dtype=np.float64),
+    }
+
+
+def _normalize(v):
+    length = np.linalg.norm(v, axis=-1, keepdims=True)
+    return v / np.where(length > 0, length, 1.0)
+
+
+def _shade(eye, normals, model_view, material, lights):
+    """Cor de cada vértice pela equação de iluminação do pipeline fixo, limitada a [0, 1]."""
+    inverse = matrices.inverse(matrices.new(), model_view).astype(np.float64)
+    # Normais pela inversa transposta (por colunas: n · inv[:3, :3]ᵀ)
+    n = _normalize(normals @ inverse[:3, :3].T)
+    ambient_diffuse = np.asarray(material["ambient_diffuse"][:3], dtype=np.float64)
+    specular = np.asarray(material["specular"][:3], dtype=np.float64)
+    color = np.empty((len(eye), 3))
+    color[:] = np.asarray(GLOBAL_AMBIENT) * ambient_diffuse
+    for lamp in lights:
+        position = lamp["position"]
+        if position[3] == 0.0:
+            to_light = _normalize(position[:3])[None, :]
+        else:
+            to_light = _normalize(position[:3] / position[3] - eye)
+        n_dot_l = np.einsum("ij,ij->i", n, np.broadcast_to(to_light, n.shape))
+        half = _normalize(to_light + np.array([0.0, 0.0, 1.0]))
+        n_dot_h = np.maximum(np.einsum("ij,ij->i", n, np.broadcast_to(half, n.shape)), 0.0)
+        highlight = np.where(n_dot_l > 0.0, n_dot_h ** material["shininess"], 0.0)
+        color += lamp["ambient"] * ambient_diffuse
+        color += np.maximum(n_dot_l, 0.0)[:, None] * (lamp["diffuse"] * ambient_diffuse)
+        color += highlight[:, None] * (lamp["specular"] * specular)
+    return np.clip(color, 0.0, 1.0)
+
+
+def _window(clip, viewport):
+    """Coordenadas de janela (x, y, z) e 1/w de cada vértice; 1/w = 0 marca vértices atrás do olho."""
+    w = clip[:, 3]
+    inv_w = np.where(w > _MIN_W, 1.0 / np.where(w > _MIN_W, w, 1.0), 0.0)
+    ndc = clip[:, :3] * inv_w[:, None]
+    vx, vy, vw, vh = viewport
+    x = vx + (ndc[:, 0] + 1.0) * (vw / 2.0)
+    y = vy + (ndc[:, 1] + 1.0) * (vh / 2.0)
+    z = (ndc[:, 2] + 1.0) / 2.0
+    return x, y, z, inv_w
+
+
+def _line_quads(x, y, z, inv_w, segments, width):
+    """Cada segmento vira um quad (dois triângulos) de `width` pixels, estendido meio pixel
+    em cada ponta; linhas mais horizontais engrossam na vertical e vice-versa. Devolve também
+    o vértice de origem de cada canto, para a cor variar ao longo da linha como no GL.
+
+    Como em linhas sem antialiasing do GL, a largura é arredondada para um inteiro.
+    """
+    a, b = segments[:, 0], segments[:, 1]
+    dx = x[b] - x[a]
+    dy = y[b] - y[a]
+    x_major = np.abs(dx) >= np.abs(dy)
+    half = max(round(width), 1) / 2.0
+    # Deslocamento lateral e extensão das pontas
+    off_x = np.where(x_major, 0.0, half)
+    off_y = np.where(x_major, half, 0.0)
+    ext_x = np.where(x_major, np.copysign(0.5, dx), 0.0)
+    ext_y = np.where(x_major, 0.0, np.copysign(0.5, dy))
+    ax, ay = x[a] - ext_x, y[a] - ext_y
+    bx, by = x[b] + ext_x, y[b] + ext_y
+    # Cantos: a-, a+, b+, b-
+    qx = np.stack([ax - off_x, ax + off_x, bx + off_x, bx - off_x], axis=1)
+    qy = np.stack([ay - off_y, ay + off_y, by + off_y, by - off_y], axis=1)
+    qz = np.stack([z[a], z[a], z[b], z[b]], axis=1)
+    qw = np.stack([inv_w[a], inv_w[a], inv_w[b], inv_w[b]], axis=1)
+    qv = np.stack([a, a, b, b], axis=1)
+    tri = np.array([[0, 1, 2], [0, 2, 3]])
+    pick = (lambda q: q[:, tri].reshape(-1, 3))
+    return pick(qx), pick(qy), pick(qz), pick(qw), pick(qv)
+
+
+def setup(item, lights=()):
+    """Triângulos do item prontos para rasterizar (coordenadas de janela, planos e cores).
+
+    Devolve None se nada do item cai no viewport.
+    """
+    mesh = item["mesh"]
+    model_view = np.asarray(item["model_view"], dtype=np.float32)
+    projection = np.asarray(item["projection"], dtype=np.float32)
+    eye = (mesh.positions @ model_view[:3, :3] + model_view[3, :3]).astype(np.float64)
+    clip = eye @ projection[:3].astype(np.float64) + projection[3]
+    if "material" in item:
+        lights = item.get("lights", lights)
+        colors = _shade(eye, mesh.normals.astype(np.float64), model_view, item["material"], lights)
+    else:
+        colors = np.broadcast_to(np.asarray(item["color"][:3], dtype=np.float64), (len(eye), 3))
+    x, y, z, inv_w = _window(clip, item["viewport"])
+
+    indices = mesh.indices.astype(np.intp)
+    if mesh.primitive == "lines":
+        segments = indices.reshape(-1, 2)
+        # Nos dois triângulos do quad, [:, 2] é o segundo vértice do segmento, o provocante da linha
+        tx, ty, tz, tw, tris = _line_quads(x, y, z, inv_w, segments, item.get("line_width", 1.0))
+    else:
+        tris = indices.reshape(-1, 3)
+        tx, ty, tz, tw = x[tris], y[tris], z[tris], inv_w[tris]
+    if item.get("flat"):
+        # GL_FLAT: o triângulo inteiro recebe a cor do último vértice (vértice provocante)
+        tcolor = np.repeat(colors[tris[:, 2]][:, None, :], 3, axis=1)
+    else:
+        tcolor = colors[tris]
+
+    # Funções de aresta: b_i(px, py) = A_i·px + B_i·py + C_i, já divididas pela área com
+    # sinal (b_i >= 0 dentro, nas duas orientações)
+    x0, x1, x2 = tx[:, 0], tx[:, 1], tx[:, 2]
+    y0, y1, y2 = ty[:, 0], ty[:, 1], ty[:, 2]
+    area = (x1 - x0) * (y2 - y0) - (x2 - x0) * (y1 - y0)
+    vx, vy, vw, vh = item["viewport"]
+    keep = (
+        (np.abs(area) > 1e-9) & (tw > 0.0).all(axis=1)
+        & ~(tz < 0.0).all(axis=1) & ~(tz > 1.0).all(axis=1)
+        & (tx.max(axis=1) >= vx) & (tx.min(axis=1) <= vx + vw)
+        & (ty.max(axis=1) >= vy) & (ty.min(axis=1) <= vy + vh)
+    )
+    if not keep.any():
+        return None
+    x0, x1, x2, y0, y1, y2, area = (v[keep] for v in (x0, x1, x2, y0, y1, y2, area))
+    inv_area = (1.0 / area)[:, None]
+    a = np.stack([y1 - y2, y2 - y0, y0 - y1], axis=1) * inv_area
+    b = np.stack([x2 - x1, x0 - x2, x1 - x0], axis=1) * inv_area
+    c = np.stack([x1 * y2 - x2 * y1, x2 * y0 - x0 * y2, x0 * y1 - x1 * y0], axis=1) * inv_area
+    # Regra de preenchimento: um centro de pixel exatamente sobre a aresta só conta nas arestas
+    # da esquerda (e nas horizontais de baixo), para arestas compartilhadas não pintarem duas vezes
+    exclusive = ~((a > 0.0) | ((a == 0.0) & (b > 0.0)))
+    tz = tz[keep]
+    # Recorte em profundidade (fora de [0, 1]) só se algum triângulo atravessa near/far
+    depth_clip = bool((tz < 0.0).any() or (tz > 1.0).any())
+    # Pixels (centros em +0.5) que a caixa envolvente pode cobrir, dentro do viewport
+    xs = np.stack([x0, x1, x2], axis=1)
+    ys = np.stack([y0, y1, y2], axis=1)
+    return {
+        "a": a, "b": b, "c": c, "exclusive": exclusive,
+        "za": np.einsum("ij,ij->i", a, tz), "zb": np.einsum("ij,ij->i", b, tz), "zc": np.einsum("ij,ij->i", c, tz),
+        "inv_w": tw[keep], "color": tcolor[keep],
+        "px0": np.maximum(np.floor(xs.min(axis=1) - 0.5), vx).astype(np.intp),
+        "px1": np.minimum(np.ceil(xs.max(axis=1) - 0.5), vx + vw - 1).astype(np.intp),
+        "py0": np.maximum(np.floor(ys.min(axis=1) - 0.5), vy).astype(np.intp),
+        "py1": np.minimum(np.ceil(ys.max(axis=1) - 0.5), vy + vh - 1).astype(np.intp),
+        "viewport": (vx, vy, vw, vh),
+        "depth_clip": depth_clip,
+    }
+
+
+def bin_tiles(tris, tiles_x):
+    """Pares (ladrilho, triângulo), ordenados por ladrilho e, dentro dele, na ordem de desenho.
+
+    O ladrilho é ty * tiles_x + tx. Ladrilhos da caixa envolvente que ficam inteiros do lado
+    de fora de alguma aresta (a função de aresta é negativa no melhor canto) são descartados.
+    """
+    tx0, tx1 = tris["px0"] // TILE, tris["px1"] // TILE
+    ty0, ty1 = tris["py0"] // TILE, tris["py1"] // TILE
+    nx = np.maximum(tx1 - tx0 + 1, 0)
+    ny = np.maximum(ty1 - ty0 + 1, 0)
+    counts = nx * ny
+    tri = np.repeat(np.arange(len(counts)), counts)
+    local = np.arange(len(tri)) - np.repeat(np.cumsum(counts) - counts, counts)
+    tx = tx0[tri] + local % nx[tri]
+    ty = ty0[tri] + local // nx[tri]
+    # Maior valor de cada função de aresta entre os centros de pixel do ladrilho
+    a, b = tris["a"][tri], tris["b"][tri]
+    best_x = (tx * TILE)[:, None] + np.where(a > 0.0, TILE - 0.5, 0.5)
+    best_y = (ty * TILE)[:, None] + np.where(b > 0.0, TILE - 0.5, 0.5)
+    touches = (a * best_x + b * best_y + tris["c"][tri] >= 0.0).all(axis=1)
+    tile = (ty * tiles_x + tx)[touches]
+    tri = tri[touches]
+    order = np.argsort(tile, kind="stable")
+    return tile[order], tri[order]
+
+
+def _chunks(tile):
+    """Fatias [início, fim) de até MAX_PAIRS pares que não partem um ladrilho (um ladrilho
+    com mais pares que isso vai inteiro numa fatia só)."""
+    starts = np.append(np.flatnonzero(np.r_[True, tile[1:] != tile[:-1]]), len(tile))
+    bounds = [0]
+    while bounds[-1] < len(tile):
+        end = starts[np.searchsorted(starts, bounds[-1] + MAX_PAIRS, side="right") - 1]
+        if end <= bounds[-1]:
+            end = starts[np.searchsorted(starts, bounds[-1], side="right")]
+        bounds.append(int(end))
+    return zip(bounds[:-1], bounds[1:])
+
+
+def raster_pairs(target, tris, tile, tri):
+    """Rasteriza os pares (ladrilho, triângulo) de bin_tiles() em `target`."""
+    th, tw = target["depth"].shape
+    tiles_x = tw // TILE
+    depth_tiles = target["depth"].reshape(th // TILE, TILE, tiles_x, TILE)
+    vx, vy, vw, vh = tris["viewport"]
+    lx = _PIXEL_CENTERS[None, None, :]
+    ly = _PIXEL_CENTERS[None, :, None]
+    for start, end in _chunks(tile):
+        t = tile[start:end]
+        k = tri[start:end]
+        new_group = np.r_[True, t[1:] != t[:-1]]
+        group_start = np.flatnonzero(new_group)
+        group = np.cumsum(new_group) - 1
+        ox = (t % tiles_x) * TILE
+        oy = (t // tiles_x) * TILE
+        # Planos relativos à origem do ladrilho (em float64; avaliados em float32)
+        a, b = tris["a"][k], tris["b"][k]
+        c = tris["c"][k] + a * ox[:, None] + b * oy[:, None]
+        za, zb = tris["za"][k], tris["zb"][k]
+        zc = tris["zc"][k] + za * ox + zb * oy
+
+        def plane(pa, pb, pc):
+            return (pa.astype(np.float32)[:, None, None] * lx + pb.astype(np.float32)[:, None, None] * ly
+                    + pc.astype(np.float32)[:, None, None])
+
+        # Arestas exclusivas com o plano negado: dentro <=> (-e >= 0) é falso
+        exclusive = tris["exclusive"][k]
+        flip = np.where(exclusive, -1.0, 1.0)
+        fa, fb, fc = a * flip, b * flip, c * flip
+        inside = (plane(fa[:, 0], fb[:, 0], fc[:, 0]) >= 0.0) != exclusive[:, 0, None, None]
+        inside &= (plane(fa[:, 1], fb[:, 1], fc[:, 1]) >= 0.0) != exclusive[:, 1, None, None]
+        inside &= (plane(fa[:, 2], fb[:, 2], fc[:, 2]) >= 0.0) != exclusive[:, 2, None, None]
+        # Ladrilhos na borda do viewport: pixels de fora não contam
+        if ox.min() < vx or oy.min() < vy or ox.max() + TILE > vx + vw or oy.max() + TILE > vy + vh:
+            cols = ox[:, None] + np.arange(TILE)
+            rows = oy[:, None] + np.arange(TILE)
+            inside &= ((cols >= vx) & (cols < vx + vw))[:, None, :]
+            inside &= ((rows >= vy) & (rows < vy + vh))[:, :, None]
+        depth = plane(za, zb, zc)
+        if tris["depth_clip"]:
+            inside &= (depth >= 0.0) & (depth <= 1.0)
+        depth = np.where(inside, depth, np.float32(np.inf))
+
+        # Profundidade: o mais próximo de cada ladrilho contra o z-buffer (GL_LESS)
+        nearest = np.minimum.reduceat(depth, group_start, axis=0)
+        gx = t[group_start] % tiles_x
+        gy = t[group_start] // tiles_x
+        stored = depth_tiles[gy, :, gx, :]
+        passed = nearest < stored
+        depth_tiles[gy, :, gx, :] = np.where(passed, nearest, stored)
+        winner = passed[group] & (depth == nearest[group])
+
+        p, r, col = np.nonzero(winner)
+        if not len(p):
+            continue
+        kp = k[p]
+        px = col + 0.5
+        py = r + 0.5
+        bary = a[p] * px[:, None] + b[p] * py[:, None] + c[p]
+        # Correção de perspectiva: pesos b_i/w_i renormalizados
+        weights = np.clip(bary, 0.0, None) * tris["inv_w"][kp]
+        weights /= np.maximum(weights.sum(axis=1, keepdims=True), 1e-30)
+        color = np.einsum("ij,ijk->ik", weights, tris["color"][kp])
+        target["color"][oy[p] + r, ox[p] + col] = _to_rgb8(color)
+
+
+def draw_item(target, item, lights=()):
+    """Desenha um item em `target`.
+
+    O item é um dict com mesh (utils/mesh), model_view e projection (utils/matrices) e
+    viewport (x, y, w, h), mais material (ambient_diffuse, specular, shininess; iluminado
+    por `lights`, ver light()) ou color (sem iluminação). Opcionais: flat (GL_FLAT),
+    line_width (malhas de linhas) e lights (luzes só deste item, no lugar de `lights`).
+    """
+    tris = setup(item, lights)
+    if tris is None:
+        return
+    tile, tri = bin_tiles(tris, target["depth"].shape[1] // TILE)
+    raster_pairs(target, tris, tile, tri)
+
+
+def render(size, clear_color, items, lights=()):
+    """Quadro (h, w, 3) uint8 com os itens desenhados em ordem sobre a cor de fundo."""
+    target = new_target(size[0], size[1], clear_color)
+    for item in items:
+        draw_item(target, item, lights)
+    return image(target)
@@ -0,0 +1,160 @@
+"""Rasterizador por software (utils/softraster) dividido em regiões entre vários processos.
+
+Para quadros grandes (4K, 8K) renderizados offline. O processo principal faz a etapa de
+vértices (softraster.setup) de todos os itens e copia os triângulos prontos, empacotados em
+linhas float64, para uma memória compartilhada; o framebuffer (cor e profundidade) fica em
+outra. Os processos do pool abrem as duas pelo nome e cada tarefa é uma região de
+REGION x REGION pixels: o processo percorre os itens em ordem, separa os triângulos cuja
+caixa envolvente toca a região, distribui nos ladrilhos dela (softraster.bin_tiles) e
+rasteriza direto no framebuffer compartilhado. As regiões não se sobrepõem, então ninguém
+trava nada, e nenhum pixel passa por pickle: as tarefas levam só nomes, tamanhos e a
+lista de itens (início, quantidade, viewport).
+
+O resultado é idêntico ao de softraster.render. Cada tarefa também limpa a sua região, o
+que divide entre os processos o primeiro acesso às páginas do framebuffer (caro em quadros
+8K), e as tarefas saem das regiões com mais triângulos para as vazias, para os processos
+terminarem juntos.
+"""
+import multiprocessing
+import os
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from utils import softraster
+
+# Lado das regiões distribuídas entre os processos (múltiplo de softraster.TILE)
+REGION = 256
+# Colunas de cada triângulo empacotado: (campo de setup(), número de valores)
+_FIELDS = (
+    ("a", 3), ("b", 3), ("c", 3), ("za", 1), ("zb", 1), ("zc", 1),
+    ("inv_w", 3), ("color", 9), ("exclusive", 3),
+    ("px0", 1), ("px1", 1), ("py0", 1), ("py1", 1),
+)
+_COLUMNS = {}
+_offset = 0
+for _name, _count in _FIELDS:
+    _COLUMNS[_name] = (_offset, _count)
+    _offset += _count
+_WIDTH = _offset
+del _name, _count, _offset
+# Memórias compartilhadas abertas no processo de trabalho (as do quadro corrente)
+_WORKER = {"names": None, "blocks": (), "target": None, "triangles": None}
+
+
+def start_pool(processes=None):
+    """Pool de processos para render(); reaproveite o mesmo entre quadros. None = um por CPU."""
+    if os.name == "posix":
+        # Os processos herdam o resource_tracker já aberto; sem isso cada um abriria o seu e
+        # removeria as memórias compartilhadas que abriu ao terminar
+        resource_tracker.ensure_running()
+    return multiprocessing.Pool(processes)
+
+
+def _pack(tris):
+    return np.concatenate([np.asarray(tris[name], dtype=np.float64).reshape(len(tris["a"]), -1)
+                           for name, _count in _FIELDS], axis=1)
+
+
+def _unpack(rows, viewport, depth_clip):
+    tris = {"viewport": viewport, "depth_clip": depth_clip}
+    for name, (start, count) in _COLUMNS.items():
+        values = rows[:, start:start + count]
+        if name == "color":
+            tris[name] = values.reshape(-1, 3, 3)
+        elif name == "exclusive":
+            tris[name] = values != 0.0
+        elif name in ("px0", "px1", "py0", "py1"):
+            tris[name] = values[:, 0].astype(np.intp)
+        else:
+            tris[name] = values[:, 0] if count == 1 else values
+    return tris
+
+
+def _regions(prepared, w, h):
+    """Todas as regiões (rx, ry), das tocadas por mais caixas envolventes para as vazias."""
+    cols, rows = -(-w // REGION), -(-h // REGION)
+    # Contagem por região com um array de diferenças 2D (+1/-1 nos cantos de cada caixa)
+    marks = np.zeros((rows + 1, cols + 1), dtype=np.int64)
+    for tris in prepared:
+        rx0, rx1 = tris["px0"] // REGION, tris["px1"] // REGION + 1
+        ry0, ry1 = tris["py0"] // REGION, tris["py1"] // REGION + 1
+        np.add.at(marks, (ry0, rx0), 1)
+        np.add.at(marks, (ry0, rx1), -1)
+        np.add.at(marks, (ry1, rx0), -1)
+        np.add.at(marks, (ry1, rx1), 1)
+    load = marks.cumsum(axis=0).cumsum(axis=1)[:rows, :cols].ravel()
+    order = np.argsort(-load, kind="stable")
+    return [(int(i % cols), int(i // cols)) for i in order]
+
+
+def _attach(names, size, count):
+    """Framebuffer e triângulos compartilhados do quadro, abertos uma vez por processo."""
+    if _WORKER["names"] != names:
+        # Quadro novo: solta as vistas do anterior antes de fechar as memórias
+        _WORKER["target"] = _WORKER["triangles"] = None
+        for block in _WORKER["blocks"]:
+            block.close()
+        blocks = tuple(shared_memory.SharedMemory(name=name) for name in names)
+        _WORKER["names"], _WORKER["blocks"] = names, blocks
+        _WORKER["target"] = softraster.new_target(size[0], size[1], None, blocks[0].buf)
+        _WORKER["triangles"] = np.ndarray((count, _WIDTH), dtype=np.float64, buffer=blocks[1].buf)
+    return _WORKER["target"], _WORKER["triangles"]
+
+
+def _render_region(task):
+    names, size, count, clear_color, items, (rx, ry) = task
+    target, triangles = _attach(names, size, count)
+    x0, y0 = rx * REGION, ry * REGION
+    softraster.clear(target, clear_color, (x0, y0, x0 + REGION, y0 + REGION))
+    x1, y1 = x0 + REGION - 1, y0 + REGION - 1
+    px0, px1 = _COLUMNS["px0"][0], _COLUMNS["px1"][0]
+    py0, py1 = _COLUMNS["py0"][0], _COLUMNS["py1"][0]
+    tiles_x = target["depth"].shape[1] // softraster.TILE
+    for start, length, viewport, depth_clip in items:
+        rows = triangles[start:start + length]
+        hit = (rows[:, px0] <= x1) & (rows[:, px1] >= x0) & (rows[:, py0] <= y1) & (rows[:, py1] >= y0)
+        if not hit.any():
+            continue
+        tris = _unpack(rows[hit], viewport, depth_clip)
+        # Caixas recortadas na região: bin_tiles só gera ladrilhos dela
+        np.maximum(tris["px0"], x0, out=tris["px0"])
+        np.minimum(tris["px1"], x1, out=tris["px1"])
+        np.maximum(tris["py0"], y0, out=tris["py0"])
+        np.minimum(tris["py1"], y1, out=tris["py1"])
+        tile, tri = softraster.bin_tiles(tris, tiles_x)
+        softraster.raster_pairs(target, tris, tile, tri)
+
+
+def render(size, clear_color, items, lights=(), pool=None):
+    """Como softraster.render, com a rasterização dividida entre os processos de `pool`
+    (start_pool()); sem pool, abre um só para este quadro."""
+    w, h = size
+    prepared = [tris for tris in (softraster.setup(item, lights) for item in items) if tris is not None]
+    count = sum(len(tris["a"]) for tris in prepared)
+    frame = shared_memory.SharedMemory(create=True, size=softraster.target_nbytes(w, h))
+    triangles = shared_memory.SharedMemory(create=True, size=max(count, 1) * _WIDTH * 8)
+    target = rows = None
+    try:
+        # Sem limpar: cada processo limpa as regiões que desenha
+        target = softraster.new_target(w, h, None, frame.buf)
+        rows = np.ndarray((count, _WIDTH), dtype=np.float64, buffer=triangles.buf)
+        meta = []
+        start = 0
+        for tris in prepared:
+            length = len(tris["a"])
+            rows[start:start + length] = _pack(tris)
+            meta.append((start, length, tris["viewport"], tris["depth_clip"]))
+            start += length
+        names = (frame.name, triangles.name)
+        tasks = [(names, (w, h), count, clear_color, meta, region) for region in _regions(prepared, w, h)]
+        if pool is None:
+            with start_pool() as own:
+                own.map(_render_region, tasks, chunksize=1)
+        else:
+            pool.map(_render_region, tasks, chunksize=1)
+        return softraster.image(target).copy()
+    finally:
+        # As vistas NumPy seguram os buffers: precisam sair antes do close()
+        target = rows = None
+        for block in (frame, triangles):
+            block.close()
+            block.unlink()
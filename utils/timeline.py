@@ -0,0 +1,166 @@
+"""Trilhas de quadros-chave de transformação, amostradas antes da reprodução.
+
+Uma trilha é um dict com as chaves (array estruturado KEY_DTYPE, ordenado por tempo), a
+taxa de amostragem e as matrizes amostradas. Cada chave guarda translação, escala por
+eixo (negativa = reflexão), rotação como quatérnio e cisalhamento; a matriz da chave é
+T · R · S · Sh. Entre duas chaves a rotação usa slerp e o resto interpolação linear.
+
+sample() gera de uma vez todas as matrizes (n, 4, 4) por colunas (utils/matrices), com
+NumPy vetorizado; durante a reprodução o loop só indexa o array. save()/load() gravam só
+as chaves num arquivo binário pequeno (cabeçalho de 16 bytes + 52 bytes por chave).
+"""
+import struct
+from math import cos, radians, sin, sqrt
+import numpy as np
+
+KEY_DTYPE = np.dtype([
+    ("time", "<f4"),
+    ("tx", "<f4"), ("ty", "<f4"), ("tz", "<f4"),
+    ("sx", "<f4"), ("sy", "<f4"), ("sz", "<f4"),
+    ("qw", "<f4"), ("qx", "<f4"), ("qy", "<f4"), ("qz", "<f4"),
+    ("shx", "<f4"), ("shy", "<f4"),
+])
+DEFAULT_FPS = 60.0
+_LINEAR_FIELDS = ("tx", "ty", "tz", "sx", "sy", "sz", "shx", "shy")
+_MAGIC = b"CGTK"
+_VERSION = 1
+# magic, versão, bytes por chave, fps, número de chaves
+_HEADER = struct.Struct("<4sHHfI")
+
+
+def new_track(fps=DEFAULT_FPS):
+    return {"keys": np.zeros(0, dtype=KEY_DTYPE), "fps": float(fps), "samples": None}
+
+
+def make_key(time, translate=(0.0, 0.0, 0.0), scale=(1.0, 1.0, 1.0), angle=0.0, axis=(0.0, 1.0, 0.0),
+             shx=0.0, shy=0.0):
+    """Chave no instante `time` (s): rotação de `angle` graus em torno de `axis` (como glRotatef)
+    e cisalhamento como matrices.make_shear."""
+    x, y, z = axis
+    length = sqrt(x * x + y * y + z * z) or 1.0
+    half = radians(angle) / 2.0
+    s = sin(half) / length
+    key = np.zeros((), dtype=KEY_DTYPE)
+    key["time"] = time
+    key["tx"], key["ty"], key["tz"] = translate
+    key["sx"], key["sy"], key["sz"] = scale
+    key["qw"], key["qx"], key["qy"], key["qz"] = cos(half), x * s, y * s, z * s
+    key["shx"], key["shy"] = shx, shy
+    return key
+
+
+def add_key(track, key):
+    """Insere a chave mantendo a ordem por tempo; as amostras são refeitas no próximo sample()."""
+    keys = np.append(track["keys"], key)
+    track["keys"] = keys[np.argsort(keys["time"], kind="stable")]
+    track["samples"] = None
+
+
+def clear(track):
+    track["keys"] = np.zeros(0, dtype=KEY_DTYPE)
+    track["samples"] = None
+
+
+def duration(track):
+    keys = track["keys"]
+    return float(keys["time"][-1] - keys["time"][0]) if len(keys) else 0.0
+
+
+def _slerp(q0, q1, u):
+    """Slerp vetorizado entre quatérnios (n, 4), pelo caminho mais curto."""
+    dot = np.einsum("ij,ij->i", q0, q1)
+    q1 = np.where(dot[:, None] < 0.0, -q1, q1)
+    dot = np.abs(dot)
+    theta = np.arccos(np.clip(dot, -1.0, 1.0))
+    sin_theta = np.sin(theta)
+    # Quatérnios quase iguais: lerp (slerp dividiria por ~0)
+    close = sin_theta < 1e-6
+    safe = np.where(close, 1.0, sin_theta)
+    w0 = np.where(close, 1.0 - u, np.sin((1.0 - u) * theta) / safe)
+    w1 = np.where(close, u, np.sin(u * theta) / safe)
+    q = w0[:, None] * q0 + w1[:, None] * q1
+    return q / np.linalg.norm(q, axis=1, keepdims=True)
+
+
+def _rotation_blocks(q):
+    """Matrizes de rotação (n, 3, 3) (por linhas) dos quatérnios unitários (w, x, y, z)."""
+    w, x, y, z = q.T
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)], axis=1),
+        np.stack([2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)], axis=1),
+        np.stack([2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)], axis=1),
+    ], axis=1)
+
+
+def sample(track):
+    """Matrizes (n, 4, 4) float32 de todos os quadros da trilha (uma por 1/fps s), em cache."""
+    if track["samples"] is not None:
+        return track["samples"]
+    keys = track["keys"]
+    if not len(keys):
+        raise ValueError("trilha sem chaves")
+    times = keys["time"].astype(np.float64)
+    count = int(round((times[-1] - times[0]) * track["fps"])) + 1
+    t = times[0] + np.arange(count) / track["fps"]
+    # Segmento de cada quadro e posição u em [0, 1] dentro dele
+    seg = np.clip(np.searchsorted(times, t, side="right") - 1, 0, max(len(keys) - 2, 0))
+    nxt = np.minimum(seg + 1, len(keys) - 1)
+    span = times[nxt] - times[seg]
+    u = np.where(span > 0, (t - times[seg]) / np.where(span > 0, span, 1.0), 0.0)
+    u = np.clip(u, 0.0, 1.0)
+
+    values = {}
+    for field in _LINEAR_FIELDS:
+        a = keys[field].astype(np.float64)
+        values[field] = a[seg] + (a[nxt] - a[seg]) * u
+    quats = np.stack([keys[f].astype(np.float64) for f in ("qw", "qx", "qy", "qz")], axis=1)
+    rotation = _rotation_blocks(_slerp(quats[seg], quats[nxt], u))
+
+    # Bloco linear R · S · Sh (por linhas); Sh = [[1, shx, 0], [shy, 1, 0], [0, 0, 1]]
+    shear = np.zeros((count, 3, 3))
+    shear[:, 0, 0] = shear[:, 1, 1] = shear[:, 2, 2] = 1.0
+    shear[:, 0, 1] = values["shx"]
+    shear[:, 1, 0] = values["shy"]
+    scale = np.stack([values["sx"], values["sy"], values["sz"]], axis=1)
+    linear = rotation @ (scale[:, :, None] * shear)
+
+    samples = np.zeros((count, 4, 4), dtype=np.float32)
+    # Por colunas: samples[i, coluna, linha]
+    samples[:, :3, :3] = linear.transpose(0, 2, 1)
+    samples[:, 3, 0] = values["tx"]
+    samples[:, 3, 1] = values["ty"]
+    samples[:, 3, 2] = values["tz"]
+    samples[:, 3, 3] = 1.0
+    track["samples"] = samples
+    return samples
+
+
+def frame_index(track, elapsed, loop=True):
+    """Índice do quadro amostrado `elapsed` segundos após o início da reprodução."""
+    count = len(sample(track))
+    index = int(elapsed * track["fps"])
+    return index % count if loop else min(index, count - 1)
+
+
+def save(track, path):
+    keys = np.ascontiguousarray(track["keys"], dtype=KEY_DTYPE)
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, KEY_DTYPE.itemsize, track["fps"], len(keys)))
+        f.write(keys.tobytes())
+
+
+def load(path):
+    """Lê uma trilha gravada por save(); ValueError se o arquivo não for uma trilha válida."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < _HEADER.size:
+        raise ValueError(f"{path}: arquivo curto demais")
+    magic, version, key_size, fps, count = _HEADER.unpack_from(data)
+    if magic != _MAGIC or version != _VERSION or key_size != KEY_DTYPE.itemsize:
+        raise ValueError(f"{path}: não é uma trilha (versão {_VERSION})")
+    body = data[_HEADER.size:]
+    if len(body) != count * key_size or fps <= 0:
+        raise ValueError(f"{path}: trilha corrompida")
+    track = new_track(fps)
+    track["keys"] = np.frombuffer(body, dtype=KEY_DTYPE).copy()
+    return track
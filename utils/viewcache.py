@@ -0,0 +1,195 @@
+"""Cache de vistas em textura: cada vista é desenhada numa textura e reaproveitada enquanto a
+chave dela não muda.
+
+Cada grupo de vistas (`name`, ex.: as células de um layout) tem uma textura do tamanho do
+framebuffer, e cada vista ocupa nela o mesmo retângulo que ocupa na janela: a vista é
+desenhada com a mesma viewport e as mesmas matrizes dos dois jeitos, então os pixels
+coincidem. Quando a chave muda (ou a vista ainda não existe), a vista é desenhada de novo:
+num framebuffer object com a textura como cor e um renderbuffer de profundidade ou, sem FBO,
+direto na janela e copiada para a textura com glCopyTexSubImage2D. Depois, o framebuffer que
+estava ligado antes (a janela ou o FBO de utils/offscreen) volta a ser o alvo.
+
+As vistas guardadas vão do FBO para o framebuffer ligado com glBlitFramebuffer ou, sem ele,
+como quads texturizados do tamanho exato de cada viewport (GL_NEAREST, texel por pixel),
+todos com um só estado de textura. No llvmpipe a cópia custa um décimo dos quads, que
+passam pela amostragem de textura.
+
+stats() conta acertos (vista copiada da textura) e faltas (vista desenhada de novo).
+"""
+from OpenGL.GL import (
+    GL_TEXTURE_2D, GL_RGBA8, GL_RGBA, GL_UNSIGNED_BYTE, GL_NEAREST, GL_CLAMP_TO_EDGE,
+    GL_TEXTURE_MIN_FILTER, GL_TEXTURE_MAG_FILTER, GL_TEXTURE_WRAP_S, GL_TEXTURE_WRAP_T,
+    GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_REPLACE, GL_QUADS,
+    GL_FRAMEBUFFER, GL_FRAMEBUFFER_BINDING, GL_FRAMEBUFFER_COMPLETE, GL_RENDERBUFFER,
+    GL_READ_FRAMEBUFFER, GL_READ_FRAMEBUFFER_BINDING,
+    GL_COLOR_ATTACHMENT0, GL_DEPTH_ATTACHMENT, GL_DEPTH_COMPONENT24,
+    GL_COLOR_BUFFER_BIT, GL_DEPTH_BUFFER_BIT, GL_ENABLE_BIT, GL_TEXTURE_BIT, GL_VIEWPORT_BIT,
+    GL_SCISSOR_BIT, GL_CURRENT_BIT, GL_PROJECTION, GL_MODELVIEW,
+    GL_DEPTH_TEST, GL_LIGHTING, GL_SCISSOR_TEST,
+    glGenTextures, glBindTexture, glTexParameteri, glTexImage2D, glTexEnvi, glCopyTexSubImage2D,
+    glGenFramebuffers, glBindFramebuffer, glFramebufferTexture2D, glCheckFramebufferStatus, glBlitFramebuffer,
+    glGenRenderbuffers, glBindRenderbuffer, glRenderbufferStorage, glFramebufferRenderbuffer,
+    glGetIntegerv, glPushAttrib, glPopAttrib, glEnable, glDisable, glViewport, glScissor, glClear,
+    glMatrixMode, glPushMatrix, glPopMatrix, glLoadIdentity, glOrtho,
+    glBegin, glEnd, glTexCoord2f, glVertex2f,
+)
+from utils.glcontext import get_resource
+
+USE_FBO = True
+_STATS = {"hits": 0, "misses": 0}
+
+
+def _fbo_supported():
+    return USE_FBO and bool(glGenFramebuffers)
+
+
+def _new_entry():
+    return {"texture": glGenTextures(1), "fbo": None, "depth": None, "size": None, "keys": {}}
+
+
+def _allocate(entry, w, h):
+    """(Re)cria a textura w x h do grupo e, com FBO, o framebuffer e a profundidade dele."""
+    glPushAttrib(GL_TEXTURE_BIT)
+    glBindTexture(GL_TEXTURE_2D, entry["texture"])
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA8, w, h, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+    glPopAttrib()
+    if _fbo_supported():
+        if entry["fbo"] is None:
+            entry["fbo"] = glGenFramebuffers(1)
+            entry["depth"] = glGenRenderbuffers(1)
+        glBindRenderbuffer(GL_RENDERBUFFER, entry["depth"])
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, w, h)
+        glBindRenderbuffer(GL_RENDERBUFFER, 0)
+        previous = glGetIntegerv(GL_FRAMEBUFFER_BINDING)
+        glBindFramebuffer(GL_FRAMEBUFFER, entry["fbo"])
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, entry["texture"], 0)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, entry["depth"])
+        complete = glCheckFramebufferStatus(GL_FRAMEBUFFER) == GL_FRAMEBUFFER_COMPLETE
+        glBindFramebuffer(GL_FRAMEBUFFER, previous)
+        if not complete:
+            raise RuntimeError(f"FBO das vistas {w}x{h} incompleto")
+    entry["size"] = (w, h)
+    entry["keys"].clear()
+
+
+def _render(entry, viewport, build):
+    """Limpa a área da vista e chama build(): no FBO ou, sem ele, na janela (e copia)."""
+    x, y, w, h = viewport
+    glPushAttrib(GL_ENABLE_BIT | GL_SCISSOR_BIT)
+    glEnable(GL_SCISSOR_TEST)
+    glScissor(x, y, w, h)
+    previous = None
+    if entry["fbo"] is not None:
+        previous = glGetIntegerv(GL_FRAMEBUFFER_BINDING)
+        glBindFramebuffer(GL_FRAMEBUFFER, entry["fbo"])
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+    build()
+    if previous is not None:
+        glBindFramebuffer(GL_FRAMEBUFFER, previous)
+    else:
+        glPushAttrib(GL_TEXTURE_BIT)
+        glBindTexture(GL_TEXTURE_2D, entry["texture"])
+        glCopyTexSubImage2D(GL_TEXTURE_2D, 0, x, y, x, y, w, h)
+        glPopAttrib()
+    glPopAttrib()
+
+
+def _blit(entry, viewports):
+    """Copia os retângulos `viewports` do FBO do grupo para o framebuffer ligado."""
+    previous = glGetIntegerv(GL_READ_FRAMEBUFFER_BINDING)
+    # O recorte (glScissor) também vale para glBlitFramebuffer
+    glPushAttrib(GL_ENABLE_BIT)
+    glDisable(GL_SCISSOR_TEST)
+    glBindFramebuffer(GL_READ_FRAMEBUFFER, entry["fbo"])
+    for x, y, w, h in viewports:
+        glBlitFramebuffer(x, y, x + w, y + h, x, y, x + w, y + h, GL_COLOR_BUFFER_BIT, GL_NEAREST)
+    glBindFramebuffer(GL_READ_FRAMEBUFFER, previous)
+    glPopAttrib()
+
+
+def _draw_quads(entry, viewports):
+    """Um quad por viewport com o mesmo retângulo da textura, cobrindo exatamente a viewport."""
+    tex_w, tex_h = entry["size"]
+    glPushAttrib(GL_ENABLE_BIT | GL_TEXTURE_BIT | GL_VIEWPORT_BIT | GL_CURRENT_BIT)
+    glDisable(GL_DEPTH_TEST)
+    glDisable(GL_LIGHTING)
+    glDisable(GL_SCISSOR_TEST)
+    glEnable(GL_TEXTURE_2D)
+    glBindTexture(GL_TEXTURE_2D, entry["texture"])
+    glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_REPLACE)
+    glViewport(0, 0, tex_w, tex_h)
+    glMatrixMode(GL_PROJECTION)
+    glPushMatrix()
+    glLoadIdentity()
+    glOrtho(0, tex_w, 0, tex_h, -1, 1)
+    glMatrixMode(GL_MODELVIEW)
+    glPushMatrix()
+    glLoadIdentity()
+    glBegin(GL_QUADS)
+    for x, y, w, h in viewports:
+        u1, v1, u2, v2 = x / tex_w, y / tex_h, (x + w) / tex_w, (y + h) / tex_h
+        glTexCoord2f(u1, v1)
+        glVertex2f(x, y)
+        glTexCoord2f(u2, v1)
+        glVertex2f(x + w, y)
+        glTexCoord2f(u2, v2)
+        glVertex2f(x + w, y + h)
+        glTexCoord2f(u1, v2)
+        glVertex2f(x, y + h)
+    glEnd()
+    glPopMatrix()
+    glMatrixMode(GL_PROJECTION)
+    glPopMatrix()
+    glMatrixMode(GL_MODELVIEW)
+    glPopAttrib()
+
+
+def draw_cached(name, size, views):
+    """Desenha as vistas do grupo `name` num framebuffer `size` (largura, altura).
+
+    `views` é uma lista de (slot, chave, viewport, build): viewport é (x, y, largura, altura)
+    e `build()` desenha a vista na própria viewport (carregando viewport, recorte e matrizes).
+    build só é chamado quando a chave ou a viewport do slot mudam; as demais vistas saem da
+    textura, todas num só glBegin/glEnd.
+    """
+    if not views:
+        return
+    entry = get_resource("viewcache:" + name, _new_entry)
+    if entry["size"] != tuple(size):
+        _allocate(entry, *size)
+    blits = []
+    for slot, key, viewport, build in views:
+        if viewport[2] <= 0 or viewport[3] <= 0:
+            continue
+        key = (key, tuple(viewport))
+        if entry["keys"].get(slot) == key:
+            _STATS["hits"] += 1
+            blits.append(viewport)
+            continue
+        _STATS["misses"] += 1
+        entry["keys"].pop(slot, None)
+        _render(entry, viewport, build)
+        entry["keys"][slot] = key
+        # Com FBO a vista foi desenhada só na textura; sem ele, já está na janela
+        if entry["fbo"] is not None:
+            blits.append(viewport)
+    if not blits:
+        return
+    if entry["fbo"] is not None and bool(glBlitFramebuffer):
+        _blit(entry, blits)
+    else:
+        _draw_quads(entry, blits)
+
+
+def stats():
+    """Acertos e faltas desde o último reset(), e a fração de acertos."""
+    total = _STATS["hits"] + _STATS["misses"]
+    return dict(_STATS, hit_rate=_STATS["hits"] / total if total else 0.0)
+
+
+def reset():
+    _STATS.update(hits=0, misses=0)